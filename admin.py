@@ -0,0 +1,137 @@
+import hmac
+import os
+from datetime import date
+from functools import wraps
+from flask import Blueprint, Response, g, jsonify, request, current_app
+from src.clients import supabase
+from src.profiling import sample_stacks, slow_query_log
+from src import exports
+
+MAX_PROFILE_SECONDS = 60
+
+admin_bp = Blueprint('admin', __name__)
+
+def bearer_token():
+    auth_header = request.headers.get('Authorization', '')
+    return auth_header[7:] if auth_header.startswith('Bearer ') else None
+
+def is_admin_token(token):
+    admin_token = os.getenv('ADMIN_TOKEN')
+    return bool(admin_token) and hmac.compare_digest(token, admin_token)
+
+def profile_is_admin(user_id):
+    profile = supabase.table('profiles').select('is_admin').eq('id', user_id).single().execute()
+    return bool(profile.data and profile.data.get('is_admin'))
+
+def admin_required(view):
+    """Allow ADMIN_TOKEN (for ops scripts) or a Supabase session of a profile with is_admin"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = bearer_token()
+        if not token:
+            return jsonify({'error': 'Authentication required'}), 401
+
+        if is_admin_token(token):
+            return view(*args, **kwargs)
+
+        try:
+            user_response = supabase.auth.get_user(token)
+            user = user_response.user if user_response else None
+            if user and profile_is_admin(user.id):
+                return view(*args, **kwargs)
+        except Exception as e:
+            current_app.logger.warning(f'Admin authentication failed: {str(e)}')
+
+        return jsonify({'error': 'Admin access required'}), 403
+    return wrapper
+
+def login_required(view):
+    """Require a Supabase session (or ADMIN_TOKEN); sets g.user_id and g.is_admin.
+
+    The view still runs with the service-key client, so it must check that the caller
+    owns the rows it touches.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = bearer_token()
+        if not token:
+            return jsonify({'error': 'Authentication required'}), 401
+
+        if is_admin_token(token):
+            g.user_id, g.is_admin = None, True
+            return view(*args, **kwargs)
+
+        try:
+            user_response = supabase.auth.get_user(token)
+            user = user_response.user if user_response else None
+            if user:
+                g.user_id, g.is_admin = user.id, profile_is_admin(user.id)
+        except Exception as e:
+            current_app.logger.warning(f'Authentication failed: {str(e)}')
+            user = None
+
+        if not user:
+            return jsonify({'error': 'Invalid or expired session'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+@admin_bp.route('/profile', methods=['GET'])
+@admin_required
+def profile():
+    """Sample every worker thread for N seconds and return collapsed stacks"""
+    seconds = request.args.get('seconds', 10, type=float)
+    interval_ms = request.args.get('interval_ms', 5, type=float)
+
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        return jsonify({'error': f'seconds must be between 0 and {MAX_PROFILE_SECONDS}'}), 400
+    if not 1 <= interval_ms <= 1000:
+        return jsonify({'error': 'interval_ms must be between 1 and 1000'}), 400
+
+    collapsed, samples = sample_stacks(seconds, interval_ms / 1000)
+    response = Response(collapsed, mimetype='text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename=profile-{int(seconds)}s.collapsed'
+    response.headers['X-Profile-Samples'] = str(samples)
+    return response
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@admin_required
+def slow_queries():
+    """Most recent slow queries, newest first"""
+    limit = request.args.get('limit', 50, type=int)
+    entries = list(slow_query_log.entries)[::-1][:limit]
+    return jsonify({
+        'threshold_ms': slow_query_log.threshold * 1000,
+        'slow_queries': entries
+    })
+
+@admin_bp.route('/exports/<dataset>', methods=['GET'])
+@admin_required
+def export_dataset(dataset):
+    """Stream enrollments or payments as CSV or Parquet
+
+    Rows are ordered by id; pass the last id received as ``after`` to resume.
+    """
+    if dataset not in exports.DATASETS:
+        return jsonify({'error': f'Unknown dataset: {dataset}'}), 404
+    export_format = request.args.get('format', 'csv')
+    if export_format not in exports.FORMATS:
+        return jsonify({'error': f'format must be one of {", ".join(exports.FORMATS)}'}), 400
+    try:
+        filters = {
+            'start': date.fromisoformat(request.args['start']) if request.args.get('start') else None,
+            'end': date.fromisoformat(request.args['end']) if request.args.get('end') else None,
+            'program_id': request.args.get('program_id'),
+        }
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+
+    try:
+        chunks = exports.stream(exports.DATASETS[dataset], filters, export_format, after=request.args.get('after'))
+    except exports.ExportError as e:
+        current_app.logger.error(f'Export error: {str(e)}')
+        return jsonify({'error': str(e)}), 503
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/vnd.apache.parquet'
+    response = Response(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={dataset}.{export_format}'
+    return response
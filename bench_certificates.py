@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Certificate renders per second, in-process and through the issuing pipeline.
+
+    python bench_certificates.py --enrollments 2000 --workers 4 --stub-latency-ms 5
+
+Compares rendering with a layout parsed for every certificate against the cached
+template, then runs ``CertificateIssuer`` end to end against the PostgREST stub (batch
+query, process pool, content-addressed store, one ``issue_certificates`` call per
+batch) with one worker and with ``--workers``.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.loadtest import start_stubs
+from src.certificates import DEFAULT_LAYOUT, CertificateIssuer, CertificateTemplate, ContentStore, certificate_fields, load_template
+
+FIRST_NAMES = ['Grace', 'Daniel', 'Esther', 'Samuel', 'Ruth', 'Tomás', 'Chiamaka', 'Wen', 'Zoë', 'Abigail']
+LAST_NAMES = ['Okafor', 'Hernández', 'Lindqvist', 'Nakamura', "O'Connell", 'Abernathy-Montgomery', 'Smith']
+
+
+def seed(postgrest, count, rng):
+    programs = [{'id': str(uuid.uuid4()), 'name': name} for name in
+                ['Foundation Leadership Intensive', 'Executive Leadership Journey', 'Kingdom Impact Cohort']]
+    profiles, enrollments = [], []
+    completed = datetime(2026, 6, 1, tzinfo=timezone.utc)
+    for _ in range(count):
+        profile_id = str(uuid.uuid4())
+        profiles.append({'id': profile_id, 'email': f'{profile_id[:8]}@example.test',
+                         'full_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'})
+        enrollments.append({
+            'id': str(uuid.uuid4()),
+            'user_id': profile_id,
+            'program_id': rng.choice(programs)['id'],
+            'completed_at': (completed + timedelta(minutes=rng.randint(0, 200000))).isoformat(),
+            'certificate_issued_at': None,
+            'certificate_url': None,
+        })
+    postgrest.seed('programs', programs)
+    postgrest.seed('profiles', profiles)
+    postgrest.seed('enrollments', enrollments)
+    return enrollments
+
+
+def issue_certificates(stub, args):
+    by_id = {row['id']: row for row in stub.tables['enrollments']}
+    issued = 0
+    for certificate in args['p_certificates']:
+        row = by_id.get(certificate['id'])
+        if row and row['certificate_issued_at'] is None:
+            row.update(certificate_url=certificate['url'], certificate_issued_at=datetime.now(timezone.utc).isoformat())
+            issued += 1
+    return issued
+
+
+def reset(postgrest):
+    with postgrest.lock:
+        for row in postgrest.tables['enrollments']:
+            row.update(certificate_issued_at=None, certificate_url=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--enrollments', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--stub-latency-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    stripe_stub, postgrest_stub = start_stubs(args.stub_latency_ms / 1000)
+    postgrest_stub.rpc_handlers['issue_certificates'] = issue_certificates
+    rows = seed(postgrest_stub, args.enrollments, random.Random(5))
+    for row in rows:
+        row['profile'] = next(p for p in postgrest_stub.tables['profiles'] if p['id'] == row['user_id'])
+        row['program'] = next(p for p in postgrest_stub.tables['programs'] if p['id'] == row['program_id'])
+
+    from src.clients import supabase
+
+    print(f"🚀 {args.enrollments} completed enrollments, stub latency {args.stub_latency_ms:g} ms")
+    with tempfile.TemporaryDirectory() as directory:
+        store = ContentStore(os.path.join(directory, 'inline'))
+        sample = rows[:500]
+
+        started = time.perf_counter()
+        for row in sample:
+            store.put(CertificateTemplate(DEFAULT_LAYOUT).render(certificate_fields(row)))
+        parsed_each = len(sample) / (time.perf_counter() - started)
+
+        template = load_template()
+        started = time.perf_counter()
+        for row in sample:
+            store.put(template.render(certificate_fields(row)))
+        cached = len(sample) / (time.perf_counter() - started)
+
+        size = len(template.render(certificate_fields(sample[0])))
+        print(f"  {'layout parsed per certificate, 1 process':<46} {parsed_each:>9.0f} renders/s")
+        print(f"  {'cached template, 1 process':<46} {cached:>9.0f} renders/s  ({size / 1024:.1f} KiB per PDF)")
+
+        for workers in sorted({1, args.workers}):
+            reset(postgrest_stub)
+            issuer = CertificateIssuer(supabase, store_root=os.path.join(directory, f'pool-{workers}'),
+                                       workers=workers, batch_size=args.batch_size)
+            stats = issuer.issue()
+            label = f'pipeline, {workers} worker' + ('s' if workers > 1 else '')
+            print(f"  {label:<46} {stats['renders_per_second']:>9.0f} renders/s  "
+                  f"({stats['rendered']} rendered, {stats['failed']} failed, {stats['batches']} batches, {stats['seconds']:.2f}s)")
+
+        issued = sum(1 for row in postgrest_stub.tables['enrollments'] if row['certificate_url'])
+        print(f"✅ {issued}/{args.enrollments} enrollments have a certificate_url")
+
+    stripe_stub.stop()
+    postgrest_stub.stop()
+
+
+if __name__ == "__main__":
+    main()
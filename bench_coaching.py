@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the coach free-slot finder against the local PostgREST stub.
+
+    python bench_coaching.py --coaches 200 --sessions-per-coach 15 --budget-ms 5
+
+Seeds coaches with random weekly availability and booked sessions, then times a cold
+load of one week for every coach, "which coaches are free Tuesday afternoon" on a
+warm cache, one coach's slots, and the reload after a booking invalidates a week.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.scheduling import SlotFinder, isoformat
+from src.stub_servers import StubPostgrest
+
+# Shaped like a Supabase key so client-side validation accepts it
+SUPABASE_KEY = 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.bench'
+TIMEZONES = ('America/New_York', 'America/Chicago', 'America/Los_Angeles', 'Europe/London', 'UTC')
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday')
+
+
+def seed(stub, coaches, sessions_per_coach, monday, rng):
+    coach_rows = []
+    session_rows = []
+    for _ in range(coaches):
+        coach_id = str(uuid.uuid4())
+        schedule = {'timezone': rng.choice(TIMEZONES)}
+        for day in rng.sample(DAYS, rng.randint(2, 5)):
+            start = rng.choice([7, 8, 9, 10, 12, 13])
+            schedule[day] = [f'{start:02d}:00-{start + rng.choice([3, 4, 5, 8]):02d}:00']
+        coach_rows.append({'id': coach_id, 'availability_schedule': schedule, 'is_active': True})
+        for _ in range(sessions_per_coach):
+            start = datetime.combine(monday, datetime.min.time(), timezone.utc) + timedelta(
+                days=rng.randint(0, 6), hours=rng.randint(8, 20), minutes=rng.choice([0, 30]))
+            session_rows.append({
+                'id': str(uuid.uuid4()),
+                'coach_id': coach_id,
+                'scheduled_time': isoformat(start.timestamp()),
+                'duration_minutes': rng.choice([30, 60, 90]),
+                'status': rng.choices(['scheduled', 'cancelled', 'completed'], [8, 1, 1])[0],
+            })
+    stub.seed('coaches', coach_rows)
+    stub.seed('coaching_sessions', session_rows)
+    return [row['id'] for row in coach_rows]
+
+
+def timed(func, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append((time.perf_counter() - started) * 1000)
+    durations.sort()
+    return result, statistics.median(durations), durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--coaches', type=int, default=200)
+    parser.add_argument('--sessions-per-coach', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--budget-ms', type=float, default=5.0, help='p99 budget for the warm multi-coach query')
+    args = parser.parse_args()
+
+    from supabase import create_client
+
+    rng = random.Random(7)
+    today = date.today()
+    monday = today - timedelta(days=today.weekday()) + timedelta(days=7)
+    stub = StubPostgrest().start()
+    coach_ids = seed(stub, args.coaches, args.sessions_per_coach, monday, rng)
+    finder = SlotFinder(create_client(stub.url, SUPABASE_KEY), ttl=3600)
+
+    tuesday = datetime.combine(monday + timedelta(days=1), datetime.min.time(), timezone.utc)
+    afternoon = ((tuesday + timedelta(hours=17)).timestamp(), (tuesday + timedelta(hours=22)).timestamp())
+    week = (datetime.combine(monday, datetime.min.time(), timezone.utc).timestamp(),
+            datetime.combine(monday + timedelta(days=7), datetime.min.time(), timezone.utc).timestamp())
+
+    print(f"🚀 {args.coaches} coaches, {args.sessions_per_coach} sessions each, week of {monday}")
+    _, cold, _ = timed(lambda: finder.available_coaches(*afternoon, 60), 1)
+    print(f"  cold load (all coaches, one week)   {cold:>8.1f} ms")
+
+    available, median, p99 = timed(lambda: finder.available_coaches(*afternoon, 60), args.repeat)
+    print(f"  any coach free Tuesday afternoon    p50 {median:>6.3f} ms  p99 {p99:>6.3f} ms  ({len(available)} coaches)")
+
+    slots, median, _ = timed(lambda: finder.free_slots(coach_ids[0], *week, 60, 30), args.repeat)
+    print(f"  one coach, week of 60 min slots     p50 {median:>6.3f} ms  ({len(slots)} slots)")
+
+    def book_and_reload():
+        finder.invalidate(coach_ids[0], week[0] + 86400)
+        return finder.free_slots(coach_ids[0], *week, 60, 30)
+    _, median, _ = timed(book_and_reload, 20)
+    print(f"  reload after invalidation           p50 {median:>6.1f} ms")
+    stub.stop()
+
+    if p99 > args.budget_ms:
+        print(f"❌ p99 {p99:.3f} ms exceeds budget of {args.budget_ms} ms")
+        sys.exit(1)
+    print(f"✅ Warm multi-coach query within {args.budget_ms} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Time cohort cancellation and rescheduling, and check the rows they leave behind.
+
+    python bench_cohorts.py --bookings 500
+
+Imports bookings for one program on a fresh SQLite database, shifts the first date
+range by a week and cancels the second one through /api/cohorts, then reads sessions,
+bookings and availability back from the database. Exits non-zero when a reported
+change is not what the rows show.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.loadtest import create_test_app
+
+FIRST_DAY = date(2027, 3, 1)
+ADMIN_TOKEN = 'bench-cohorts'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=500, help='bookings per date range')
+    args = parser.parse_args()
+
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    with tempfile.TemporaryDirectory() as directory:
+        app, (program_id,) = create_test_app(f"sqlite:///{os.path.join(directory, 'app.db')}", 1)
+        with app.app_context():
+            from src.models.user import db
+            from src.models.program import Program
+
+            db.session.get(Program, program_id).max_participants = args.bookings * 2
+            db.session.commit()
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {ADMIN_TOKEN}'}
+        if client.post(f'/api/bookings/import?program_id={program_id}', json=[]).status_code != 401:
+            raise SystemExit('❌ /api/bookings/import answers without admin credentials')
+
+        ranges = [(FIRST_DAY, FIRST_DAY + timedelta(days=2)), (FIRST_DAY + timedelta(days=14), FIRST_DAY + timedelta(days=16))]
+        moved = (ranges[0][0] + timedelta(days=7), ranges[0][1] + timedelta(days=7))
+        for index, (start, end) in enumerate(ranges):
+            rows = [{'client_name': f'Client {index}-{i}', 'client_email': f'client{index}.{i}@example.test'}
+                    for i in range(args.bookings)]
+            response = client.post(f'/api/bookings/import?program_id={program_id}&start_date={start}&end_date={end}',
+                                   headers=headers, json=rows)
+            if response.status_code != 200 or response.json['created'] != args.bookings:
+                raise SystemExit(f"❌ import -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        print(f"🚀 {args.bookings * 2} bookings over two date ranges")
+
+        problems = []
+        if client.post('/api/cohorts/cancel', json={'program_id': program_id}).status_code != 401:
+            problems.append('cohort routes answer without admin credentials')
+
+        started = time.perf_counter()
+        shift = client.post('/api/cohorts/shift', headers=headers, json={
+            'program_id': program_id, 'start_date': str(ranges[0][0]), 'end_date': str(ranges[0][1]), 'days': 7}).json
+        shift_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        cancel = client.post('/api/cohorts/cancel', headers=headers, json={
+            'program_id': program_id, 'start_date': str(ranges[1][0]), 'end_date': str(ranges[1][1])}).json
+        cancel_ms = (time.perf_counter() - started) * 1000
+        print(f"  shift  {shift['sessions']:>6} sessions {shift_ms:>9.1f} ms")
+        print(f"  cancel {cancel['sessions']:>6} sessions {cancel_ms:>9.1f} ms")
+
+        with app.app_context():
+            from sqlalchemy import func, select
+            from src.models.booking import Booking
+            from src.models.session import Session
+
+            statuses = dict(db.session.execute(
+                select(Session.status, func.count()).where(Session.session_date >= ranges[1][0]).group_by(Session.status)
+            ).all())
+            if statuses.get('cancelled', 0) != cancel['sessions'] or statuses.get('scheduled'):
+                problems.append(f"cancel reported {cancel['sessions']} sessions, rows read back: {statuses}")
+            cancelled = db.session.scalar(select(func.count()).select_from(Booking).where(Booking.booking_status == 'cancelled'))
+            if cancelled != cancel['bookings_cancelled']:
+                problems.append(f"cancel reported {cancel['bookings_cancelled']} bookings, {cancelled} rows are cancelled")
+            first, last = db.session.execute(
+                select(func.min(Session.session_date), func.max(Session.session_date)).where(Session.session_date < ranges[1][0])
+            ).one()
+            if (first, last) != moved:
+                problems.append(f'shifted sessions run from {first} to {last}')
+
+        for (start, end), expected in [(moved, args.bookings), (ranges[1], 0)]:
+            taken = client.get(f'/api/availability?program_id={program_id}&start_date={start}&end_date={end}').json['current_participants']
+            if taken != expected:
+                problems.append(f'{start}: {taken} seats taken, expected {expected}')
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Sessions, bookings and seats match the reported changes")
+
+
+if __name__ == "__main__":
+    main()
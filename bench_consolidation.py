@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Booking list, availability and create through the unified booking service, against
+the query shapes of the retired reinvent-booking-backend routes.
+
+    python bench_consolidation.py --bookings 2000 --programs 10 --requests 300
+
+Both run in one app on one seeded SQLite database: the unified endpoints under /api
+and the old handlers, reproduced on the canonical columns, under /legacy. The old
+list lazy-loaded program, trainer and user for every booking, the old availability
+loaded every overlapping booking to count them, and the old create neither reserved
+seats nor planned sessions.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.loadtest import create_test_app
+
+FIRST_DAY = date(2027, 1, 4)
+
+
+def legacy_blueprint():
+    from flask import Blueprint, jsonify, request
+    from src.models.user import db, User
+    from src.models.booking import Booking
+    from src.models.program import Program
+
+    legacy = Blueprint('bench_legacy_booking', __name__)
+
+    @legacy.route('/bookings', methods=['GET'])
+    def get_bookings():
+        query = Booking.query
+        if request.args.get('program_id'):
+            query = query.filter_by(program_id=request.args['program_id'])
+        result = []
+        for booking in query.all():
+            booking_dict = booking.to_dict()
+            booking_dict['program'] = booking.program.to_dict() if booking.program else None
+            booking_dict['trainer'] = booking.trainer.to_dict() if booking.trainer else None
+            booking_dict['user'] = booking.user.to_dict() if booking.user else None
+            result.append(booking_dict)
+        return jsonify(result), 200
+
+    @legacy.route('/availability', methods=['GET'])
+    def check_availability():
+        start_date = date.fromisoformat(request.args['start_date'])
+        end_date = date.fromisoformat(request.args['end_date'])
+        conflicting_bookings = Booking.query.filter(
+            Booking.program_id == request.args['program_id'],
+            Booking.booking_status.in_(['pending', 'confirmed']),
+            Booking.start_date <= end_date,
+            Booking.end_date >= start_date
+        ).all()
+        program = db.session.get(Program, request.args['program_id'])
+        available_spots = program.max_participants - len(conflicting_bookings)
+        return jsonify({'available': available_spots > 0, 'available_spots': max(0, available_spots)}), 200
+
+    @legacy.route('/bookings', methods=['POST'])
+    def create_booking():
+        data = request.get_json()
+        user = User.query.filter_by(email=data['client_email']).first()
+        if not user:
+            user = User(username=data['client_email'], email=data['client_email'], password_hash='')
+            db.session.add(user)
+            db.session.flush()
+        booking = Booking(
+            user_id=user.id,
+            program_id=data['program_id'],
+            start_date=date.fromisoformat(data['start_date']),
+            end_date=date.fromisoformat(data['end_date']),
+            total_amount=data['total_amount']
+        )
+        db.session.add(booking)
+        db.session.commit()
+        return jsonify(booking.to_dict()), 201
+
+    return legacy
+
+
+def booking_body(rng, program_ids, index):
+    start = FIRST_DAY + timedelta(days=rng.randrange(365))
+    return {
+        'client_name': f'Client {index}',
+        'client_email': f'client{index % 500}@example.test',
+        'program_id': rng.choice(program_ids),
+        'start_date': start.isoformat(),
+        'end_date': (start + timedelta(days=rng.randrange(3))).isoformat(),
+        'total_amount': 500,
+    }
+
+
+def timed(client, requests):
+    """Median and mean milliseconds over ``requests`` (method, path, body) tuples"""
+    samples = []
+    for method, path, body in requests:
+        started = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        samples.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise SystemExit(f"❌ {method} {path} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    samples.sort()
+    return samples[len(samples) // 2], sum(samples) / len(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=2000, help='bookings seeded before timing')
+    parser.add_argument('--programs', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=300, help='requests timed per endpoint')
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, program_ids = create_test_app(f"sqlite:///{os.path.join(directory, 'app.db')}", args.programs)
+        app.register_blueprint(legacy_blueprint(), url_prefix='/legacy')
+        client = app.test_client()
+
+        rng = random.Random(args.seed)
+        seeded = 0
+        for index in range(args.bookings * 2):
+            if seeded == args.bookings:
+                break
+            seeded += client.post('/api/bookings', json=booking_body(rng, program_ids, index)).status_code == 201
+        print(f"🚀 {seeded} bookings over {args.programs} programs, {args.requests} requests per endpoint")
+
+        rng = random.Random(args.seed + 1)
+        lists = [('GET', f'/bookings?program_id={rng.choice(program_ids)}', None) for _ in range(args.requests // 10 or 1)]
+        checks = []
+        for _ in range(args.requests):
+            start = FIRST_DAY + timedelta(days=rng.randrange(365))
+            checks.append(('GET', f'/availability?program_id={rng.choice(program_ids)}'
+                                  f'&start_date={start}&end_date={start + timedelta(days=4)}', None))
+        creates = [('POST', '/bookings', booking_body(rng, program_ids, args.bookings * 2 + i)) for i in range(args.requests)]
+
+        print(f"  {'endpoint':<14} {'legacy p50':>11} {'unified p50':>12} {'legacy mean':>12} {'unified mean':>13}")
+        for name, requests in [('list', lists), ('availability', checks), ('create', creates)]:
+            # Same requests on both sides; the unified creates find the clients the legacy ones added
+            legacy = timed(client, [(method, '/legacy' + path, body) for method, path, body in requests])
+            unified = timed(client, [(method, '/api' + path, body) for method, path, body in requests])
+            status = "✅" if unified[0] <= legacy[0] * 1.05 else "⚠️"
+            print(f"{status} {name:<14} {legacy[0]:>9.2f}ms {unified[0]:>10.2f}ms {legacy[1]:>10.2f}ms {unified[1]:>11.2f}ms")
+        print("  The legacy create reserves no seats and plans no sessions, so it is a floor, not a like-for-like number")
+
+
+if __name__ == "__main__":
+    main()
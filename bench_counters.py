@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark hot-row prayer_count updates against sharded counter increments.
+
+Requires a local Postgres with schema.sql applied and psycopg2 installed:
+    DATABASE_URL=postgresql://localhost/reinvent python bench_counters.py --threads 32
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+
+
+def connect(dsn):
+    try:
+        import psycopg2
+    except ImportError:
+        print("❌ psycopg2 is required for this benchmark (pip install psycopg2-binary)")
+        sys.exit(1)
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    return conn
+
+
+def create_prayer_request(dsn):
+    conn = connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute("SET session_replication_role = replica")  # skip auth FKs and triggers for setup
+        prayer_request_id = str(uuid.uuid4())
+        cur.execute(
+            "INSERT INTO prayer_requests (id, title, request_text) VALUES (%s, 'Benchmark', 'Benchmark')",
+            (prayer_request_id,)
+        )
+    conn.close()
+    return prayer_request_id
+
+
+def hot_row_update(cur, prayer_request_id):
+    cur.execute("UPDATE prayer_requests SET prayer_count = prayer_count + 1 WHERE id = %s", (prayer_request_id,))
+
+
+def sharded_update(cur, prayer_request_id):
+    cur.execute("SELECT add_counter_delta('prayer_requests', 'prayer_count', %s, 1)", (prayer_request_id,))
+
+
+def run(dsn, prayer_request_id, writer, threads, writes_per_thread):
+    connections = [connect(dsn) for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(conn):
+        with conn.cursor() as cur:
+            barrier.wait()
+            for _ in range(writes_per_thread):
+                writer(cur, prayer_request_id)
+
+    workers = [threading.Thread(target=worker, args=(conn,)) for conn in connections]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    for conn in connections:
+        conn.close()
+    return threads * writes_per_thread / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.getenv('DATABASE_URL', 'postgresql://localhost/reinvent'))
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16, 32])
+    parser.add_argument('--writes', type=int, default=500, help='writes per thread')
+    args = parser.parse_args()
+
+    prayer_request_id = create_prayer_request(args.dsn)
+
+    print("🚀 Prayer counter write throughput (writes/s)")
+    print("=" * 60)
+    print(f"{'threads':>8} {'hot row':>14} {'sharded':>14} {'speedup':>10}")
+    for threads in args.threads:
+        hot = run(args.dsn, prayer_request_id, hot_row_update, threads, args.writes)
+        sharded = run(args.dsn, prayer_request_id, sharded_update, threads, args.writes)
+        print(f"{threads:>8} {hot:>14.0f} {sharded:>14.0f} {sharded / hot:>9.2f}x")
+
+    conn = connect(args.dsn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT fold_counter_shards()")
+        cur.execute("DELETE FROM prayer_requests WHERE id = %s", (prayer_request_id,))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
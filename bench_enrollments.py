@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Payload size and latency of the user enrollment endpoints against the PostgREST stub.
+
+    python bench_enrollments.py --users 50 --enrollments-per-user 120 --stub-latency-ms 5
+
+Seeds programs shaped like schema.sql (long descriptions, curriculum JSONB, text
+arrays) and enrollments for every user, then compares the old
+``select('*, program:programs(*)')`` list with the card and detail presets, the first
+and a deep page, and a cached repeat of the same page.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.loadtest import create_test_app, start_stubs
+
+PARAGRAPH = ('Leaders grow through disciplined practice, honest feedback and a community that '
+             'holds them to account. ')
+
+
+def seed(postgrest, users, per_user, rng):
+    programs = []
+    for i in range(30):
+        programs.append({
+            'id': str(uuid.uuid4()),
+            'name': f'Leadership Program {i}',
+            'slug': f'leadership-{i}',
+            'description': PARAGRAPH * 4,
+            'long_description': PARAGRAPH * 40,
+            'price': 499 + i,
+            'duration_weeks': rng.choice([6, 8, 12]),
+            'biblical_foundation': PARAGRAPH * 10,
+            'learning_outcomes': [PARAGRAPH] * 8,
+            'target_audience': ['Executives', 'Managers', 'Pastors'],
+            'program_type': 'foundation',
+            'featured_image_url': f'https://cdn.example.test/programs/{i}.jpg',
+            'curriculum_overview': {'modules': [{'title': f'Module {m}', 'summary': PARAGRAPH * 2} for m in range(12)]},
+        })
+    postgrest.seed('programs', programs)
+
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for user_id in user_ids:
+        for _ in range(per_user):
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'user_id': user_id,
+                'program_id': rng.choice(programs)['id'],
+                'enrolled_at': (start + timedelta(minutes=rng.randint(0, 2_000_000))).isoformat(),
+                'payment_status': 'completed',
+                'payment_amount': 499,
+                'progress_percentage': rng.randint(0, 100),
+                'access_status': 'active',
+                'access_expires_at': None,
+            })
+    postgrest.seed('enrollments', rows)
+    return user_ids
+
+
+def measure(func, repeat):
+    durations = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return size, statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--enrollments-per-user', type=int, default=120)
+    parser.add_argument('--stub-latency-ms', type=float, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    stripe_stub, postgrest_stub = start_stubs(args.stub_latency_ms / 1000)
+    user_ids = seed(postgrest_stub, args.users, args.enrollments_per_user, random.Random(11))
+
+    from src.clients import supabase
+    from src.routes import payments
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, _ = create_test_app(f"sqlite:///{os.path.join(directory, 'bench.db')}", 1)
+        client = app.test_client()
+        user_id = user_ids[0]
+
+        def legacy():
+            rows = supabase.table('enrollments').select('*, program:programs(*)').eq('user_id', user_id) \
+                .order('enrolled_at', desc=True).execute().data
+            return len(app.json.dumps({'enrollments': rows}))
+
+        def endpoint(query, cached=False):
+            def call():
+                if not cached:
+                    payments.enrollments.invalidate(user_id)
+                response = client.get(f'/api/payments/user-enrollments/{user_id}{query}')
+                assert response.status_code == 200, response.get_json()
+                return len(response.data)
+            return call
+
+        cursor = None
+        for _ in range(3):
+            page = client.get(f'/api/payments/user-enrollments/{user_id}' + (f'?cursor={cursor}' if cursor else '')).get_json()
+            cursor = page['next_cursor']
+
+        print(f"🚀 {args.users} users x {args.enrollments_per_user} enrollments, stub latency {args.stub_latency_ms:g} ms")
+        for label, func in [
+            ("select('*, program:programs(*)'), all rows", legacy),
+            ('card preset, first page of 20', endpoint('')),
+            ('detail preset, first page of 20', endpoint('?fields=detail')),
+            ('card preset, fourth page', endpoint(f'?cursor={cursor}')),
+            ('card preset, cached first page', endpoint('', cached=True)),
+        ]:
+            size, median = measure(func, args.repeat)
+            print(f"  {label:<46} {size / 1024:>9.1f} KiB  p50 {median:>7.2f} ms")
+
+    stripe_stub.stop()
+    postgrest_stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Throughput of the group-booking import.
+
+    python bench_import.py --rows 500 2000 5000
+
+Posts attendee lists of each size to POST /api/bookings/import (as CSV) against a
+fresh SQLite database and reports rows per second, next to the same attendees sent
+one by one through POST /api/bookings.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.loadtest import create_test_app
+
+ADMIN_TOKEN = 'bench-import'
+
+
+def attendees_csv(rows, program_id, prefix):
+    lines = ['client_name,client_email,company,program_id,start_date,end_date']
+    lines.extend(f'Attendee {i},{prefix}.{i}@corp.example.test,Example Corp,{program_id},2030-03-04,2030-03-06'
+                 for i in range(rows))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[500, 2000, 5000])
+    parser.add_argument('--single', type=int, default=200, help='bookings sent one by one for comparison')
+    args = parser.parse_args()
+
+    os.environ['ADMIN_TOKEN'] = ADMIN_TOKEN
+    from src.models.user import db
+    from src.models.program import Program
+
+    with tempfile.TemporaryDirectory() as directory:
+        app, program_ids = create_test_app(f"sqlite:///{os.path.join(directory, 'import.db')}", 1)
+        with app.app_context():
+            db.session.get(Program, program_ids[0]).max_participants = 1000000
+            db.session.commit()
+        client = app.test_client()
+
+        started = time.perf_counter()
+        for i in range(args.single):
+            client.post('/api/bookings', json={
+                'client_name': f'Single {i}', 'client_email': f'single.{i}@corp.example.test',
+                'program_id': program_ids[0], 'start_date': '2030-03-04', 'end_date': '2030-03-06'})
+        elapsed = time.perf_counter() - started
+        print(f"🐢 POST /api/bookings one by one: {args.single} rows, {args.single / elapsed:,.0f} rows/s")
+
+        for run, rows in enumerate(args.rows):
+            body = attendees_csv(rows, program_ids[0], f'run{run}')
+            started = time.perf_counter()
+            response = client.post('/api/bookings/import', data=body, content_type='text/csv',
+                                   headers={'Authorization': f'Bearer {ADMIN_TOKEN}'})
+            elapsed = time.perf_counter() - started
+            report = response.get_json()
+            if response.status_code != 200 or report['failed']:
+                print(f"❌ Import of {rows} rows failed: {report.get('error') or report['results'][:3]}")
+                sys.exit(1)
+            print(f"🚀 POST /api/bookings/import: {rows} rows in {elapsed * 1000:,.0f} ms, {rows / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
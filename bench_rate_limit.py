@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of the shared token-bucket rate limiter, and one budget across processes.
+
+    python bench_rate_limit.py --iterations 200000 --clients 50000 --processes 4
+
+Times ``SharedBuckets.take`` for one hot client and for many distinct clients (slot
+lookups, evictions), then the ``rate_limit`` decorator around an empty view inside a
+request context. Finally ``--processes`` processes spend the same bucket at once; the
+number of allowed requests must equal the bucket capacity.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.rate_limit import SharedBuckets, rate_limit
+
+
+def per_call(func, iterations):
+    started = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def spend(path, slots, attempts, results):
+    buckets = SharedBuckets(path, slots)
+    allowed = sum(buckets.take('checkout:203.0.113.9', 500, 3600)[0] for _ in range(attempts))
+    results.put(allowed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--clients', type=int, default=50000)
+    parser.add_argument('--slots', type=int, default=65536)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    from flask import Flask
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'buckets.bin')
+        buckets = SharedBuckets(path, args.slots)
+        rng = random.Random(3)
+        addresses = [f'availability:10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}'
+                     for _ in range(args.clients)]
+
+        print(f"🚀 {args.iterations} checks, {args.slots} slots")
+        hot = per_call(lambda i: buckets.take('availability:198.51.100.7', 1000000, 1), args.iterations)
+        print(f"  {'take(), one client':<44} {hot:>7.2f} µs")
+        spread = per_call(lambda i: buckets.take(addresses[i % len(addresses)], 60, 60), args.iterations)
+        print(f"  {f'take(), {args.clients} clients round robin':<44} {spread:>7.2f} µs")
+
+        app = Flask(__name__)
+        app.config['RATE_LIMIT_ENABLED'] = True
+        import src.rate_limit as rate_limit_module
+        rate_limit_module._buckets = buckets
+
+        def view():
+            return ''
+
+        limited = rate_limit('bench', '1000000/second')(view)
+        with app.test_request_context('/api/availability', environ_base={'REMOTE_ADDR': '192.0.2.10'}):
+            bare = per_call(lambda i: view(), args.iterations)
+            decorated = per_call(lambda i: limited(), args.iterations)
+        print(f"  {'@rate_limit overhead per request':<44} {decorated - bare:>7.2f} µs")
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        attempts = 2000
+        workers = [context.Process(target=spend, args=(path, args.slots, attempts, results)) for _ in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        allowed = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        status = "✅" if allowed == 500 else "❌"
+        print(f"{status} {args.processes} processes x {attempts} requests against a 500/hour bucket: {allowed} allowed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark the SQLite FTS5 search index on a synthetic corpus.
+
+    python bench_search.py --rows 1000000 --budget-ms 20
+
+The corpus is built once in a temporary database (or --db) and reused on later runs.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import search_index
+
+WORDS = (
+    'leadership faith servant prayer grace wisdom calling purpose integrity vision '
+    'stewardship mentoring coaching workplace ministry scripture discipleship courage '
+    'humility excellence community hope renewal transformation character influence '
+    'strategy team culture growth foundation advanced certification workshop journey'
+).split()
+DOC_TYPES = ('program', 'module', 'forum_post', 'prayer_request')
+
+
+def build_corpus(engine, rows, batch_size=10000):
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        search_index.create_search_index(connection)
+        existing = connection.execute(text('SELECT COUNT(*) FROM search_document_keys')).scalar()
+    if existing >= rows:
+        return existing
+
+    print(f"🔄 Indexing {rows - existing:,} documents...")
+    started = time.perf_counter()
+    for offset in range(existing, rows, batch_size):
+        with engine.begin() as connection:
+            keys, docs = [], []
+            for i in range(offset, min(offset + batch_size, rows)):
+                doc_type = DOC_TYPES[i % len(DOC_TYPES)]
+                title = ' '.join(rng.choices(WORDS, k=rng.randint(2, 6))).title()
+                body = ' '.join(rng.choices(WORDS, k=40))
+                keys.append({'rowid': i + 1, 'doc_type': doc_type, 'doc_id': str(i)})
+                docs.append({'rowid': i + 1, 'doc_type': doc_type, 'doc_id': str(i), 'title': title, 'body': body})
+            connection.execute(text('INSERT INTO search_document_keys (rowid, doc_type, doc_id) VALUES (:rowid, :doc_type, :doc_id)'), keys)
+            connection.execute(text('INSERT INTO search_documents (rowid, doc_type, doc_id, title, body) VALUES (:rowid, :doc_type, :doc_id, :title, :body)'), docs)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO search_documents (search_documents) VALUES ('optimize')"))
+    print(f"✅ Indexed in {time.perf_counter() - started:.1f}s")
+    return rows
+
+
+def measure(fn, inputs):
+    timings = []
+    for value in inputs:
+        started = time.perf_counter()
+        fn(value)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'p99': timings[int(len(timings) * 0.99) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'reinvent_search_bench.db'))
+    parser.add_argument('--budget-ms', type=float, default=20.0, help='p99 autocomplete budget')
+    args = parser.parse_args()
+
+    engine = create_engine(f'sqlite:///{args.db}')
+    build_corpus(engine, args.rows)
+
+    rng = random.Random(7)
+    prefixes = [rng.choice(WORDS)[:rng.randint(2, 5)] for _ in range(args.queries)]
+    queries = [' '.join(rng.choices(WORDS, k=2)) for _ in range(args.queries)]
+
+    with engine.connect() as connection:
+        complete = measure(lambda p: search_index.autocomplete(connection, p), prefixes)
+        ranked = measure(lambda q: search_index.search(connection, q), queries[:100])
+
+    print("🚀 Search latency (ms)")
+    print("=" * 60)
+    for name, stats in (('autocomplete', complete), ('ranked search', ranked)):
+        print(f"{name:>14}: p50 {stats['p50']:.2f}  p95 {stats['p95']:.2f}  p99 {stats['p99']:.2f}")
+
+    if complete['p99'] > args.budget_ms:
+        print(f"❌ Autocomplete p99 {complete['p99']:.2f} ms exceeds the {args.budget_ms} ms budget")
+        sys.exit(1)
+    print(f"✅ Autocomplete within the {args.budget_ms} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for seat reservations.
+
+    python bench_seats.py --requests 400 --concurrency 200 --capacity 20
+
+Fires parallel POST /api/bookings for the same program and overlapping dates, then
+checks every date against the program's max_participants. Exits non-zero on any
+oversell. A second phase spreads the same load over many programs at 1, N/8 and N
+clients. On SQLite every write transaction takes the database lock (BEGIN IMMEDIATE),
+so bookings of different programs still run one at a time there and throughput stays
+flat or drops as clients are added; the per-date ledger rows only let them proceed in
+parallel on Postgres.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.loadtest import create_test_app, send, serve
+
+
+def fire(base_url, program_ids, requests, concurrency, start, seed):
+    statuses = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency)
+    per_worker = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        barrier.wait()
+        for _ in range(per_worker[index]):
+            offset = rng.randint(0, 3)
+            suffix = uuid.uuid4().hex[:12]
+            status, _ = send(base_url, 'POST', '/api/bookings', {
+                'client_name': f'Stress {suffix}',
+                'client_email': f'stress.{suffix}@example.test',
+                'program_id': rng.choice(program_ids),
+                'start_date': (start + timedelta(days=offset)).isoformat(),
+                'end_date': (start + timedelta(days=offset + 2)).isoformat(),
+            }, {})
+            with lock:
+                statuses[status] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses, time.perf_counter() - started
+
+
+def oversold_dates(app, program_ids):
+    from src.models.user import db
+    from src.models.booking import Booking
+    from src.models.program import Program
+
+    problems = []
+    with app.app_context():
+        for program_id in program_ids:
+            capacity = db.session.get(Program, program_id).max_participants
+            per_date = Counter()
+            for booking in Booking.query.filter(Booking.program_id == program_id, Booking.booking_status != 'cancelled'):
+                day = booking.start_date
+                while day <= booking.end_date:
+                    per_date[day] += 1
+                    day += timedelta(days=1)
+            problems.extend((program_id, day, count, capacity) for day, count in per_date.items() if count > capacity)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--capacity', type=int, default=20)
+    parser.add_argument('--spread-programs', type=int, default=12, help='programs used in the throughput phase')
+    parser.add_argument('--database-url', help='defaults to a fresh SQLite file')
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='reinvent-seats-'), 'app.db')}"
+    app, program_ids = create_test_app(database_url, 1 + args.spread_programs)
+    with app.app_context():
+        from src.models.user import db
+        from src.models.program import Program
+
+        for program in Program.query.all():
+            program.max_participants = args.capacity
+        db.session.commit()
+    server, base_url = serve(app)
+    start = date.today() + timedelta(days=30)
+
+    print(f"🚀 Contended phase: {args.requests} bookings, {args.concurrency} parallel clients, capacity {args.capacity}")
+    statuses, elapsed = fire(base_url, program_ids[:1], args.requests, args.concurrency, start, 1)
+    print(f"  statuses: {dict(sorted(statuses.items()))} in {elapsed:.2f}s")
+
+    print(f"🚀 Spread phase: {args.requests} bookings over {args.spread_programs} programs")
+    for concurrency in sorted({1, max(1, args.concurrency // 8), args.concurrency}):
+        requests = max(args.requests // 4, concurrency)
+        spread_statuses, spread_elapsed = fire(base_url, program_ids[1:], requests, concurrency, start + timedelta(days=60 + concurrency), 2)
+        print(f"  {concurrency:>4} clients: {requests / spread_elapsed:>8.1f} bookings/s  {dict(sorted(spread_statuses.items()))}")
+
+    server.shutdown()
+    problems = oversold_dates(app, program_ids)
+    if problems:
+        for program_id, day, count, capacity in problems[:20]:
+            print(f"❌ Program {program_id} oversold on {day}: {count} bookings for {capacity} seats")
+        sys.exit(1)
+    print("✅ Zero oversells")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Compare ``to_dict()`` + ``jsonify`` with the compiled schemas in src.serialization.
+
+    python bench_serialization.py --bookings 5000 --sessions 5 --programs 10000
+
+Rows are built in memory (no database), so the numbers isolate serialization and
+encoding. Each payload is timed for the legacy path, the full schema and a projection.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask, jsonify
+from sqlalchemy import inspect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import serialization
+from src.models.user import User
+from src.models.program import Program
+from src.models.trainer import Trainer
+from src.models.booking import Booking
+from src.models.session import Session
+from src.routes.booking import BOOKING_RELATIONS
+
+
+def synthetic(model, index, **overrides):
+    """Instance of ``model`` with every column filled according to its Python type"""
+    values = {}
+    for column in inspect(model).columns:
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            continue
+        if column.primary_key or column.foreign_keys:
+            value = index
+        elif python_type is str:
+            value = f'{column.key} {index}'
+        elif python_type is bool:
+            value = index % 2 == 0
+        elif python_type in (int, float, Decimal):
+            value = python_type(index % 997)
+        elif python_type is datetime:
+            value = datetime(2025, 1, 1, 9, 30) + timedelta(minutes=index)
+        elif python_type is date:
+            value = date(2025, 1, 1) + timedelta(days=index % 365)
+        else:
+            continue
+        values[column.key] = value
+    values.update(overrides)
+    return model(**values)
+
+
+def legacy_booking(booking):
+    booking_dict = booking.to_dict()
+    booking_dict['user'] = booking.user.to_dict() if booking.user else None
+    booking_dict['program'] = booking.program.to_dict() if booking.program else None
+    booking_dict['trainer'] = booking.trainer.to_dict() if booking.trainer else None
+    booking_dict['sessions'] = [session.to_dict() for session in booking.sessions]
+    return booking_dict
+
+
+def timed(label, func, repeat):
+    durations = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(func())
+        durations.append(time.perf_counter() - started)
+    best = min(durations) * 1000
+    print(f"  {label:<28} best {best:>8.1f} ms  median {statistics.median(durations) * 1000:>8.1f} ms  {size / 1024:>8.0f} KiB")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--sessions', type=int, default=5, help='sessions per booking')
+    parser.add_argument('--programs', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fields', default='id,start_date,end_date,booking_status,program.name,sessions.session_date',
+                        help='projection used for the booking payload')
+    args = parser.parse_args()
+
+    print(f"🔄 Encoder: {'orjson' if serialization.orjson is not None else 'stdlib json (pip install orjson for the fast path)'}")
+    programs = [synthetic(Program, i) for i in range(1, 51)]
+    trainers = [synthetic(Trainer, i) for i in range(1, 11)]
+    bookings = []
+    for i in range(1, args.bookings + 1):
+        booking = synthetic(Booking, i)
+        booking.user = synthetic(User, i)
+        booking.program = programs[i % len(programs)]
+        booking.trainer = trainers[i % len(trainers)]
+        booking.sessions = [synthetic(Session, i * args.sessions + n) for n in range(args.sessions)]
+        bookings.append(booking)
+    catalog = [synthetic(Program, i) for i in range(1, args.programs + 1)]
+
+    app = Flask(__name__)
+    with app.app_context():
+        full = serialization.schema_for(Booking, None, BOOKING_RELATIONS)
+        projected = serialization.schema_for(Booking, args.fields, BOOKING_RELATIONS)
+        program_schema = serialization.schema_for(Program)
+        program_projected = serialization.schema_for(Program, 'id,name,price')
+
+        print(f"🚀 {args.bookings:,} bookings with user, program, trainer and {args.sessions} sessions each")
+        legacy = timed('to_dict + jsonify', lambda: jsonify({'success': True, 'bookings': [legacy_booking(b) for b in bookings]}).get_data(), args.repeat)
+        fast = timed('schema + dumps', lambda: serialization.json_response({'success': True, 'bookings': full.dump_many(bookings)}).get_data(), args.repeat)
+        narrow = timed('projected schema + dumps', lambda: serialization.json_response({'success': True, 'bookings': projected.dump_many(bookings)}).get_data(), args.repeat)
+        print(f"  ✅ {legacy / fast:.1f}x faster, {legacy / narrow:.1f}x with ?fields={args.fields}")
+
+        print(f"🚀 {args.programs:,} programs")
+        legacy = timed('to_dict + jsonify', lambda: jsonify({'success': True, 'programs': [p.to_dict() for p in catalog]}).get_data(), args.repeat)
+        fast = timed('schema + dumps', lambda: serialization.json_response({'success': True, 'programs': program_schema.dump_many(catalog)}).get_data(), args.repeat)
+        narrow = timed('projected schema + dumps', lambda: serialization.json_response({'success': True, 'programs': program_projected.dump_many(catalog)}).get_data(), args.repeat)
+        print(f"  ✅ {legacy / fast:.1f}x faster, {legacy / narrow:.1f}x with ?fields=id,name,price")
+
+
+if __name__ == "__main__":
+    main()
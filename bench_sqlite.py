@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write throughput of the SQLite profiles under multiple gunicorn workers.
+
+    python bench_sqlite.py --workers 4 --threads 4 --concurrency 32 --duration 20
+
+For each profile a fresh database is seeded, the app is started with gunicorn
+(gthread workers) and driven with the load test scenarios. Errors are requests that
+failed, which on the default profile are mostly "database is locked".
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.loadtest import LoadTestContext, create_test_app, parse_mix, print_summary, run_load, send, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database_url, env, workers, threads):
+    port = free_port()
+    factory = f"src.main:create_app({{'SQLALCHEMY_DATABASE_URI': {database_url!r}}})"
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-k', 'gthread', '--threads', str(threads),
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', factory],
+        cwd=ROOT, env=env
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if send(base_url, 'GET', '/api/programs', None, {})[0] == 200:
+                return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("❌ gunicorn did not start within 30s")
+
+
+def run_profile(name, read_only, args, mix):
+    env = dict(os.environ, SQLITE_PROFILE=name, SQLITE_READ_ONLY='1' if read_only else '0', SLOW_QUERY_MS='60000',
+               RATE_LIMIT_ENABLED='0')
+    os.environ.update(SQLITE_PROFILE=name, SQLITE_READ_ONLY=env['SQLITE_READ_ONLY'])
+    directory = tempfile.mkdtemp(prefix='reinvent-sqlite-')
+    database_url = f"sqlite:///{os.path.join(directory, 'app.db')}"
+    _, program_ids = create_test_app(database_url, args.programs)
+
+    process, base_url = start_gunicorn(database_url, env, args.workers, args.threads)
+    try:
+        ctx = LoadTestContext(program_ids, [], None)
+        run_load(base_url, ctx, mix, args.concurrency, args.warmup, 0, args.seed + 1000)
+        results, elapsed = run_load(base_url, ctx, mix, args.concurrency, args.duration, 0, args.seed)
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+    return summarize(results, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='default,production', help='comma-separated SQLITE_PROFILE values')
+    parser.add_argument('--read-only', action='store_true', help='also run production with SQLITE_READ_ONLY=1')
+    parser.add_argument('--mix', default='catalog=5,availability=3,booking=2')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds of unrecorded warm-up')
+    parser.add_argument('--programs', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("❌ gunicorn is required for this benchmark (pip install gunicorn)")
+        sys.exit(1)
+
+    mix = parse_mix(args.mix)
+    runs = [(name, False) for name in args.profiles.split(',')]
+    if args.read_only:
+        runs.append(('production', True))
+
+    totals = {}
+    for name, read_only in runs:
+        label = f"{name}{' + read-only' if read_only else ''}"
+        print(f"\n🚀 {label}: {args.workers} workers x {args.threads} threads | concurrency {args.concurrency} | {args.duration:g}s")
+        summary = run_profile(name, read_only, args, mix)
+        print_summary(summary)
+        totals[label] = summary['total']
+
+    print(f"\n{'profile':<26} {'rps':>9} {'errors':>7} {'p95 ms':>9}")
+    for label, total in totals.items():
+        print(f"{label:<26} {total['throughput_rps']:>9.1f} {total['errors']:>7} {total['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start import time of the Flask app and enforce a budget.
+
+    python bench_startup.py --budget-ms 400 --top 15
+
+Runs ``python -X importtime -c "import src.main"`` in a fresh interpreter with the
+Stripe/Supabase variables unset, so any network or SDK work on the import path shows
+up as a failure or a regression. Exits non-zero when the budget is exceeded.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('stripe', 'supabase', 'postgrest', 'gotrue', 'httpx')
+
+
+def run_importtime(module):
+    env = {key: value for key, value in os.environ.items()
+           if not key.startswith(('STRIPE_', 'SUPABASE_'))}
+    env['PYTHONPATH'] = PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    return result, wall_ms
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='src.main')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', '400')))
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--runs', type=int, default=3, help='best of N runs')
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.runs):
+        result, wall_ms = run_importtime(args.module)
+        if result.returncode != 0:
+            print(f"❌ import {args.module} failed:")
+            print(result.stderr.splitlines()[-1] if result.stderr else 'no output')
+            sys.exit(1)
+        rows = parse_importtime(result.stderr)
+        total_ms = sum(self_us for _, self_us, _ in rows) / 1000
+        if best is None or total_ms < best[0]:
+            best = (total_ms, wall_ms, rows)
+
+    total_ms, wall_ms, rows = best
+    print(f"🚀 Cold import of {args.module}")
+    print("=" * 60)
+    print(f"{'cumulative ms':>14} {'self ms':>10}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>10.1f}  {name}")
+
+    imported = {name.strip() for name, _, _ in rows}
+    eager = [module for module in HEAVY_MODULES if module in imported]
+
+    print(f"\nTotal import time: {total_ms:.1f} ms (process wall {wall_ms:.1f} ms), budget {args.budget_ms:.0f} ms")
+    if eager:
+        print(f"❌ Imported at startup but should be lazy: {', '.join(eager)}")
+    if total_ms > args.budget_ms:
+        print("❌ Startup budget exceeded")
+    if eager or total_ms > args.budget_ms:
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,54 @@
-from flask import Blueprint, jsonify, request
-from src.models.user import db, User
-from src.models.program import Program
-from src.models.trainer import Trainer
+from flask import Blueprint, Response, jsonify, request, url_for
+from src.models.user import db
 from src.models.booking import Booking
-from src.models.session import Session
-from datetime import datetime, date, time, timedelta
+from src.cohorts import Cohort, cancel_cohort, shift_cohort
+from src.booking_import import MAX_BYTES, import_bookings, parse_csv, parse_json
+from src.booking_service import BookingError, canonical_fields
+from src.seats import SeatsUnavailable, release_seats, reserve_seats
+from src.rate_limit import rate_limit
+from src.routes.admin import admin_required
+from src.serialization import json_response, schema_for
+from src import booking_service, calendar_feed, reminders
+from datetime import datetime, date
+from functools import lru_cache
 from werkzeug.security import generate_password_hash
 import json
 
 booking_bp = Blueprint('booking', __name__)
 
+BOOKING_RELATIONS = ('user', 'program', 'trainer', 'sessions')
+
+@lru_cache(maxsize=1)
+def temporary_password_hash():
+    # Hashed once per process: hashing costs ~100 ms of CPU and runs inside the write transaction
+    return generate_password_hash('temp_password_123')
+
 @booking_bp.route('/bookings', methods=['GET'])
 def get_bookings():
     """Get all bookings with optional filtering"""
     try:
-        user_id = request.args.get('user_id')
-        status = request.args.get('status')
-        
-        query = Booking.query
-        
-        if user_id:
-            query = query.filter_by(user_id=user_id)
-        if status:
-            query = query.filter_by(booking_status=status)
-            
-        bookings = query.all()
-        
-        # Include related data
-        booking_data = []
-        for booking in bookings:
-            booking_dict = booking.to_dict()
-            booking_dict['user'] = booking.user.to_dict() if booking.user else None
-            booking_dict['program'] = booking.program.to_dict() if booking.program else None
-            booking_dict['trainer'] = booking.trainer.to_dict() if booking.trainer else None
-            booking_dict['sessions'] = [session.to_dict() for session in booking.sessions]
-            booking_data.append(booking_dict)
+        filters = canonical_fields(request.args)
         
-        return jsonify({
+        try:
+            schema = schema_for(Booking, request.args.get('fields'), BOOKING_RELATIONS)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        # Related rows are loaded in one query per relationship instead of per booking
+        bookings = booking_service.list_bookings(
+            schema.load_options(),
+            user_id=filters.get('user_id'),
+            status=filters.get('booking_status'),
+            program_id=filters.get('program_id')
+        )
+        
+        return json_response({
             'success': True,
-            'bookings': booking_data
-        }), 200
+            'bookings': schema.dump_many(bookings)
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -50,18 +59,20 @@ def get_bookings():
 def get_booking(booking_id):
     """Get a specific booking by ID"""
     try:
-        booking = Booking.query.get_or_404(booking_id)
+        try:
+            schema = schema_for(Booking, request.args.get('fields'), BOOKING_RELATIONS)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
-        booking_dict = booking.to_dict()
-        booking_dict['user'] = booking.user.to_dict() if booking.user else None
-        booking_dict['program'] = booking.program.to_dict() if booking.program else None
-        booking_dict['trainer'] = booking.trainer.to_dict() if booking.trainer else None
-        booking_dict['sessions'] = [session.to_dict() for session in booking.sessions]
+        booking = Booking.query.get_or_404(booking_id)
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'booking': booking_dict
-        }), 200
+            'booking': schema.dump(booking)
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -69,158 +80,29 @@ def get_booking(booking_id):
         }), 500
 
 @booking_bp.route('/bookings', methods=['POST'])
+@rate_limit('create_booking', '10/minute')
 def create_booking():
     """Create a new booking"""
     try:
-        data = request.get_json()
-        
-        # Check if this is a client booking (with client info) or user booking (with user_id)
-        if 'client_name' in data and 'client_email' in data:
-            # Handle client booking - create or find user
-            client_email = data['client_email']
-            client_name = data['client_name']
-            client_phone = data.get('client_phone', '')
-            
-            # Check if user already exists with this email
-            user = User.query.filter_by(email=client_email).first()
-            
-            if not user:
-                # Split client name into first and last name
-                name_parts = client_name.strip().split(' ', 1)
-                first_name = name_parts[0]
-                last_name = name_parts[1] if len(name_parts) > 1 else ''
-                
-                # Generate a username from email
-                username = client_email.split('@')[0]
-                
-                # Check if username already exists, if so, add a number
-                base_username = username
-                counter = 1
-                while User.query.filter_by(username=username).first():
-                    username = f"{base_username}{counter}"
-                    counter += 1
-                
-                # Create new user from client information
-                user = User(
-                    username=username,
-                    first_name=first_name,
-                    last_name=last_name,
-                    email=client_email,
-                    phone=client_phone,
-                    company=data.get('company', ''),
-                    position=data.get('position', ''),
-                    password_hash=generate_password_hash('temp_password_123')  # Temporary password
-                )
-                db.session.add(user)
-                db.session.flush()  # Get the user ID
-            
-            user_id = user.id
-            
-        elif 'user_id' in data:
-            # Handle existing user booking
-            user_id = data['user_id']
-            user = User.query.get(user_id)
-            if not user:
-                return jsonify({
-                    'success': False,
-                    'error': 'User not found'
-                }), 404
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Either user_id or client information (client_name, client_email) is required'
-            }), 400
-        
-        # Validate required fields
-        required_fields = ['program_id', 'start_date', 'end_date']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False,
-                    'error': f'Missing required field: {field}'
-                }), 400
-            
-        # Validate program exists
-        program = Program.query.get(data['program_id'])
-        if not program:
+        try:
+            booking, user = booking_service.create_booking(request.get_json(), temporary_password_hash())
+        except BookingError as e:
+            db.session.rollback()
             return jsonify({
                 'success': False,
-                'error': 'Program not found'
-            }), 404
-        
-        # Validate trainer if provided
-        trainer_id = data.get('trainer_id')
-        if trainer_id:
-            trainer = Trainer.query.get(trainer_id)
-            if not trainer:
-                return jsonify({
-                    'success': False,
-                    'error': 'Trainer not found'
-                }), 404
-        
-        # Parse dates
-        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-        
-        # Create booking
-        booking = Booking(
-            user_id=user_id,
-            program_id=data['program_id'],
-            trainer_id=trainer_id,
-            start_date=start_date,
-            end_date=end_date,
-            total_amount=data.get('total_amount', program.price),
-            special_requirements=data.get('special_requirements'),
-            payment_method=data.get('payment_method')
-        )
-        
-        db.session.add(booking)
-        db.session.flush()  # Get the booking ID
-        
-        # Create sessions based on program type
-        if program.program_type == 'intensive':
-            # For intensive programs, create daily sessions
-            current_date = start_date
-            while current_date <= end_date:
-                session = Session(
-                    booking_id=booking.id,
-                    session_date=current_date,
-                    start_time=time(9, 0),  # 9:00 AM
-                    end_time=time(17, 0),   # 5:00 PM
-                    session_type='group',
-                    location=data.get('location', 'TBD')
-                )
-                db.session.add(session)
-                current_date += timedelta(days=1)
-        
-        elif program.program_type == 'ongoing':
-            # For ongoing programs like RLAB, create weekly sessions
-            current_date = start_date
-            session_count = 0
-            max_sessions = 12  # 90 days / 7 days per week ≈ 12 sessions
-            
-            while current_date <= end_date and session_count < max_sessions:
-                session = Session(
-                    booking_id=booking.id,
-                    session_date=current_date,
-                    start_time=time(14, 0),  # 2:00 PM
-                    end_time=time(16, 0),    # 4:00 PM
-                    session_type='group',
-                    location=data.get('location', 'TBD')
-                )
-                db.session.add(session)
-                current_date += timedelta(days=7)  # Weekly sessions
-                session_count += 1
-        
-        db.session.commit()
+                'error': str(e)
+            }), e.status
         
-        # Return booking with related data
+        # Serialized before the commit expires the rows, which would reload each of them
         booking_dict = booking.to_dict()
         booking_dict['user'] = user.to_dict()
         booking_dict['program'] = booking.program.to_dict()
         booking_dict['trainer'] = booking.trainer.to_dict() if booking.trainer else None
         booking_dict['sessions'] = [session.to_dict() for session in booking.sessions]
         
+        db.session.commit()
+        reminders.booking_created(booking)
+        
         return jsonify({
             'success': True,
             'booking': booking_dict,
@@ -234,24 +116,148 @@ def create_booking():
             'error': str(e)
         }), 500
 
+@booking_bp.route('/bookings/import', methods=['POST'])
+@admin_required
+def import_group_bookings():
+    """Create bookings for a list of attendees sent as CSV or JSON (admin only)"""
+    try:
+        # Checked before anything is read; a body without Content-Length is not accepted
+        if request.content_length is None or request.content_length > MAX_BYTES:
+            return jsonify({
+                'success': False,
+                'error': f'Upload must be at most {MAX_BYTES} bytes'
+            }), 413
+        
+        dry_run = request.args.get('dry_run', 'false').lower() in ('1', 'true', 'yes')
+        atomic = request.args.get('atomic', 'false').lower() in ('1', 'true', 'yes')
+        # Query parameters such as program_id or start_date apply to every row
+        defaults = {key: value for key, value in request.args.items() if key not in ('dry_run', 'atomic')}
+        
+        try:
+            upload = request.files.get('file')
+            if upload is not None:
+                rows = parse_csv(upload.read().decode('utf-8'))
+            elif request.mimetype == 'text/csv':
+                rows = parse_csv(request.get_data(as_text=True))
+            else:
+                rows, json_defaults = parse_json(request.get_json())
+                defaults.update(json_defaults)
+        except (ValueError, UnicodeDecodeError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        report = import_bookings(rows, defaults, temporary_password_hash(), dry_run=dry_run, atomic=atomic)
+        if report['created']:
+            db.session.commit()
+            reminders.bookings_created([result['booking_id'] for result in report['results'] if result['status'] == 'created'])
+        else:
+            db.session.rollback()
+        
+        status = 422 if atomic and report['failed'] else 200
+        return jsonify({
+            'success': not (atomic and report['failed']),
+            **report
+        }), status
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _cohort_from(data):
+    def parsed_date(key):
+        return datetime.strptime(data[key], '%Y-%m-%d').date() if data.get(key) else None
+    return Cohort(data.get('program_id'), data.get('trainer_id'), parsed_date('start_date'), parsed_date('end_date'))
+
+def _apply_cohort_change(operation, data):
+    """Run a cohort operation; a dry run reports its counts and rolls back"""
+    try:
+        dry_run = bool(data.get('dry_run'))
+        try:
+            change = operation()
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        except SeatsUnavailable as e:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 409
+        
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+            change.announce()
+        
+        return jsonify({
+            'success': True,
+            **change.report(dry_run)
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@booking_bp.route('/cohorts/cancel', methods=['POST'])
+@admin_required
+def cancel_cohort_sessions():
+    """Cancel every session of a program and/or trainer, optionally within a date range"""
+    data = request.get_json() or {}
+    return _apply_cohort_change(lambda: cancel_cohort(_cohort_from(data), data.get('reason')), data)
+
+@booking_bp.route('/cohorts/shift', methods=['POST'])
+@admin_required
+def shift_cohort_sessions():
+    """Move every session of a program and/or trainer by a number of days"""
+    data = request.get_json() or {}
+    return _apply_cohort_change(lambda: shift_cohort(_cohort_from(data), int(data.get('days') or 0), data.get('reason')), data)
+
 @booking_bp.route('/bookings/<int:booking_id>', methods=['PUT'])
 def update_booking(booking_id):
     """Update a booking"""
     try:
         booking = Booking.query.get_or_404(booking_id)
-        data = request.get_json()
+        data = canonical_fields(request.get_json())
         
         # Update booking fields
         if 'payment_status' in data:
             booking.payment_status = data['payment_status']
         if 'booking_status' in data:
+            if data['booking_status'] == 'cancelled' and booking.booking_status != 'cancelled':
+                release_seats(booking.program_id, booking.start_date, booking.end_date)
+            elif data['booking_status'] != 'cancelled' and booking.booking_status == 'cancelled':
+                try:
+                    reserve_seats(booking.program, booking.start_date, booking.end_date)
+                except SeatsUnavailable as e:
+                    db.session.rollback()
+                    return jsonify({
+                        'success': False,
+                        'error': str(e)
+                    }), 409
             booking.booking_status = data['booking_status']
         if 'special_requirements' in data:
             booking.special_requirements = data['special_requirements']
         if 'payment_reference' in data:
             booking.payment_reference = data['payment_reference']
         
+        calendar_feed.touch_booking(booking)
         db.session.commit()
+        if booking.booking_status == 'cancelled':
+            reminders.booking_cancelled(booking)
+        elif 'booking_status' in data:
+            reminders.booking_created(booking)
         
         return jsonify({
             'success': True,
@@ -271,13 +277,17 @@ def cancel_booking(booking_id):
     try:
         booking = Booking.query.get_or_404(booking_id)
         
+        if booking.booking_status != 'cancelled':
+            release_seats(booking.program_id, booking.start_date, booking.end_date)
         booking.booking_status = 'cancelled'
         
         # Cancel all associated sessions
         for session in booking.sessions:
             session.status = 'cancelled'
         
+        calendar_feed.touch_booking(booking)
         db.session.commit()
+        reminders.booking_cancelled(booking)
         
         return jsonify({
             'success': True,
@@ -291,7 +301,101 @@ def cancel_booking(booking_id):
             'error': str(e)
         }), 500
 
+@booking_bp.route('/bookings/<int:booking_id>/confirm', methods=['POST'])
+def confirm_booking(booking_id):
+    """Confirm a booking"""
+    try:
+        booking = Booking.query.get_or_404(booking_id)
+        
+        if booking.booking_status == 'cancelled':
+            return jsonify({
+                'success': False,
+                'error': 'Cancelled bookings cannot be confirmed'
+            }), 409
+        booking.booking_status = 'confirmed'
+        
+        calendar_feed.touch_booking(booking)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Booking confirmed successfully'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def calendar_response(owner_type, owner_id, token):
+    """ICS feed of one owner, answered with 304 while the client's copy is current"""
+    # 404 rather than 403 so a wrong token does not confirm that the owner exists
+    if not calendar_feed.valid_feed_token(owner_type, owner_id, token):
+        return jsonify({
+            'success': False,
+            'error': 'Calendar not found'
+        }), 404
+    
+    try:
+        version, updated_at = calendar_feed.current_version(owner_type, owner_id)
+        etag = calendar_feed.etag_for(owner_type, owner_id, version)
+        
+        if calendar_feed.not_modified(request.environ, etag, updated_at):
+            response = Response(status=304)
+        else:
+            response = Response(calendar_feed.cache.feed(owner_type, owner_id, version), mimetype='text/calendar')
+            response.headers['Content-Disposition'] = f'inline; filename="{owner_type}-{owner_id}.ics"'
+        
+        response.set_etag(etag)
+        if updated_at:
+            response.last_modified = updated_at
+        # Clients may keep the feed but must revalidate it on every poll
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@booking_bp.route('/users/<int:user_id>/calendar/<token>.ics', methods=['GET'])
+def get_user_calendar(user_id, token):
+    """Subscription feed of a user's booked sessions"""
+    return calendar_response('user', user_id, token)
+
+@booking_bp.route('/trainers/<int:trainer_id>/calendar/<token>.ics', methods=['GET'])
+def get_trainer_calendar(trainer_id, token):
+    """Subscription feed of the sessions a trainer is booked for"""
+    return calendar_response('trainer', trainer_id, token)
+
+@booking_bp.route('/calendar-feeds/<owner_type>/<int:owner_id>', methods=['GET'])
+@admin_required
+def get_calendar_feed_url(owner_type, owner_id):
+    """Subscription URL of a user's or trainer's feed, to hand to its owner"""
+    if owner_type not in calendar_feed.OWNERS:
+        return jsonify({
+            'success': False,
+            'error': f"owner_type must be one of: {', '.join(calendar_feed.OWNERS)}"
+        }), 400
+    
+    token = calendar_feed.feed_token(owner_type, owner_id)
+    if not token:
+        return jsonify({
+            'success': False,
+            'error': 'Calendar feeds are disabled: set CALENDAR_FEED_SECRET'
+        }), 503
+    
+    endpoint = {'user': 'booking.get_user_calendar', 'trainer': 'booking.get_trainer_calendar'}[owner_type]
+    return jsonify({
+        'success': True,
+        'url': url_for(endpoint, token=token, _external=True, **{f'{owner_type}_id': owner_id})
+    }), 200
+
 @booking_bp.route('/availability', methods=['GET'])
+@rate_limit('availability', '60/minute')
 def check_availability():
     """Check availability for a program on specific dates"""
     try:
@@ -305,28 +409,22 @@ def check_availability():
                 'error': 'Missing required parameters: program_id, start_date, end_date'
             }), 400
         
-        program = Program.query.get_or_404(program_id)
-        
-        # Parse dates
-        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        
-        # Check for conflicting bookings
-        conflicting_bookings = Booking.query.filter(
-            Booking.program_id == program_id,
-            Booking.booking_status.in_(['confirmed', 'paid']),
-            Booking.start_date <= end_date,
-            Booking.end_date >= start_date
-        ).count()
-        
-        available_spots = program.max_participants - conflicting_bookings
-        is_available = available_spots > 0
+        try:
+            # Same ledger create_booking reserves against
+            result = booking_service.availability(
+                program_id,
+                booking_service.parse_date(start_date, 'start_date'),
+                booking_service.parse_date(end_date, 'end_date')
+            )
+        except BookingError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), e.status
         
         return jsonify({
             'success': True,
-            'available': is_available,
-            'available_spots': max(0, available_spots),
-            'max_participants': program.max_participants
+            **result
         }), 200
         
     except Exception as e:
@@ -0,0 +1,340 @@
+"""
+Bulk import of group bookings from a CSV or JSON attendee list.
+
+Rows are validated in full before anything is written: emails, users, programs and
+trainers are resolved with one ``IN`` query per table (per chunk of ``CHUNK`` keys),
+seats are reserved once per (program, start, end) group, and users, bookings and
+sessions are bulk-inserted in the caller's transaction. Every input row gets an entry
+in the report, so a spreadsheet with a few bad lines can be fixed and re-sent.
+
+Accepted columns (CSV headers are case-insensitive; ``defaults`` fill in blanks)::
+
+    client_name, client_email, client_phone, company, position   (or user_id)
+    program_id, trainer_id, start_date, end_date, total_amount,
+    special_requirements, payment_method, location
+"""
+
+import csv
+import io
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+from sqlalchemy import insert, or_, select
+from src.models.user import db, User
+from src.models.program import Program
+from src.models.trainer import Trainer
+from src.models.booking import Booking
+from src.models.session import Session
+from src.seats import SeatsUnavailable, available_seats, check_range, date_range, reserve_seats
+from src import calendar_feed
+
+MAX_ROWS = int(os.getenv('BOOKING_IMPORT_MAX_ROWS', '5000'))
+# Request body limit, checked against Content-Length before the upload is read
+MAX_BYTES = int(os.getenv('BOOKING_IMPORT_MAX_BYTES', str(4 * 1024 * 1024)))
+# Keys per IN (...) list; stays well below SQLite's bound-parameter limit
+CHUNK = 500
+INTEGER_FIELDS = ('user_id', 'program_id', 'trainer_id')
+TEXT_FIELDS = ('client_name', 'client_email', 'client_phone', 'company', 'position',
+               'special_requirements', 'payment_method', 'location')
+
+
+def session_plan(program_type, start_date, end_date):
+    """(date, start_time, end_time) of the sessions a booking of this program type gets"""
+    if program_type == 'intensive':
+        # Daily sessions, 9:00 AM to 5:00 PM
+        return [(day, time(9, 0), time(17, 0)) for day in date_range(start_date, end_date)]
+    if program_type == 'ongoing':
+        # Weekly sessions for programs like RLAB; 90 days / 7 days per week ≈ 12 sessions
+        return [(start_date + timedelta(days=offset), time(14, 0), time(16, 0))
+                for offset in range(0, (end_date - start_date).days + 1, 7)][:12]
+    return []
+
+
+def _normalize(row):
+    """Lower-cased, underscored keys; blank values dropped"""
+    result = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            continue
+        result[str(key).strip().lower().replace(' ', '_')] = value
+    return result
+
+
+def parse_csv(text):
+    """Rows of a CSV file with a header line"""
+    rows = [_normalize(row) for row in csv.DictReader(io.StringIO(text.lstrip('\ufeff')))]
+    return check_size(rows)
+
+
+def parse_json(payload):
+    """``[{...}, ...]`` or ``{"rows": [...], "defaults": {...}}`` -> (rows, defaults)"""
+    if isinstance(payload, dict):
+        rows, defaults = payload.get('rows'), payload.get('defaults') or {}
+    else:
+        rows, defaults = payload, {}
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows) or not isinstance(defaults, dict):
+        raise ValueError('Expected a list of row objects or {"rows": [...], "defaults": {...}}')
+    return check_size([_normalize(row) for row in rows]), _normalize(defaults)
+
+
+def check_size(rows):
+    if not rows:
+        raise ValueError('No rows to import')
+    if len(rows) > MAX_ROWS:
+        raise ValueError(f'At most {MAX_ROWS} rows can be imported at once')
+    return rows
+
+
+def _chunks(values):
+    values = list(values)
+    for offset in range(0, len(values), CHUNK):
+        yield values[offset:offset + CHUNK]
+
+
+def _lookup(columns, key, values):
+    """Rows of ``columns`` whose ``key`` is in ``values``, one query per chunk"""
+    rows = []
+    for chunk in _chunks(values):
+        rows.extend(db.session.execute(select(*columns).where(key.in_(chunk))).all())
+    return rows
+
+
+class Row:
+    __slots__ = ('number', 'data', 'errors', 'email', 'user_id', 'program', 'trainer_id',
+                 'start_date', 'end_date', 'total_amount', 'booking_id')
+
+    def __init__(self, number, data):
+        self.number = number
+        self.data = data
+        self.errors = []
+        self.email = None
+        self.user_id = None
+        self.program = None
+        self.trainer_id = None
+        self.start_date = None
+        self.end_date = None
+        self.total_amount = None
+        self.booking_id = None
+
+
+def _parse(number, data):
+    """Field-level checks that need no database access"""
+    row = Row(number, data)
+    for field in INTEGER_FIELDS:
+        if field in data:
+            try:
+                data[field] = int(data[field])
+            except (TypeError, ValueError):
+                row.errors.append(f'{field} must be an integer')
+    for field in TEXT_FIELDS:
+        if field in data:
+            data[field] = str(data[field])
+
+    if 'client_name' in data and 'client_email' in data:
+        row.email = data['client_email']
+        if '@' not in row.email:
+            row.errors.append('client_email is not a valid email address')
+    elif 'user_id' in data:
+        row.user_id = data['user_id']
+    else:
+        row.errors.append('Either user_id or client information (client_name, client_email) is required')
+
+    for field in ('program_id', 'start_date', 'end_date'):
+        if field not in data:
+            row.errors.append(f'Missing required field: {field}')
+    try:
+        if 'start_date' in data and 'end_date' in data:
+            row.start_date = datetime.strptime(str(data['start_date']), '%Y-%m-%d').date()
+            row.end_date = datetime.strptime(str(data['end_date']), '%Y-%m-%d').date()
+    except ValueError:
+        row.errors.append('start_date and end_date must be YYYY-MM-DD')
+    else:
+        if row.start_date and row.end_date:
+            try:
+                check_range(row.start_date, row.end_date)
+            except ValueError as e:
+                row.errors.append(str(e))
+    if 'total_amount' in data:
+        try:
+            row.total_amount = float(data['total_amount'])
+        except (TypeError, ValueError):
+            row.errors.append('total_amount must be a number')
+    return row
+
+
+def _resolve(rows):
+    """Look up users, programs and trainers for all rows at once"""
+    emails = {row.email for row in rows if row.email}
+    user_ids = {row.user_id for row in rows if row.user_id is not None}
+    program_ids = {row.data['program_id'] for row in rows if isinstance(row.data.get('program_id'), int)}
+    trainer_ids = {row.data['trainer_id'] for row in rows if isinstance(row.data.get('trainer_id'), int)}
+
+    users_by_email = dict(_lookup((User.email, User.id), User.email, emails))
+    known_users = {user_id for user_id, in _lookup((User.id,), User.id, user_ids)}
+    programs = {}
+    for chunk in _chunks(program_ids):
+        programs.update((program.id, program) for program in db.session.scalars(select(Program).where(Program.id.in_(chunk))))
+    trainers = {trainer_id for trainer_id, in _lookup((Trainer.id,), Trainer.id, trainer_ids)}
+
+    seen = {}
+    for row in rows:
+        if row.errors:
+            continue
+        if row.user_id is not None and row.user_id not in known_users:
+            row.errors.append('User not found')
+        if row.email:
+            row.user_id = users_by_email.get(row.email)
+        row.program = programs.get(row.data['program_id'])
+        if row.program is None:
+            row.errors.append('Program not found')
+        row.trainer_id = row.data.get('trainer_id')
+        if row.trainer_id is not None and row.trainer_id not in trainers:
+            row.errors.append('Trainer not found')
+        if row.total_amount is None and row.program is not None:
+            row.total_amount = row.program.price
+
+        key = (row.user_id if row.email is None else row.email, row.data['program_id'], row.start_date)
+        if not row.errors:
+            if key in seen:
+                row.errors.append(f'Duplicate of row {seen[key]}')
+            else:
+                seen[key] = row.number
+
+
+def _allocate_seats(rows, dry_run):
+    """Reserve one seat per row, group by group; rows that do not fit get an error"""
+    groups = defaultdict(list)
+    for row in rows:
+        if not row.errors:
+            groups[(row.program.id, row.start_date, row.end_date)].append(row)
+
+    # A dry run reserves nothing, so overlapping groups are tracked here instead
+    planned = Counter()
+    for (program_id, start_date, end_date), members in groups.items():
+        program = members[0].program
+        dates = date_range(start_date, end_date)
+        free = available_seats(program, start_date, end_date)
+        if dry_run:
+            free -= max(planned[(program_id, day)] for day in dates)
+        granted = max(0, min(len(members), free))
+        if granted and not dry_run:
+            try:
+                with db.session.begin_nested():
+                    reserve_seats(program, start_date, end_date, seats=granted)
+            except SeatsUnavailable:
+                granted = 0
+        for day in dates:
+            planned[(program_id, day)] += granted
+        for row in members[granted:]:
+            row.errors.append('No seats available for the selected dates')
+
+
+def _usernames(emails):
+    """Unused usernames derived from each email, as create_booking does one at a time"""
+    bases = {email: email.split('@')[0] for email in emails}
+    taken = {username for username, in _lookup((User.username,), User.username, set(bases.values()))}
+    colliding = {base for base in bases.values() if base in taken}
+    for chunk in _chunks(colliding):
+        taken.update(db.session.scalars(select(User.username).where(or_(*[User.username.like(f'{base}%') for base in chunk]))))
+
+    result = {}
+    for email, base in bases.items():
+        username = base
+        counter = 1
+        while username in taken:
+            username = f'{base}{counter}'
+            counter += 1
+        taken.add(username)
+        result[email] = username
+    return result
+
+
+def _insert(rows, password_hash):
+    new_users = {}
+    for row in rows:
+        if row.user_id is None and row.email not in new_users:
+            new_users[row.email] = row.data
+    if new_users:
+        usernames = _usernames(new_users)
+        user_rows = []
+        for email, data in new_users.items():
+            first_name, _, last_name = data['client_name'].partition(' ')
+            user_rows.append({
+                'username': usernames[email],
+                'first_name': first_name,
+                'last_name': last_name.strip(),
+                'email': email,
+                'phone': data.get('client_phone', ''),
+                'company': data.get('company', ''),
+                'position': data.get('position', ''),
+                'password_hash': password_hash,
+            })
+        created = dict(db.session.execute(insert(User).returning(User.email, User.id), user_rows).all())
+        for row in rows:
+            if row.user_id is None:
+                row.user_id = created[row.email]
+
+    booking_ids = db.session.scalars(insert(Booking).returning(Booking.id, sort_by_parameter_order=True), [{
+        'user_id': row.user_id,
+        'program_id': row.program.id,
+        'trainer_id': row.trainer_id,
+        'start_date': row.start_date,
+        'end_date': row.end_date,
+        'total_amount': row.total_amount,
+        'special_requirements': row.data.get('special_requirements'),
+        'payment_method': row.data.get('payment_method'),
+    } for row in rows]).all()
+
+    sessions = []
+    for row, booking_id in zip(rows, booking_ids):
+        row.booking_id = booking_id
+        location = row.data.get('location', 'TBD')
+        sessions.extend({
+            'booking_id': booking_id,
+            'session_date': day,
+            'start_time': start_time,
+            'end_time': end_time,
+            'session_type': 'group',
+            'location': location,
+        } for day, start_time, end_time in session_plan(row.program.program_type, row.start_date, row.end_date))
+    if sessions:
+        db.session.execute(insert(Session), sessions)
+    calendar_feed.touch_bookings([(row.booking_id, row.user_id, row.trainer_id) for row in rows])
+
+
+def import_bookings(records, defaults=None, password_hash=None, dry_run=False, atomic=False):
+    """Validate and insert bookings for ``records``; the caller commits or rolls back.
+
+    With ``atomic`` nothing is inserted unless every row is valid. A ``dry_run``
+    validates (seat availability included) without writing. Returns the report.
+    """
+    defaults = defaults or {}
+    rows = [_parse(number, {**defaults, **record}) for number, record in enumerate(records, start=1)]
+    _resolve(rows)
+    if not (atomic and any(row.errors for row in rows)):
+        _allocate_seats(rows, dry_run)
+
+    valid = [row for row in rows if not row.errors]
+    write = valid and not dry_run and not (atomic and len(valid) < len(rows))
+    if write:
+        _insert(valid, password_hash)
+
+    results = []
+    for row in rows:
+        if row.errors:
+            results.append({'row': row.number, 'status': 'error', 'error': '; '.join(row.errors)})
+        elif write:
+            results.append({'row': row.number, 'status': 'created', 'booking_id': row.booking_id, 'user_id': row.user_id})
+        else:
+            results.append({'row': row.number, 'status': 'valid' if dry_run else 'skipped'})
+    return {
+        'total': len(rows),
+        'created': len(valid) if write else 0,
+        'failed': len(rows) - len(valid),
+        'dry_run': dry_run,
+        'results': results,
+    }
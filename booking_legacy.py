@@ -0,0 +1,132 @@
+"""
+Responses in the shapes of the retired reinvent-booking-backend, for its clients.
+
+The old backend answered lists as a bare JSON array, single bookings as a bare object
+with ``status`` and the ``client_*`` details on it, and errors as ``{'error': ...}``.
+These routes run the same operations as src/routes/booking.py and only reshape the
+result. Mount the blueprint where the old backend's clients point (``/api/legacy``
+by default; proxy the old host's ``/api/`` there) until they move to ``/api``.
+"""
+
+from flask import Blueprint, jsonify, request
+from src.models.user import db
+from src.models.booking import Booking
+from src.booking_service import BookingError, canonical_fields
+from src.rate_limit import rate_limit
+from src.serialization import schema_for
+from src import booking_service
+from src.routes import booking as booking_routes
+
+legacy_booking_bp = Blueprint('legacy_booking', __name__)
+
+
+def legacy_dict(booking, sessions=False):
+    """A booking as the old backend returned it: canonical fields plus its old names"""
+    result = booking.to_dict()
+    user = booking.user
+    result.update(
+        status=booking.booking_status,
+        client_name=' '.join(part for part in (user.first_name, user.last_name) if part) if user else None,
+        client_email=user.email if user else None,
+        client_phone=user.phone if user else None,
+        company=user.company if user else None,
+        position=user.position if user else None,
+        program=booking.program.to_dict() if booking.program else None,
+        trainer=booking.trainer.to_dict() if booking.trainer else None,
+        user=user.to_dict() if user else None
+    )
+    if sessions:
+        result['sessions'] = [session.to_dict() for session in booking.sessions]
+    return result
+
+
+def unwrap(response, status=None):
+    """Strip the ``success`` envelope off a response of the unified routes"""
+    if isinstance(response, tuple):
+        response, status = response
+    payload = response.get_json()
+    status = status or response.status_code
+    if not payload.get('success'):
+        error = jsonify({'error': payload.get('error')})
+        if 'Retry-After' in response.headers:
+            error.headers['Retry-After'] = response.headers['Retry-After']
+        return error, status
+    payload.pop('success')
+    return payload, status
+
+
+@legacy_booking_bp.route('/bookings', methods=['GET'])
+def get_bookings():
+    try:
+        filters = canonical_fields(request.args)
+        schema = schema_for(Booking, None, ('user', 'program', 'trainer'))
+        bookings = booking_service.list_bookings(
+            schema.load_options(),
+            user_id=filters.get('user_id'),
+            status=filters.get('booking_status'),
+            program_id=filters.get('program_id')
+        )
+        return jsonify([legacy_dict(booking) for booking in bookings]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@legacy_booking_bp.route('/bookings/<int:booking_id>', methods=['GET'])
+def get_booking(booking_id):
+    try:
+        booking = db.session.get(Booking, booking_id)
+        if booking is None:
+            return jsonify({'error': 'Booking not found'}), 404
+        return jsonify(legacy_dict(booking, sessions=True)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@legacy_booking_bp.route('/bookings', methods=['POST'])
+def create_booking():
+    payload, status = unwrap(booking_routes.create_booking())
+    if status != 201:
+        return payload, status
+    return jsonify(legacy_dict(db.session.get(Booking, payload['booking']['id']))), 201
+
+
+@legacy_booking_bp.route('/bookings/<int:booking_id>', methods=['PUT'])
+def update_booking(booking_id):
+    payload, status = unwrap(booking_routes.update_booking(booking_id))
+    if status != 200:
+        return payload, status
+    return jsonify(legacy_dict(db.session.get(Booking, booking_id))), 200
+
+
+@legacy_booking_bp.route('/bookings/<int:booking_id>/cancel', methods=['POST'])
+def cancel_booking(booking_id):
+    payload, status = unwrap(booking_routes.cancel_booking(booking_id))
+    return (jsonify(payload) if status == 200 else payload), status
+
+
+@legacy_booking_bp.route('/bookings/<int:booking_id>/confirm', methods=['POST'])
+def confirm_booking(booking_id):
+    payload, status = unwrap(booking_routes.confirm_booking(booking_id))
+    return (jsonify(payload) if status == 200 else payload), status
+
+
+@legacy_booking_bp.route('/availability', methods=['GET'])
+@rate_limit('availability', '60/minute')
+def check_availability():
+    try:
+        program_id = request.args.get('program_id')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        if not all([program_id, start_date, end_date]):
+            return jsonify({'error': 'Missing required parameters'}), 400
+        try:
+            result = booking_service.availability(
+                program_id,
+                booking_service.parse_date(start_date, 'start_date'),
+                booking_service.parse_date(end_date, 'end_date')
+            )
+        except BookingError as e:
+            return jsonify({'error': str(e)}), e.status
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
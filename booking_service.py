@@ -0,0 +1,186 @@
+"""
+Booking operations behind the booking routes: listing, availability and creation.
+
+reinvent-booking-backend used to serve the same endpoints against another layout: it
+filtered on ``status``, copied the client's details onto every booking and counted
+availability by loading every overlapping booking. Its routes now live here and in
+src/routes/booking.py. Attendee details stay on the user, availability comes from the
+seat ledger, and ``canonical_fields`` still accepts the request names of the old
+backend, so its clients keep working.
+"""
+
+from datetime import datetime
+from sqlalchemy import or_, select
+from src.models.user import db, User
+from src.models.program import Program
+from src.models.trainer import Trainer
+from src.models.booking import Booking
+from src.models.session import Session
+from src.booking_import import session_plan
+from src.seats import SeatsUnavailable, available_seats, check_range, reserve_seats
+from src.sqlite_profile import read_bind
+from src import calendar_feed
+
+# Request names of reinvent-booking-backend -> canonical column names
+LEGACY_FIELDS = {'status': 'booking_status'}
+
+
+class BookingError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def canonical_fields(data):
+    """Rename legacy request fields; a canonical name sent alongside its alias wins"""
+    result = {LEGACY_FIELDS.get(key, key): value for key, value in data.items() if key not in LEGACY_FIELDS}
+    for legacy, canonical in LEGACY_FIELDS.items():
+        if legacy in data and canonical not in data:
+            result[canonical] = data[legacy]
+    return result
+
+
+def parse_date(value, field):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise BookingError(f'{field} must be a date (YYYY-MM-DD)', 400)
+
+
+def list_bookings(options=(), user_id=None, status=None, program_id=None):
+    """Bookings matching every given filter; ``options`` are loader options from the response schema"""
+    query = select(Booking).options(*options)
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    if status:
+        query = query.filter_by(booking_status=status)
+    if program_id:
+        query = query.filter_by(program_id=program_id)
+    return db.session.scalars(query, bind_arguments=read_bind()).all()
+
+
+def availability(program_id, start_date, end_date):
+    """Free seats on the fullest date of the range, read from the seat ledger"""
+    program = db.session.get(Program, program_id)
+    if not program:
+        raise BookingError('Program not found', 404)
+    try:
+        check_range(start_date, end_date)
+    except ValueError as e:
+        raise BookingError(str(e), 400)
+
+    available_spots = available_seats(program, start_date, end_date)
+    return {
+        'available': available_spots > 0,
+        'available_spots': max(0, available_spots),
+        'max_participants': program.max_participants,
+        'current_participants': program.max_participants - available_spots
+    }
+
+
+def client_user(data, password_hash):
+    """The user a booking is for: ``user_id``, or found or created from the client's details"""
+    if 'client_name' in data and 'client_email' in data:
+        client_email = data['client_email']
+        base_username = username = client_email.split('@')[0]
+        # The client by email and every username a new account could clash with, in one query
+        candidates = db.session.scalars(select(User).where(or_(
+            User.email == client_email,
+            User.username.startswith(base_username, autoescape=True)
+        ))).all()
+        for user in candidates:
+            if user.email == client_email:
+                return user
+
+        name_parts = data['client_name'].strip().split(' ', 1)
+        # Usernames come from the email; add a number while one is taken
+        taken = {user.username for user in candidates}
+        counter = 1
+        while username in taken:
+            username = f"{base_username}{counter}"
+            counter += 1
+
+        user = User(
+            username=username,
+            first_name=name_parts[0],
+            last_name=name_parts[1] if len(name_parts) > 1 else '',
+            email=client_email,
+            phone=data.get('client_phone', ''),
+            company=data.get('company', ''),
+            position=data.get('position', ''),
+            password_hash=password_hash
+        )
+        db.session.add(user)
+        db.session.flush()
+        return user
+
+    if 'user_id' in data:
+        user = db.session.get(User, data['user_id'])
+        if not user:
+            raise BookingError('User not found', 404)
+        return user
+
+    raise BookingError('Either user_id or client information (client_name, client_email) is required', 400)
+
+
+def create_booking(data, password_hash):
+    """Reserve seats and add a booking with its sessions. Returns (booking, user); the caller commits.
+
+    Everything the response needs is loaded by the time this returns, so the caller can
+    serialize before committing instead of reloading the rows afterwards.
+    """
+    user = client_user(data, password_hash)
+
+    for field in ('program_id', 'start_date', 'end_date'):
+        if field not in data:
+            raise BookingError(f'Missing required field: {field}', 400)
+
+    program = db.session.get(Program, data['program_id'])
+    if not program:
+        raise BookingError('Program not found', 404)
+
+    trainer_id = data.get('trainer_id')
+    if trainer_id and not db.session.get(Trainer, trainer_id):
+        raise BookingError('Trainer not found', 404)
+
+    start_date = parse_date(data['start_date'], 'start_date')
+    end_date = parse_date(data['end_date'], 'end_date')
+    try:
+        check_range(start_date, end_date)
+    except ValueError as e:
+        raise BookingError(str(e), 400)
+
+    # Take a seat on every date of the booking; fails instead of overselling
+    try:
+        reserve_seats(program, start_date, end_date)
+    except SeatsUnavailable as e:
+        raise BookingError(str(e), 409)
+
+    # Daily sessions for intensive programs, weekly ones for ongoing programs like RLAB
+    sessions = [
+        Session(
+            session_date=session_date,
+            start_time=start_time,
+            end_time=end_time,
+            session_type='group',
+            location=data.get('location', 'TBD')
+        )
+        for session_date, start_time, end_time in session_plan(program.program_type, start_date, end_date)
+    ]
+    booking = Booking(
+        user_id=user.id,
+        program=program,
+        trainer_id=trainer_id,
+        start_date=start_date,
+        end_date=end_date,
+        total_amount=data.get('total_amount', program.price),
+        special_requirements=data.get('special_requirements'),
+        payment_method=data.get('payment_method'),
+        sessions=sessions
+    )
+    db.session.add(booking)
+    # One flush inserts the booking and its sessions; the collection stays loaded for the response
+    db.session.flush()
+
+    calendar_feed.touch_booking(booking)
+    return booking, user
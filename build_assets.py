@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Fingerprint and precompress the static website for production.
+
+    python build_assets.py --source . --output static
+
+Every CSS/JS/image/font asset is copied to ``name.<hash>.ext``, references in HTML
+pages (and ``url()`` references in CSS) are rewritten to the fingerprinted names,
+and ``.br``/``.gz`` siblings are written in parallel for compressible files. The
+resulting ``asset-manifest.json`` is picked up by ``StaticManifest`` in main.py.
+
+References are resolved relative to the page first and then by file name, so pages
+authored for the ``css/``, ``js/`` and ``pages/`` layout still resolve in a flat tree;
+the rewritten reference points at where the fingerprinted file is actually written.
+
+The output directory is replaced on every build, so it must be empty, missing or hold
+an ``asset-manifest.json`` from an earlier build; anything else is left alone.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = 'asset-manifest.json'
+HASH_LENGTH = 10
+
+ASSET_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.ttf', '.otf',
+}
+PAGE_EXTENSIONS = {'.html'}
+COMPRESSIBLE_EXTENSIONS = {'.html', '.css', '.js', '.mjs', '.svg', '.json', '.ico', '.ttf', '.otf'}
+SKIP_DIRS = {'node_modules', '__pycache__', 'static', 'dist', 'build'}
+
+HTML_REF_RE = re.compile(r'''(\b(?:src|href)\s*=\s*["'])([^"'#?]+)([^"']*["'])''', re.IGNORECASE)
+CSS_URL_RE = re.compile(r'''(url\(\s*["']?)([^"')#?]+)([^"')]*["']?\s*\))''', re.IGNORECASE)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted_name(path, digest):
+    root, ext = posixpath.splitext(path)
+    return f'{root}.{digest}{ext}'
+
+
+def collect_files(source, output):
+    """Relative paths of assets and pages under ``source``"""
+    assets, pages = [], []
+    output = os.path.abspath(output)
+    for root, dirs, files in os.walk(source):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS
+                   and os.path.abspath(os.path.join(root, d)) != output]
+        for name in files:
+            rel_path = os.path.relpath(os.path.join(root, name), source).replace(os.sep, '/')
+            ext = posixpath.splitext(name)[1].lower()
+            if ext in ASSET_EXTENSIONS:
+                assets.append(rel_path)
+            elif ext in PAGE_EXTENSIONS:
+                pages.append(rel_path)
+    return sorted(assets), sorted(pages)
+
+
+class ReferenceResolver:
+    def __init__(self, assets):
+        self.assets = set(assets)
+        self.by_name = {}
+        for path in assets:
+            self.by_name.setdefault(posixpath.basename(path), []).append(path)
+
+    def resolve(self, ref, from_path):
+        """Source-relative asset path for a reference, or None for external/unknown refs"""
+        if re.match(r'^[a-z][a-z0-9+.-]*:|^//', ref, re.IGNORECASE):
+            return None
+        if ref.startswith('/'):
+            candidate = posixpath.normpath(ref.lstrip('/'))
+        else:
+            candidate = posixpath.normpath(posixpath.join(posixpath.dirname(from_path), ref))
+        if candidate in self.assets:
+            return candidate
+        matches = self.by_name.get(posixpath.basename(ref), [])
+        return matches[0] if len(matches) == 1 else None
+
+
+def rewrite(text, pattern, resolver, from_path, renamed):
+    def replace(match):
+        prefix, ref, suffix = match.groups()
+        target = resolver.resolve(ref.strip(), from_path)
+        if target is None or target not in renamed:
+            return match.group(0)
+        # The emitted path, relative to the referencing file (or to the root when authored absolute)
+        if ref.strip().startswith('/'):
+            new_ref = '/' + renamed[target]
+        else:
+            new_ref = posixpath.relpath(renamed[target], posixpath.dirname(from_path) or '.')
+        return f'{prefix}{new_ref}{suffix}'
+    return pattern.sub(replace, text)
+
+
+def clear_output(output):
+    """Remove an earlier build; refuse to touch a directory the build did not write"""
+    if not os.path.exists(output):
+        return
+    if not os.path.isdir(output):
+        raise SystemExit(f"❌ {output} exists and is not a directory")
+    if not os.listdir(output):
+        return
+    if not os.path.isfile(os.path.join(output, MANIFEST_NAME)):
+        raise SystemExit(f"❌ {output} is not empty and has no {MANIFEST_NAME}; refusing to delete it. "
+                         "Pass an empty or new directory as --output")
+    shutil.rmtree(output)
+
+
+def compress_file(path):
+    """Write .gz/.br siblings that are smaller than the original. Runs in a worker process."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    sizes = {'original': len(data)}
+
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gzipped) < len(data):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzipped)
+        sizes['gzip'] = len(gzipped)
+
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + '.br', 'wb') as f:
+                f.write(compressed)
+            sizes['br'] = len(compressed)
+    return path, sizes
+
+
+def build(source, output, workers=None):
+    assets, pages = collect_files(source, output)
+    resolver = ReferenceResolver(assets)
+    renamed = {}
+    contents = {}
+
+    def read(rel_path):
+        with open(os.path.join(source, rel_path), 'rb') as f:
+            return f.read()
+
+    # CSS can reference images and fonts, so everything else is fingerprinted first
+    for rel_path in sorted(assets, key=lambda p: p.endswith('.css')):
+        data = read(rel_path)
+        if rel_path.endswith('.css'):
+            data = rewrite(data.decode('utf-8'), CSS_URL_RE, resolver, rel_path, renamed).encode('utf-8')
+        renamed[rel_path] = fingerprinted_name(rel_path, content_hash(data))
+        contents[renamed[rel_path]] = data
+
+    for rel_path in pages:
+        html = read(rel_path).decode('utf-8')
+        contents[rel_path] = rewrite(html, HTML_REF_RE, resolver, rel_path, renamed).encode('utf-8')
+
+    clear_output(output)
+    for rel_path, data in contents.items():
+        out_path = os.path.join(output, rel_path)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, 'wb') as f:
+            f.write(data)
+
+    compressible = [
+        os.path.join(output, rel_path) for rel_path in contents
+        if posixpath.splitext(rel_path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        compressed = dict(pool.map(compress_file, compressible, chunksize=4))
+
+    files = {}
+    for rel_path, data in contents.items():
+        sizes = compressed.get(os.path.join(output, rel_path), {'original': len(data)})
+        files[rel_path] = {
+            'etag': content_hash(data),
+            'size': len(data),
+            'gzip': sizes.get('gzip'),
+            'br': sizes.get('br'),
+        }
+
+    manifest = {
+        'generated_at': int(time.time()),
+        'assets': {original: renamed[original] for original in sorted(renamed)},
+        'files': files,
+    }
+    with open(os.path.join(output, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def print_report(manifest):
+    print(f"{'asset':<48} {'original':>10} {'gzip':>10} {'brotli':>10} {'saved':>10}")
+    print("-" * 92)
+    total_original = total_best = 0
+    for rel_path, info in sorted(manifest['files'].items()):
+        best = min(size for size in (info['size'], info['gzip'], info['br']) if size is not None)
+        total_original += info['size']
+        total_best += best
+        gzip_size = f"{info['gzip']:,}" if info['gzip'] else '-'
+        br_size = f"{info['br']:,}" if info['br'] else '-'
+        print(f"{rel_path:<48} {info['size']:>10,} {gzip_size:>10} {br_size:>10} {info['size'] - best:>10,}")
+    print("-" * 92)
+    saved = total_original - total_best
+    percent = (saved / total_original * 100) if total_original else 0
+    print(f"{'total':<48} {total_original:>10,} {'':>10} {'':>10} {saved:>10,} ({percent:.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    parser.add_argument('--workers', type=int, default=None, help='compression processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("ℹ️  brotli is not installed; only .gz variants will be written (pip install brotli)")
+
+    started = time.perf_counter()
+    manifest = build(args.source, args.output, args.workers)
+    print_report(manifest)
+    print(f"\n✅ Built {len(manifest['files'])} files into {args.output} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
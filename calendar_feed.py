@@ -0,0 +1,279 @@
+"""
+iCalendar subscription feeds of booking sessions, per user and per trainer.
+
+Calendar apps poll a subscription URL every few minutes, so feeds are served from
+memory and rebuilt only when the schedule changes. ``schedule_versions`` holds a
+counter per booking, user and trainer; ``touch_booking`` bumps all three in the
+transaction that changes the booking (create_booking, update_booking and
+cancel_booking call it before committing).
+
+A poll costs one primary-key lookup of the owner's version. Clients that send the
+current ETag get a 304; otherwise the cached feed is returned if its version is
+current. When it is not, the feed is reassembled from per-booking VEVENT blocks and
+only bookings whose own version moved are rendered again.
+
+Changes made outside those routes (program renames, direct SQL) are not picked up
+until the booking is touched again.
+
+Feed URLs carry ``feed_token``, an HMAC of the owner keyed with CALENDAR_FEED_SECRET
+(or SECRET_KEY), because calendar apps cannot send credentials. Rotating the secret
+revokes every URL; without either variable no feed is served.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from werkzeug.http import is_resource_modified
+from src.models.user import db
+from src.models.booking import Booking
+from src.sqlite_profile import read_bind
+
+SESSION_TIMEZONE = os.getenv('SESSION_TIMEZONE', 'UTC')
+UID_DOMAIN = os.getenv('CALENDAR_UID_DOMAIN', 'reinvent-booking')
+MAX_CACHED_FEEDS = int(os.getenv('CALENDAR_CACHE_FEEDS', '5000'))
+MAX_CACHED_BOOKINGS = int(os.getenv('CALENDAR_CACHE_BOOKINGS', '50000'))
+# Bookings in these states are left out of feeds, which removes their events from subscribers
+HIDDEN_STATUSES = ('cancelled',)
+OWNERS = {'user': Booking.user_id, 'trainer': Booking.trainer_id}
+EPOCH = datetime(1970, 1, 1)
+FEED_SECRET = os.getenv('CALENDAR_FEED_SECRET') or os.getenv('SECRET_KEY')
+
+
+class ScheduleVersion(db.Model):
+    __tablename__ = 'schedule_versions'
+
+    owner_type = db.Column(db.String(20), primary_key=True)  # booking, user or trainer
+    owner_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+def _bump(row):
+    return db.session.execute(
+        update(ScheduleVersion)
+        .where(ScheduleVersion.owner_type == row['owner_type'], ScheduleVersion.owner_id == row['owner_id'])
+        .values(version=ScheduleVersion.version + 1, updated_at=row['updated_at'])
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _upsert(rows):
+    """Insert version rows, or bump the version of those that exist"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(ScheduleVersion)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['owner_type', 'owner_id'],
+            set_={'version': ScheduleVersion.version + 1, 'updated_at': statement.excluded.updated_at}
+        ), rows)
+        return
+    # No ON CONFLICT: update first, insert the rest in a savepoint and update again if
+    # another transaction inserted the row in between
+    for row in rows:
+        if _bump(row):
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(ScheduleVersion), [row])
+        except IntegrityError:
+            _bump(row)
+
+
+def touch_booking(booking):
+    """Bump the versions of a booking and the feeds it appears in; call before commit"""
+    touch_bookings([(booking.id, booking.user_id, booking.trainer_id)])
+
+
+def touch_bookings(bookings):
+    """``touch_booking`` for many ``(booking_id, user_id, trainer_id)`` in one statement"""
+    owners = {}
+    for booking_id, user_id, trainer_id in bookings:
+        owners[('booking', booking_id)] = None
+        owners[('user', user_id)] = None
+        if trainer_id:
+            owners[('trainer', trainer_id)] = None
+    if not owners:
+        return
+    # HTTP dates have one-second resolution
+    now = datetime.utcnow().replace(microsecond=0)
+    _upsert([
+        {'owner_type': owner_type, 'owner_id': owner_id, 'version': 1, 'updated_at': now}
+        for owner_type, owner_id in owners
+    ])
+
+
+def current_version(owner_type, owner_id):
+    """(version, updated_at) of a feed; (0, None) if it never changed"""
+    row = db.session.execute(
+        select(ScheduleVersion.version, ScheduleVersion.updated_at).where(
+            ScheduleVersion.owner_type == owner_type, ScheduleVersion.owner_id == owner_id
+        ),
+        bind_arguments=read_bind()
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def escape_text(value):
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold(line):
+    """Split a content line into 75-octet pieces (RFC 5545, 3.1)"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    pieces = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never cut a multi-byte character in half
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        pieces.append(encoded[start:end].decode('utf-8'))
+        start = end
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(pieces)
+
+
+def format_utc(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+class FeedCache:
+    """Rendered feeds per owner and VEVENT blocks per booking, each tagged with its version."""
+
+    def __init__(self, tz=None, max_feeds=MAX_CACHED_FEEDS, max_bookings=MAX_CACHED_BOOKINGS):
+        self.tz = ZoneInfo(tz or SESSION_TIMEZONE)
+        self.max_feeds = max_feeds
+        self.max_bookings = max_bookings
+        self._feeds = OrderedDict()  # (owner_type, owner_id) -> (version, body)
+        self._events = OrderedDict()  # booking_id -> (version, VEVENT text)
+        self._lock = threading.Lock()
+        self.rendered_bookings = 0
+
+    def render_booking(self, booking, version, stamp):
+        program_name = booking.program.name if booking.program else 'Session'
+        lines = []
+        for session in sorted(booking.sessions, key=lambda session: (session.session_date, session.start_time)):
+            if session.status == 'cancelled':
+                continue
+            starts = datetime.combine(session.session_date, session.start_time, self.tz)
+            ends = datetime.combine(session.session_date, session.end_time, self.tz)
+            description = f"{(session.session_type or 'group').title()} session, booking #{booking.id}"
+            lines += [
+                'BEGIN:VEVENT',
+                f'UID:session-{session.id}@{UID_DOMAIN}',
+                f'SEQUENCE:{version}',
+                f'DTSTAMP:{format_utc(stamp.replace(tzinfo=timezone.utc))}',
+                f'DTSTART:{format_utc(starts)}',
+                f'DTEND:{format_utc(ends)}',
+                f'SUMMARY:{escape_text(program_name)}',
+                f"LOCATION:{escape_text(session.location or 'TBD')}",
+                f'DESCRIPTION:{escape_text(description)}',
+                'STATUS:CONFIRMED' if booking.booking_status == 'confirmed' else 'STATUS:TENTATIVE',
+                'END:VEVENT',
+            ]
+        return '\r\n'.join(fold(line) for line in lines)
+
+    def _bookings(self, owner_type, owner_id):
+        """(booking id, version, updated_at) of every booking in the feed"""
+        return db.session.execute(
+            select(Booking.id, ScheduleVersion.version, ScheduleVersion.updated_at)
+            .outerjoin(ScheduleVersion, and_(ScheduleVersion.owner_type == 'booking', ScheduleVersion.owner_id == Booking.id))
+            .where(OWNERS[owner_type] == owner_id, Booking.booking_status.notin_(HIDDEN_STATUSES))
+            .order_by(Booking.start_date, Booking.id),
+            bind_arguments=read_bind()
+        ).all()
+
+    def _events_for(self, rows):
+        with self._lock:
+            cached = {row.id: self._events.get(row.id) for row in rows}
+        stale = {row.id: row for row in rows if cached[row.id] is None or cached[row.id][0] != (row.version or 0)}
+        if stale:
+            bookings = db.session.scalars(
+                select(Booking).where(Booking.id.in_(list(stale)))
+                .options(selectinload(Booking.sessions), selectinload(Booking.program)),
+                bind_arguments=read_bind()
+            ).all()
+            for booking in bookings:
+                row = stale[booking.id]
+                version = row.version or 0
+                cached[booking.id] = (version, self.render_booking(booking, version, row.updated_at or booking.created_at or EPOCH))
+            self.rendered_bookings += len(bookings)
+            with self._lock:
+                for booking_id in stale:
+                    if cached[booking_id] is not None:
+                        self._events[booking_id] = cached[booking_id]
+                        self._events.move_to_end(booking_id)
+                while len(self._events) > self.max_bookings:
+                    self._events.popitem(last=False)
+        return [cached[row.id][1] for row in rows if cached[row.id] and cached[row.id][1]]
+
+    def feed(self, owner_type, owner_id, version):
+        """ICS body of a feed at ``version``, rebuilt from per-booking blocks when stale"""
+        key = (owner_type, owner_id)
+        with self._lock:
+            cached = self._feeds.get(key)
+            if cached and cached[0] == version:
+                self._feeds.move_to_end(key)
+                return cached[1]
+
+        events = self._events_for(self._bookings(owner_type, owner_id))
+        body = '\r\n'.join([
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            f'PRODID:-//Reinvent//Booking {owner_type.title()} Feed//EN',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            'X-WR-CALNAME:Reinvent sessions',
+            'REFRESH-INTERVAL;VALUE=DURATION:PT15M',
+            *events,
+            'END:VCALENDAR',
+            '',
+        ])
+        with self._lock:
+            # A newer version may have been stored by another request meanwhile
+            if key not in self._feeds or self._feeds[key][0] <= version:
+                self._feeds[key] = (version, body)
+                self._feeds.move_to_end(key)
+            while len(self._feeds) > self.max_feeds:
+                self._feeds.popitem(last=False)
+        return body
+
+
+cache = FeedCache()
+
+
+def feed_token(owner_type, owner_id):
+    """Unguessable token of one owner's feed URL, or None when no secret is configured"""
+    if not FEED_SECRET:
+        return None
+    message = f'{owner_type}:{owner_id}'.encode()
+    return hmac.new(FEED_SECRET.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def valid_feed_token(owner_type, owner_id, token):
+    expected = feed_token(owner_type, owner_id)
+    return bool(expected) and hmac.compare_digest(expected, token)
+
+
+def etag_for(owner_type, owner_id, version):
+    return f'{owner_type}-{owner_id}-v{version}'
+
+
+def not_modified(environ, etag, updated_at):
+    """True if the client's If-None-Match / If-Modified-Since already covers this version"""
+    return not is_resource_modified(environ, etag=etag, last_modified=updated_at)
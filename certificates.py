@@ -0,0 +1,269 @@
+"""
+Certificate PDFs for completed enrollments, rendered off the request path.
+
+``CertificateIssuer`` pages through enrollments that have ``completed_at`` but no
+certificate yet (served by a partial index, see "Certificates" in schema.sql), renders
+each batch in a process pool and records every batch with one ``issue_certificates``
+call. Workers are spawned rather than forked: web processes run background threads
+(reminders, counters) that must not be copied mid-operation.
+
+The layout is parsed once per worker into a ``CertificateTemplate``: the PDF objects
+that never change, the static text lines and their centring are serialized up front,
+so a render only formats the lines that contain fields and writes the xref. Files go
+to a content-addressed store (``<sha256>.pdf``), which makes re-runs idempotent and
+lets the download route cache them forever.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from string import Formatter
+
+logger = logging.getLogger('reinvent.certificates')
+
+CERTIFICATE_DIR = os.getenv('CERTIFICATE_DIR', os.path.join(os.path.dirname(__file__), 'certificates'))
+CERTIFICATE_URL_PREFIX = os.getenv('CERTIFICATE_URL_PREFIX', '/api/payments/certificates/')
+# Optional JSON file with the same shape as DEFAULT_LAYOUT
+CERTIFICATE_TEMPLATE = os.getenv('CERTIFICATE_TEMPLATE')
+DEFAULT_BATCH_SIZE = int(os.getenv('CERTIFICATE_BATCH_SIZE', '200'))
+DEFAULT_WORKERS = int(os.getenv('CERTIFICATE_WORKERS', '0')) or os.cpu_count() or 1
+# Rows handed to a worker at a time; large enough to amortize the pickling round trip
+CHUNK_SIZE = 25
+
+PENDING_COLUMNS = 'id, completed_at, profile:profiles(full_name, email), program:programs(name)'
+
+# US Letter, landscape. Lines are centred; "{field}" is filled per certificate.
+DEFAULT_LAYOUT = {
+    'page': [792, 612],
+    'border': [[24, 3, [0.12, 0.23, 0.42]], [36, 1, [0.72, 0.58, 0.26]]],
+    'lines': [
+        {'text': 'REINVENT LEADERSHIP', 'size': 14, 'y': 520},
+        {'text': 'Certificate of Completion', 'size': 38, 'y': 455},
+        {'text': 'This certifies that', 'size': 14, 'y': 395},
+        {'text': '{full_name}', 'size': 34, 'y': 340, 'font': 'italic'},
+        {'text': 'has successfully completed', 'size': 14, 'y': 290},
+        {'text': '{program_name}', 'size': 22, 'y': 250},
+        {'text': 'Completed {completed_on}', 'size': 12, 'y': 190},
+        {'text': 'Certificate {certificate_id}', 'size': 8, 'y': 60},
+    ],
+}
+
+FONTS = {'regular': ('F1', 'Helvetica'), 'italic': ('F2', 'Helvetica-Oblique')}
+
+# Helvetica advance widths (1/1000 em) for ASCII 32-126; Helvetica-Oblique shares them
+_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+
+
+def text_width(encoded, size):
+    return sum(_WIDTHS[byte - 32] if 32 <= byte <= 126 else 556 for byte in encoded) * size / 1000
+
+
+def _pdf_string(encoded):
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class CertificateTemplate:
+    """A layout parsed into the byte segments every certificate shares"""
+
+    def __init__(self, layout):
+        self.width, self.height = layout['page']
+        self.max_text_width = self.width - 2 * (max((inset for inset, _, _ in layout.get('border', [])), default=0) + 24)
+
+        # Static lines are serialized once; lines with fields keep their format string
+        static = []
+        for inset, line_width, (red, green, blue) in layout.get('border', []):
+            static.append(f'q {red} {green} {blue} RG {line_width} w {inset} {inset} '
+                          f'{self.width - 2 * inset} {self.height - 2 * inset} re S Q'.encode('ascii'))
+        self.fields = set()
+        self.lines = []
+        for line in layout['lines']:
+            font = FONTS[line.get('font', 'regular')][0]
+            names = {name for _, name, _, _ in Formatter().parse(line['text']) if name}
+            if names:
+                self.fields |= names
+                self.lines.append((line['text'], font, line['size'], line['y']))
+            else:
+                static.append(self._line(line['text'], font, line['size'], line['y']))
+        self.static_content = b'\n'.join(static)
+
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.width} {self.height}] '
+            f'/Resources << /Font << {" ".join(f"/{key} {number} 0 R" for number, (key, _) in enumerate(FONTS.values(), 4))} >> >> '
+            f'/Contents {4 + len(FONTS)} 0 R >>'.encode('ascii'),
+        ] + [
+            f'<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding /WinAnsiEncoding >>'.encode('ascii')
+            for _, name in FONTS.values()
+        ]
+        self.head = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self.offsets = []
+        for number, body in enumerate(objects, 1):
+            self.offsets.append(len(self.head))
+            self.head += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        self.head = bytes(self.head)
+        self.xref_entries = b'0000000000 65535 f \n' + b''.join(b'%010d 00000 n \n' % offset for offset in self.offsets)
+        self.object_count = len(objects) + 2  # the content stream and object 0
+
+    def _line(self, text, font, size, y):
+        encoded = text.encode('cp1252', errors='replace')
+        width = text_width(encoded, size)
+        if width > self.max_text_width:
+            size = size * self.max_text_width / width
+            width = self.max_text_width
+        x = (self.width - width) / 2
+        return b'BT /%s %.2f Tf %.2f %d Td %s Tj ET' % (font.encode('ascii'), size, x, y, _pdf_string(encoded))
+
+    def render(self, fields):
+        content = self.static_content + b''.join(
+            b'\n' + self._line(text.format(**fields), font, size, y) for text, font, size, y in self.lines
+        )
+        stream_offset = len(self.head)
+        stream = b'%d 0 obj\n<< /Length %d >>\nstream\n%s\nendstream\nendobj\n' % (
+            self.object_count - 1, len(content), content)
+        xref_offset = stream_offset + len(stream)
+        return b''.join([
+            self.head, stream,
+            b'xref\n0 %d\n' % self.object_count, self.xref_entries, b'%010d 00000 n \n' % stream_offset,
+            b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (self.object_count, xref_offset),
+        ])
+
+
+@lru_cache(maxsize=4)
+def load_template(path=None):
+    if path:
+        with open(path, encoding='utf-8') as handle:
+            return CertificateTemplate(json.load(handle))
+    return CertificateTemplate(DEFAULT_LAYOUT)
+
+
+class ContentStore:
+    """Files named by the SHA-256 of their bytes, fanned out by the first two hex digits"""
+
+    def __init__(self, root=CERTIFICATE_DIR):
+        self.root = root
+
+    def path_for(self, digest):
+        return os.path.join(self.root, digest[:2], f'{digest}.pdf')
+
+    def put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(temporary, path)
+        return digest
+
+
+def certificate_fields(row):
+    """Template fields for an enrollment row selected with PENDING_COLUMNS"""
+    profile = row.get('profile') or {}
+    completed_at = datetime.fromisoformat(row['completed_at'].replace('Z', '+00:00'))
+    return {
+        'full_name': profile.get('full_name') or profile.get('email') or 'Participant',
+        'program_name': (row.get('program') or {}).get('name') or '',
+        'completed_on': f'{completed_at:%B} {completed_at.day}, {completed_at.year}',
+        'certificate_id': row['id'],
+    }
+
+
+# Per-worker state, set by _init_worker
+_template = None
+_store = None
+
+
+def _init_worker(template_path, store_root):
+    global _template, _store
+    _template = load_template(template_path)
+    _store = ContentStore(store_root)
+
+
+def render_chunk(rows):
+    """-> [(enrollment_id, digest or None, error or None)], run inside a worker"""
+    results = []
+    for row in rows:
+        try:
+            results.append((row['id'], _store.put(_template.render(certificate_fields(row))), None))
+        except Exception as e:
+            results.append((row['id'], None, str(e)))
+    return results
+
+
+class CertificateIssuer:
+    def __init__(self, supabase, store_root=CERTIFICATE_DIR, template_path=CERTIFICATE_TEMPLATE,
+                 workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, url_prefix=CERTIFICATE_URL_PREFIX):
+        if workers <= 0 or batch_size <= 0:
+            raise ValueError('workers and batch_size must be positive')
+        self.supabase = supabase
+        self.store_root = store_root
+        self.template_path = template_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.url_prefix = url_prefix
+
+    def pending(self, after=None):
+        """Next batch of completed enrollments without a certificate, in id order"""
+        query = self.supabase.table('enrollments').select(PENDING_COLUMNS) \
+            .not_.is_('completed_at', 'null').is_('certificate_issued_at', 'null')
+        if after:
+            query = query.gt('id', after)
+        return query.order('id').limit(self.batch_size).execute().data or []
+
+    def issue(self, max_rows=None):
+        """Render and record certificates until none are pending (or ``max_rows``).
+
+        Returns {'rendered', 'failed', 'batches', 'seconds', 'renders_per_second'}.
+        """
+        stats = {'rendered': 0, 'failed': 0, 'batches': 0}
+        remaining = max_rows
+        started = time.perf_counter()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(self.template_path, self.store_root)) as pool:
+            rows = self.pending()
+            while rows:
+                if remaining is not None:
+                    rows = rows[:remaining]
+                    remaining -= len(rows)
+                futures = [pool.submit(render_chunk, rows[i:i + CHUNK_SIZE]) for i in range(0, len(rows), CHUNK_SIZE)]
+                # The next page is fetched while the workers render this one
+                more = len(rows) == self.batch_size and remaining != 0
+                next_rows = self.pending(rows[-1]['id']) if more else []
+
+                issued = []
+                for future in futures:
+                    for enrollment_id, digest, error in future.result():
+                        if digest:
+                            issued.append({'id': enrollment_id, 'url': f'{self.url_prefix}{digest}.pdf'})
+                        else:
+                            stats['failed'] += 1
+                            logger.error('Certificate for enrollment %s failed: %s', enrollment_id, error)
+                if issued:
+                    self.supabase.rpc('issue_certificates', {'p_certificates': issued}).execute()
+                stats['rendered'] += len(issued)
+                stats['batches'] += 1
+                rows = next_rows
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        stats['renders_per_second'] = round(stats['rendered'] / stats['seconds'], 1) if stats['seconds'] else 0
+        if stats['rendered'] or stats['failed']:
+            logger.info('Certificates: %d rendered, %d failed in %.1fs (%.0f renders/s)', stats['rendered'],
+                        stats['failed'], stats['seconds'], stats['renders_per_second'])
+        return stats
@@ -0,0 +1,62 @@
+"""
+Lazily initialised external clients.
+
+Importing a route module must not import stripe or open a Supabase client: workers
+would pay for it on every cold start and fail outright when Supabase is unreachable.
+``supabase`` and ``stripe`` are proxies that build the real object on first use;
+both are wrapped for outbound call timing (see src/metrics.py).
+"""
+
+import os
+import threading
+
+
+class LazyProxy:
+    """Forward attribute access to an object created by ``factory`` on first use"""
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _get(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, '_instance', instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+    @property
+    def initialized(self):
+        return self._instance is not None
+
+
+def _create_supabase():
+    from supabase import create_client
+    from src.metrics import instrument_supabase
+
+    return instrument_supabase(create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_KEY')))
+
+
+def _import_stripe():
+    import stripe as stripe_module
+    from src.metrics import instrument_stripe
+
+    stripe_module.api_key = os.getenv('STRIPE_SECRET_KEY')
+    # Points the SDK at a local stand-in for load tests
+    if os.getenv('STRIPE_API_BASE'):
+        stripe_module.api_base = os.getenv('STRIPE_API_BASE')
+    return instrument_stripe(stripe_module)
+
+
+supabase = LazyProxy(_create_supabase)
+stripe = LazyProxy(_import_stripe)
@@ -0,0 +1,154 @@
+from flask import Blueprint, g, request, jsonify, current_app
+from src.clients import supabase
+from src import reminders
+from src.routes.admin import login_required
+from src.scheduling import SlotFinder, isoformat, parse_timestamp
+
+MAX_RANGE_DAYS = 31
+# exclusion_violation: coaching_sessions_no_overlap in schema.sql
+OVERLAP_ERROR = '23P01'
+
+# Free intervals are cached per coach-week and dropped when a session is booked here
+finder = SlotFinder(supabase)
+
+coaching_bp = Blueprint('coaching', __name__)
+
+def parse_window():
+    """start/end query parameters (ISO 8601) as timestamps"""
+    try:
+        start = parse_timestamp(request.args['start'])
+        end = parse_timestamp(request.args['end'])
+    except (KeyError, ValueError):
+        raise ValueError('start and end must be ISO 8601 timestamps')
+    if not 0 < end - start <= MAX_RANGE_DAYS * 86400:
+        raise ValueError(f'end must be after start and at most {MAX_RANGE_DAYS} days later')
+    return start, end
+
+@coaching_bp.route('/coaches/<coach_id>/slots', methods=['GET'])
+def get_coach_slots(coach_id):
+    """Bookable slots of one coach"""
+    try:
+        start, end = parse_window()
+        duration = request.args.get('duration', 60, type=int)
+        step = request.args.get('step', 30, type=int)
+        if duration <= 0 or step <= 0:
+            return jsonify({'error': 'duration and step must be positive'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        slots = finder.free_slots(coach_id, start, end, duration, step)
+        return jsonify({
+            'coach_id': coach_id,
+            'duration_minutes': duration,
+            'slots': [{'start': isoformat(slot_start), 'end': isoformat(slot_end)} for slot_start, slot_end in slots]
+        })
+
+    except Exception as e:
+        current_app.logger.error(f'Coach slots error: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@coaching_bp.route('/available-coaches', methods=['GET'])
+def get_available_coaches():
+    """Coaches with a free stretch of ``duration`` minutes in the window, e.g. Tuesday afternoon"""
+    try:
+        start, end = parse_window()
+        duration = request.args.get('duration', 60, type=int)
+        if duration <= 0:
+            return jsonify({'error': 'duration must be positive'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        available = finder.available_coaches(start, end, duration)
+        return jsonify({
+            'coaches': [{'coach_id': coach_id, 'first_free': isoformat(first_free)} for coach_id, first_free in available]
+        })
+
+    except Exception as e:
+        current_app.logger.error(f'Available coaches error: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+def can_manage(row):
+    """The session's client, the coach's own account or an admin"""
+    if g.is_admin or row.get('client_id') == g.user_id:
+        return True
+    coach = supabase.table('coaches').select('user_id').eq('id', row.get('coach_id')).execute()
+    return bool(coach.data) and coach.data[0].get('user_id') == g.user_id
+
+@coaching_bp.route('/sessions', methods=['POST'])
+@login_required
+def book_session():
+    """Book a coaching session for the caller if the slot is still free.
+
+    ``is_free`` checks the coach's schedule; the exclusion constraint on coaching_sessions
+    rejects a concurrent booking of an overlapping slot, which is answered with 409 too.
+    Only admins may book on behalf of another client_id.
+    """
+    try:
+        data = request.get_json() or {}
+        coach_id = data.get('coach_id')
+        client_id = data.get('client_id') or g.user_id
+        scheduled_time = data.get('scheduled_time')
+        duration = int(data.get('duration_minutes', 60))
+
+        if not all([coach_id, client_id, scheduled_time]):
+            return jsonify({'error': 'Missing required fields'}), 400
+        if client_id != g.user_id and not g.is_admin:
+            return jsonify({'error': 'Cannot book a session for another client'}), 403
+
+        start = parse_timestamp(scheduled_time)
+        if not finder.is_free(coach_id, start, duration):
+            return jsonify({'error': 'Slot is no longer available'}), 409
+
+        try:
+            session = supabase.table('coaching_sessions').insert({
+                'coach_id': coach_id,
+                'client_id': client_id,
+                'scheduled_time': isoformat(start),
+                'duration_minutes': duration,
+                'session_type': data.get('session_type', 'regular'),
+                'status': 'scheduled'
+            }).execute()
+        except Exception as e:
+            # postgrest's APIError, matched by code so the client stays a lazy import
+            if getattr(e, 'code', None) != OVERLAP_ERROR:
+                raise
+            return jsonify({'error': 'Slot is no longer available'}), 409
+        finally:
+            finder.invalidate(coach_id, start, duration)
+        if session.data:
+            reminders.coaching_session_created(session.data[0])
+
+        return jsonify({'session': session.data[0] if session.data else None}), 201
+
+    except ValueError:
+        return jsonify({'error': 'scheduled_time must be an ISO 8601 timestamp'}), 400
+    except Exception as e:
+        current_app.logger.error(f'Coaching session booking error: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@coaching_bp.route('/sessions/<session_id>/cancel', methods=['POST'])
+@login_required
+def cancel_session(session_id):
+    """Cancel a coaching session of the caller (client or coach) and free its slot"""
+    try:
+        existing = supabase.table('coaching_sessions').select('client_id, coach_id').eq('id', session_id).execute()
+        if not existing.data:
+            return jsonify({'error': 'Session not found'}), 404
+        if not can_manage(existing.data[0]):
+            return jsonify({'error': 'Not allowed to cancel this session'}), 403
+
+        session = supabase.table('coaching_sessions').update({'status': 'cancelled'}) \
+            .eq('id', session_id).execute()
+        if not session.data:
+            return jsonify({'error': 'Session not found'}), 404
+
+        row = session.data[0]
+        finder.invalidate(row['coach_id'], row['scheduled_time'], row.get('duration_minutes') or 60)
+        reminders.coaching_session_cancelled(session_id)
+        return jsonify({'status': 'success'})
+
+    except Exception as e:
+        current_app.logger.error(f'Coaching session cancel error: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,242 @@
+"""
+Cohort-level cancellation and rescheduling of booking sessions.
+
+A cohort is every active session of a program and/or trainer, optionally limited to
+a date range. Each operation is a fixed number of set-based statements whatever the
+cohort size: the session UPDATE selects its rows with a subquery, bookings moved as a
+whole (shift) are updated the same way, bookings left without active sessions (cancel)
+by the ids read before their sessions change, and seats are released or moved once per
+(program, start, end) group.
+
+Callers commit, or roll back for a dry run: the statements run either way, so a dry
+run reports exact counts and seat conflicts. After a commit, ``CohortChange.announce``
+notifies each affected user once and updates reminders.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.orm import aliased
+from src.models.user import db
+from src.models.program import Program
+from src.models.booking import Booking
+from src.models.session import Session
+from src.seats import RELEASED_STATUSES, ensure_ledger, release_seats, reserve_seats
+from src import calendar_feed, reminders
+
+logger = logging.getLogger('reinvent.cohorts')
+
+MAX_SHIFT_DAYS = 365
+
+
+def log_notices(notices):
+    # Local users have no notification inbox yet; the batch goes to the log
+    for user_id, title, message in notices:
+        logger.info('Notice for user %s: %s. %s', user_id, title, message)
+
+
+# Replaced by deployments that deliver notices (email, push)
+notify = log_notices
+
+
+class Cohort:
+    def __init__(self, program_id=None, trainer_id=None, start_date=None, end_date=None):
+        if not program_id and not trainer_id:
+            raise ValueError('program_id or trainer_id is required')
+        if start_date and end_date and end_date < start_date:
+            raise ValueError('end_date must not be before start_date')
+        self.program_id = program_id
+        self.trainer_id = trainer_id
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def session_ids(self):
+        """SELECT of the ids of every active session in the cohort"""
+        query = select(Session.id).join(Booking, Session.booking_id == Booking.id).where(
+            Session.status != 'cancelled',
+            Booking.booking_status.notin_(RELEASED_STATUSES)
+        )
+        if self.program_id:
+            query = query.where(Booking.program_id == self.program_id)
+        if self.trainer_id:
+            query = query.where(Booking.trainer_id == self.trainer_id)
+        if self.start_date:
+            query = query.where(Session.session_date >= self.start_date)
+        if self.end_date:
+            query = query.where(Session.session_date <= self.end_date)
+        return query
+
+    def whole_bookings(self):
+        """SELECT of bookings whose every active session is in the cohort"""
+        other = aliased(Session)
+        return select(Session.booking_id).where(Session.id.in_(self.session_ids())).where(
+            ~exists().where(
+                other.booking_id == Session.booking_id,
+                other.status != 'cancelled',
+                other.id.notin_(self.session_ids())
+            )
+        )
+
+    def describe(self):
+        if self.start_date and self.start_date == self.end_date:
+            return f'on {self.start_date}'
+        if self.start_date or self.end_date:
+            return f"from {self.start_date or 'the start'} to {self.end_date or 'the end'}"
+        return ''
+
+
+class CohortChange:
+    """What an operation changed, and the fan-out to run once it is committed"""
+
+    def __init__(self, action, cohort, bookings, whole, session_ids, seats, days=0, reason=None):
+        self.action = action
+        self.cohort = cohort
+        self.bookings = bookings  # booking_id -> row of affected_bookings
+        self.whole = whole
+        self.session_ids = session_ids
+        self.seats = seats
+        self.days = days
+        self.reason = reason
+
+    def report(self, dry_run):
+        return {
+            'dry_run': dry_run,
+            'action': self.action,
+            'sessions': len(self.session_ids),
+            'bookings': len(self.bookings),
+            f'bookings_{"cancelled" if self.action == "cancel" else "moved"}': len(self.whole),
+            'seats_released' if self.action == 'cancel' else 'seats_moved': self.seats,
+            'users_notified': len({row.user_id for row in self.bookings.values()}),
+        }
+
+    def announce(self):
+        """Notify each affected user once and bring reminders up to date"""
+        if not self.bookings:
+            return
+        programs = dict(db.session.execute(
+            select(Program.id, Program.name).where(Program.id.in_({row.program_id for row in self.bookings.values()}))
+        ).all())
+        sessions_per_user = defaultdict(Counter)
+        for row in self.bookings.values():
+            sessions_per_user[row.user_id][programs.get(row.program_id, 'your program')] += row.sessions
+
+        notices = []
+        for user_id, per_program in sessions_per_user.items():
+            for program_name, count in per_program.items():
+                noun = 'session' if count == 1 else 'sessions'
+                if self.action == 'cancel':
+                    title = 'Sessions cancelled'
+                    message = f'{count} {noun} of {program_name} {self.cohort.describe()} have been cancelled.'
+                else:
+                    direction = 'later' if self.days > 0 else 'earlier'
+                    title = 'Sessions rescheduled'
+                    message = f'{count} {noun} of {program_name} {self.cohort.describe()} moved {abs(self.days)} days {direction}.'
+                if self.reason:
+                    message += f' {self.reason}'
+                notices.append((user_id, title, ' '.join(message.split())))
+        notify(notices)
+
+        if self.action == 'cancel':
+            reminders.sessions_cancelled(self.session_ids)
+        else:
+            reminders.bookings_created(list(self.bookings))
+
+
+def affected_bookings(cohort):
+    """booking_id -> (id, user_id, trainer_id, program_id, start_date, end_date, sessions in cohort)"""
+    rows = db.session.execute(
+        select(Booking.id, Booking.user_id, Booking.trainer_id, Booking.program_id, Booking.start_date,
+               Booking.end_date, func.count(Session.id).label('sessions'))
+        .join(Session, Session.booking_id == Booking.id)
+        .where(Session.id.in_(cohort.session_ids()))
+        .group_by(Booking.id, Booking.user_id, Booking.trainer_id, Booking.program_id, Booking.start_date, Booking.end_date)
+    ).all()
+    return {row.id: row for row in rows}
+
+
+def _seat_groups(bookings, booking_ids):
+    groups = Counter()
+    for booking_id in booking_ids:
+        row = bookings[booking_id]
+        groups[(row.program_id, row.start_date, row.end_date)] += 1
+    return groups
+
+
+def _shift_dates(model, where, columns, days):
+    """Move the date ``columns`` of the ``model`` rows matching ``where`` by ``days``"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        values = {
+            column: func.date(getattr(model, column), f'{days:+d} days') if dialect == 'sqlite' else getattr(model, column) + days
+            for column in columns
+        }
+        db.session.execute(update(model).where(where).values(values).execution_options(synchronize_session=False))
+        return
+    # No portable SQL for date + days: compute the new dates here and write them back by primary key
+    rows = db.session.execute(select(model.id, *(getattr(model, column) for column in columns)).where(where)).all()
+    if rows:
+        db.session.execute(update(model), [
+            {'id': row.id, **{column: getattr(row, column) + timedelta(days=days) for column in columns}}
+            for row in rows
+        ])
+
+
+def cancel_cohort(cohort, reason=None):
+    """Cancel every session of the cohort; bookings left without sessions are cancelled too"""
+    bookings = affected_bookings(cohort)
+    session_ids = list(db.session.scalars(cohort.session_ids()))
+    whole = set(db.session.scalars(cohort.whole_bookings().distinct()))
+
+    # Sessions first: the cohort only matches sessions of bookings that are not cancelled,
+    # and whole_bookings needs their sessions still active, so those ids were read above
+    db.session.execute(
+        update(Session).where(Session.id.in_(cohort.session_ids())).values(status='cancelled')
+        .execution_options(synchronize_session=False)
+    )
+    if whole:
+        db.session.execute(
+            update(Booking).where(Booking.id.in_(whole)).values(booking_status='cancelled')
+            .execution_options(synchronize_session=False)
+        )
+    seats = 0
+    for (program_id, start_date, end_date), count in _seat_groups(bookings, whole).items():
+        release_seats(program_id, start_date, end_date, seats=count)
+        seats += count
+    calendar_feed.touch_bookings([(row.id, row.user_id, row.trainer_id) for row in bookings.values()])
+    return CohortChange('cancel', cohort, bookings, whole, session_ids, seats, reason=reason)
+
+
+def shift_cohort(cohort, days, reason=None):
+    """Move every session of the cohort by ``days``.
+
+    Bookings whose sessions all move get new dates and their seats move with them;
+    raises SeatsUnavailable (roll back) if the new dates are full.
+    """
+    if not days or abs(days) > MAX_SHIFT_DAYS:
+        raise ValueError(f'days must be between -{MAX_SHIFT_DAYS} and {MAX_SHIFT_DAYS} and not 0')
+    bookings = affected_bookings(cohort)
+    session_ids = list(db.session.scalars(cohort.session_ids()))
+    whole = set(db.session.scalars(cohort.whole_bookings().distinct()))
+    groups = _seat_groups(bookings, whole)
+    programs = {program.id: program for program in db.session.scalars(
+        select(Program).where(Program.id.in_({program_id for program_id, _, _ in groups}))
+    )}
+    moves = [
+        (programs[program_id], start_date + timedelta(days=days), end_date + timedelta(days=days), count)
+        for (program_id, start_date, end_date), count in groups.items()
+    ]
+    # Missing ledger dates are seeded from the bookings table, so seed them before it changes
+    for program, start_date, end_date, _ in moves:
+        ensure_ledger(program, start_date, end_date)
+
+    # Bookings first: the session UPDATE changes which sessions the cohort matches
+    _shift_dates(Booking, Booking.id.in_(cohort.whole_bookings()), ('start_date', 'end_date'), days)
+    _shift_dates(Session, Session.id.in_(cohort.session_ids()), ('session_date',), days)
+
+    for (program_id, start_date, end_date), count in groups.items():
+        release_seats(program_id, start_date, end_date, seats=count)
+    for program, start_date, end_date, count in moves:
+        reserve_seats(program, start_date, end_date, seats=count)
+    calendar_feed.touch_bookings([(row.id, row.user_id, row.trainer_id) for row in bookings.values()])
+    return CohortChange('shift', cohort, bookings, whole, session_ids, sum(groups.values()), days, reason)
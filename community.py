@@ -0,0 +1,82 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.clients import supabase
+from src.counters import read_prayer_count
+
+community_bp = Blueprint('community', __name__)
+
+@community_bp.route('/prayer-requests/<prayer_request_id>/pray', methods=['POST'])
+def pray_for_request(prayer_request_id):
+    """Record an "I'm praying" click. prayer_count is updated by the shard trigger."""
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('user_id')
+
+        if not user_id:
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        supabase.table('prayer_responses').insert({
+            'prayer_request_id': prayer_request_id,
+            'user_id': user_id,
+            'response_text': data.get('response_text'),
+            'is_praying': True
+        }).execute()
+
+        return jsonify({'status': 'success'}), 201
+
+    except Exception as e:
+        current_app.logger.error(f'Prayer response error: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@community_bp.route('/prayer-requests/<prayer_request_id>/count', methods=['GET'])
+def get_prayer_count(prayer_request_id):
+    """Get the prayer count including deltas that have not been folded yet"""
+    try:
+        return jsonify({
+            'prayer_request_id': prayer_request_id,
+            'prayer_count': read_prayer_count(supabase, prayer_request_id)
+        })
+
+    except Exception as e:
+        current_app.logger.error(f'Prayer count error: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@community_bp.route('/forums/<forum_id>/join', methods=['POST'])
+def join_forum(forum_id):
+    """Add a forum member; joining twice is a no-op. member_count is updated by the shard trigger."""
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('user_id')
+
+        if not user_id:
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        # Only a row that was actually inserted comes back
+        result = supabase.table('forum_members').upsert(
+            {'forum_id': forum_id, 'user_id': user_id},
+            on_conflict='forum_id,user_id',
+            ignore_duplicates=True
+        ).execute()
+
+        return jsonify({'status': 'success', 'joined': bool(result.data)}), 201 if result.data else 200
+
+    except Exception as e:
+        current_app.logger.error(f'Forum join error: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+@community_bp.route('/forums/<forum_id>/leave', methods=['POST'])
+def leave_forum(forum_id):
+    """Remove a forum member; leaving a forum one is not in is a no-op"""
+    try:
+        data = request.get_json() or {}
+        user_id = data.get('user_id')
+
+        if not user_id:
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        result = supabase.table('forum_members').delete().eq('forum_id', forum_id).eq('user_id', user_id).execute()
+
+        return jsonify({'status': 'success', 'left': bool(result.data)}), 200
+
+    except Exception as e:
+        current_app.logger.error(f'Forum leave error: {str(e)}')
+        return jsonify({'error': 'Internal server error'}), 500
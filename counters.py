@@ -0,0 +1,27 @@
+"""
+Sharded counters for hot community rows (prayer_count, post_count, member_count).
+
+Triggers on prayer_responses, forum_posts and forum_members add each change to one of
+several ``counter_shards`` rows, so concurrent writers do not queue on the parent row.
+``fold`` moves the shard deltas into the parent rows; run it on a schedule with
+``flask fold-counters --loop <seconds>``. Displayed totals lag by at most one fold
+interval, except where a reader adds the pending shards itself (``read_prayer_count``).
+"""
+
+import logging
+
+logger = logging.getLogger('reinvent.counters')
+
+
+def fold(supabase):
+    """Fold shard rows into the parent counters. Returns the number of rows updated."""
+    result = supabase.rpc('fold_counter_shards', {}).execute()
+    folded = result.data or 0
+    logger.info('Folded counter shards into %s rows', folded)
+    return folded
+
+
+def read_prayer_count(supabase, prayer_request_id):
+    """Current prayer count including shard deltas that have not been folded yet"""
+    response = supabase.table('prayer_request_counts').select('prayer_count').eq('id', prayer_request_id).single().execute()
+    return response.data['prayer_count'] if response.data else 0
@@ -1,5 +1,8 @@
 -- Reinvent International Database Schema
 -- Complete schema for learning management platform
+--
+-- Legacy layout, kept as the source of `flask migrate-schema`. schema.sql is the
+-- canonical schema; do not apply this file to new databases.
 
 -- Enable necessary extensions
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
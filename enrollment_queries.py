@@ -0,0 +1,110 @@
+"""
+Projected, keyset-paginated enrollment reads for the dashboard.
+
+``select('*, program:programs(*)')`` ships every program column with every
+enrollment, including long descriptions, curriculum JSONB and text arrays that the
+dashboard never renders. The presets below name the columns each view needs.
+
+A user's enrollments are paged newest first on ``(enrolled_at, id)``, served by the
+``idx_enrollments_user_enrolled_at`` index (see "User Enrollment Pages" in
+schema.sql). The cursor is the position of the last row returned, so a page costs
+the same no matter how deep it is. Pages are cached per user for ``ttl`` seconds and
+dropped by ``invalidate`` whenever the payment routes change one of the user's
+enrollments; other workers pick the change up when their entry expires.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+
+DEFAULT_TTL = float(os.getenv('USER_ENROLLMENTS_CACHE_TTL', '30'))
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_CACHED_USERS = 10000
+
+PRESETS = {
+    'card': 'id, program_id, payment_status, access_status, progress_percentage, enrolled_at, '
+            'program:programs(id, name, slug, duration_weeks, featured_image_url)',
+    'detail': 'id, program_id, payment_status, access_status, progress_percentage, enrolled_at, completed_at, '
+              'access_expires_at, certificate_issued_at, certificate_url, '
+              'program:programs(id, name, slug, description, price, duration_weeks, program_type, featured_image_url)',
+}
+
+
+def encode_cursor(row):
+    raw = json.dumps([row['enrolled_at'], row['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """-> (enrolled_at, id); ValueError if the cursor was not issued by encode_cursor"""
+    try:
+        enrolled_at, enrollment_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(enrolled_at, str) or not isinstance(enrollment_id, str):
+        raise ValueError('Invalid cursor')
+    return enrolled_at, enrollment_id
+
+
+def _quoted(value):
+    # PostgREST filter values containing reserved characters (, . : ( )) must be quoted
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class EnrollmentQueries:
+    def __init__(self, supabase, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.supabase = supabase
+        self.ttl = ttl
+        self.clock = clock
+        self._pages = {}  # user_id -> {(preset, limit, cursor): (expires_at, page)}
+        self._lock = threading.Lock()
+
+    def user_page(self, user_id, preset='card', limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """{'enrollments': [...], 'next_cursor': str or None}, newest first"""
+        if preset not in PRESETS:
+            raise ValueError(f'fields must be one of {", ".join(PRESETS)}')
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+        position = decode_cursor(cursor) if cursor else None
+
+        user_id = str(user_id)
+        key = (preset, limit, cursor)
+        with self._lock:
+            cached = self._pages.get(user_id, {}).get(key)
+        if cached and cached[0] > self.clock():
+            return cached[1]
+
+        query = self.supabase.table('enrollments').select(PRESETS[preset]).eq('user_id', user_id)
+        if position:
+            enrolled_at, enrollment_id = position
+            query = query.or_(f'enrolled_at.lt.{_quoted(enrolled_at)},'
+                              f'and(enrolled_at.eq.{_quoted(enrolled_at)},id.lt.{_quoted(enrollment_id)})')
+        # One extra row tells whether another page follows
+        rows = query.order('enrolled_at', desc=True).order('id', desc=True).limit(limit + 1).execute().data or []
+        page = {
+            'enrollments': rows[:limit],
+            'next_cursor': encode_cursor(rows[limit - 1]) if len(rows) > limit else None,
+        }
+
+        with self._lock:
+            if user_id not in self._pages and len(self._pages) >= MAX_CACHED_USERS:
+                now = self.clock()
+                self._pages = {
+                    user: pages for user, pages in self._pages.items()
+                    if any(expires_at > now for expires_at, _ in pages.values())
+                }
+            self._pages.setdefault(user_id, {})[key] = (self.clock() + self.ttl, page)
+        return page
+
+    def detail(self, enrollment_id):
+        """One enrollment with the detail preset, or None"""
+        rows = self.supabase.table('enrollments').select(PRESETS['detail']) \
+            .eq('id', enrollment_id).limit(1).execute().data
+        return rows[0] if rows else None
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._pages.pop(str(user_id), None)
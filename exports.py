@@ -0,0 +1,361 @@
+"""
+Streaming exports of Supabase finance data to CSV or Parquet.
+
+Rows are read over a direct Postgres connection (``DATABASE_URL``, psycopg2) through
+a named, server-side cursor and pulled ``chunk_size`` rows at a time, so memory use
+does not grow with the size of the history. Rows come back in primary-key order;
+the last key written is the resume position.
+
+* ``enrollments``: enrollments joined to programs (schema.sql)
+* ``payments``: payments with their enrollment's program
+
+CSV output is checkpointed after every chunk: the checkpoint records the last key
+and the file size at that point, and a resumed export truncates the file back to
+that size before appending. Parquet output (pyarrow, optional) is a directory of
+part files of ``PARQUET_PART_ROWS`` rows, one row group per chunk; a part is only
+checkpointed once its footer is written, and a resumed export starts the next part.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+
+DEFAULT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '5000'))
+PARQUET_PART_ROWS = int(os.getenv('EXPORT_PARQUET_PART_ROWS', '1000000'))
+FORMATS = ('csv', 'parquet')
+
+
+class ExportError(Exception):
+    pass
+
+
+class Dataset:
+    def __init__(self, name, source, key, timestamp, program, columns):
+        self.name = name
+        self.source = source
+        self.key = key
+        self.timestamp = timestamp
+        self.program = program
+        # (output name, SQL expression, type) with type one of string/timestamp/decimal/integer
+        self.columns = columns
+
+    @property
+    def names(self):
+        return [name for name, _, _ in self.columns]
+
+    def query(self, start=None, end=None, program_id=None, after=None):
+        """SELECT for the filters, keyset-paginated on ``key``; psycopg2 parameter style"""
+        conditions = []
+        params = []
+        if start:
+            conditions.append(f'{self.timestamp} >= %s')
+            params.append(start)
+        if end:
+            conditions.append(f'{self.timestamp} < %s')
+            params.append(end)
+        if program_id:
+            conditions.append(f'{self.program} = %s')
+            params.append(program_id)
+        if after:
+            conditions.append(f'{self.key} > %s')
+            params.append(after)
+        columns = ', '.join(f'{expression} AS {name}' for name, expression, _ in self.columns)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return f'SELECT {columns} FROM {self.source}{where} ORDER BY {self.key}', params
+
+
+DATASETS = {
+    'enrollments': Dataset(
+        'enrollments',
+        source='enrollments e JOIN programs p ON p.id = e.program_id',
+        key='e.id', timestamp='e.enrolled_at', program='e.program_id',
+        columns=[
+            ('id', 'e.id', 'string'),
+            ('user_id', 'e.user_id', 'string'),
+            ('program_id', 'e.program_id', 'string'),
+            ('program_name', 'p.name', 'string'),
+            ('enrolled_at', 'e.enrolled_at', 'timestamp'),
+            ('completed_at', 'e.completed_at', 'timestamp'),
+            ('payment_status', 'e.payment_status', 'string'),
+            ('payment_amount', 'e.payment_amount', 'decimal'),
+            ('stripe_payment_id', 'e.stripe_payment_id', 'string'),
+            ('access_status', 'e.access_status', 'string'),
+            ('access_expires_at', 'e.access_expires_at', 'timestamp'),
+            ('progress_percentage', 'e.progress_percentage', 'integer'),
+        ]
+    ),
+    'payments': Dataset(
+        'payments',
+        source='payments pay LEFT JOIN enrollments e ON e.id = pay.enrollment_id LEFT JOIN programs p ON p.id = e.program_id',
+        key='pay.id', timestamp='pay.created_at', program='e.program_id',
+        columns=[
+            ('id', 'pay.id', 'string'),
+            ('user_id', 'pay.user_id', 'string'),
+            ('enrollment_id', 'pay.enrollment_id', 'string'),
+            ('program_id', 'e.program_id', 'string'),
+            ('program_name', 'p.name', 'string'),
+            ('amount', 'pay.amount', 'decimal'),
+            ('currency', 'pay.currency', 'string'),
+            ('status', 'pay.status', 'string'),
+            ('payment_method', 'pay.payment_method', 'string'),
+            ('transaction_fee', 'pay.transaction_fee', 'decimal'),
+            ('net_amount', 'pay.net_amount', 'decimal'),
+            ('stripe_payment_intent_id', 'pay.stripe_payment_intent_id', 'string'),
+            ('processed_at', 'pay.processed_at', 'timestamp'),
+            ('created_at', 'pay.created_at', 'timestamp'),
+        ]
+    ),
+}
+
+
+def connect(dsn=None):
+    try:
+        import psycopg2
+    except ImportError:
+        raise ExportError('Exports need psycopg2 (pip install psycopg2-binary)')
+    dsn = dsn or os.getenv('DATABASE_URL')
+    if not dsn:
+        raise ExportError('Set DATABASE_URL to the Supabase Postgres connection string')
+    connection = psycopg2.connect(dsn)
+    connection.set_session(readonly=True)
+    return connection
+
+
+def iter_chunks(connection, dataset, filters, after=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Lists of up to ``chunk_size`` row tuples from a server-side cursor"""
+    sql, params = dataset.query(after=after, **filters)
+    # A named cursor keeps the result set on the server; fetchmany pulls one chunk
+    with connection.cursor(name=f'export_{dataset.name}') as cursor:
+        cursor.itersize = chunk_size
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class CsvChunks:
+    """Encodes chunks as CSV text"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def header(self):
+        return self.encode([self.dataset.names])
+
+    def encode(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([[_cell(value) for value in row] for row in rows])
+        return buffer.getvalue().encode('utf-8')
+
+
+def parquet_schema(dataset):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ExportError('Parquet exports need pyarrow (pip install pyarrow)')
+    types = {
+        'string': pa.string(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+        'decimal': pa.decimal128(12, 2),
+        'integer': pa.int64(),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in dataset.columns])
+
+
+def parquet_table(schema, rows):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    arrays = []
+    for index, field in enumerate(schema):
+        values = columns[index]
+        if pa.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class _Drain:
+    """Write-only file object whose contents are taken out after every row group"""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream(dataset, filters, format='csv', after=None, chunk_size=DEFAULT_CHUNK_SIZE, connection=None):
+    """Export as an iterator of byte strings, for a streaming HTTP response.
+
+    Fails here rather than mid-response when pyarrow or the database is missing.
+    """
+    if format not in FORMATS:
+        raise ExportError(f'format must be one of {", ".join(FORMATS)}')
+    schema = parquet_schema(dataset) if format == 'parquet' else None
+    owns_connection = connection is None
+    connection = connection or connect()
+    return _generate(connection, owns_connection, dataset, filters, schema, after, chunk_size)
+
+
+def _generate(connection, owns_connection, dataset, filters, schema, after, chunk_size):
+    try:
+        if schema is None:
+            encoder = CsvChunks(dataset)
+            yield encoder.header()
+            for rows in iter_chunks(connection, dataset, filters, after, chunk_size):
+                yield encoder.encode(rows)
+        else:
+            import pyarrow.parquet as pq
+
+            sink = _Drain()
+            with pq.ParquetWriter(sink, schema) as writer:
+                for rows in iter_chunks(connection, dataset, filters, after, chunk_size):
+                    writer.write_table(parquet_table(schema, rows))
+                    yield sink.take()
+            yield sink.take()
+    finally:
+        if owns_connection:
+            connection.close()
+
+
+class Checkpoint:
+    """Resume state of a file export, replaced atomically after each durable write"""
+
+    def __init__(self, path, state):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def open(cls, path, identity):
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if {key: state.get(key) for key in identity} != identity:
+                raise ExportError(f'Checkpoint {path} belongs to a different export; remove it to start over')
+            return cls(path, state)
+        return cls(path, dict(identity, after=None, rows=0, bytes=0, parts=0, complete=False))
+
+    def save(self, **changes):
+        self.state.update(changes)
+        if not self.path:
+            return
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+
+def export_to_path(dataset, filters, output, format='csv', checkpoint_path=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE, part_rows=PARQUET_PART_ROWS, connection=None, progress=None):
+    """Write an export to ``output`` (a file for CSV, a directory for Parquet).
+
+    With ``checkpoint_path`` an interrupted export picks up where the last
+    checkpoint left off. Returns the checkpoint state.
+    """
+    if format not in FORMATS:
+        raise ExportError(f'format must be one of {", ".join(FORMATS)}')
+    identity = {'dataset': dataset.name, 'format': format, 'output': os.path.abspath(output),
+                'filters': {key: str(value) for key, value in filters.items() if value}}
+    checkpoint = Checkpoint.open(checkpoint_path, identity)
+    if checkpoint.state['complete']:
+        return checkpoint.state
+
+    owns_connection = connection is None
+    connection = connection or connect()
+    try:
+        if format == 'csv':
+            _export_csv(connection, dataset, filters, output, checkpoint, chunk_size, progress)
+        else:
+            _export_parquet(connection, dataset, filters, output, checkpoint, chunk_size, part_rows, progress)
+    finally:
+        if owns_connection:
+            connection.close()
+    checkpoint.save(complete=True)
+    return checkpoint.state
+
+
+def _export_csv(connection, dataset, filters, output, checkpoint, chunk_size, progress):
+    encoder = CsvChunks(dataset)
+    resuming = checkpoint.state['bytes'] > 0
+    with open(output, 'r+b' if resuming else 'wb') as f:
+        if resuming:
+            # Drop whatever was written after the last checkpoint
+            f.truncate(checkpoint.state['bytes'])
+            f.seek(checkpoint.state['bytes'])
+        else:
+            f.write(encoder.header())
+        for rows in iter_chunks(connection, dataset, filters, checkpoint.state['after'], chunk_size):
+            f.write(encoder.encode(rows))
+            f.flush()
+            os.fsync(f.fileno())
+            checkpoint.save(after=str(rows[-1][0]), rows=checkpoint.state['rows'] + len(rows), bytes=f.tell())
+            if progress:
+                progress(checkpoint.state)
+
+
+def _export_parquet(connection, dataset, filters, output, checkpoint, chunk_size, part_rows, progress):
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(dataset)
+    os.makedirs(output, exist_ok=True)
+    # Parts after the last checkpoint were never finished
+    for name in os.listdir(output):
+        if name.startswith('part-') and name.endswith('.parquet') and int(name[5:-8]) >= checkpoint.state['parts']:
+            os.remove(os.path.join(output, name))
+
+    writer = None
+    part_path = None
+    written = 0
+    last_key = None
+    try:
+        for rows in iter_chunks(connection, dataset, filters, checkpoint.state['after'], chunk_size):
+            if writer is None:
+                part_path = os.path.join(output, f"part-{checkpoint.state['parts']:05d}.parquet")
+                writer = pq.ParquetWriter(part_path, schema)
+            writer.write_table(parquet_table(schema, rows))
+            written += len(rows)
+            last_key = str(rows[-1][0])
+            if written >= part_rows:
+                writer.close()
+                writer = None
+                checkpoint.save(after=last_key, rows=checkpoint.state['rows'] + written,
+                                parts=checkpoint.state['parts'] + 1)
+                written = 0
+                if progress:
+                    progress(checkpoint.state)
+        if writer is not None:
+            writer.close()
+            writer = None
+            checkpoint.save(after=last_key, rows=checkpoint.state['rows'] + written, parts=checkpoint.state['parts'] + 1)
+    finally:
+        if writer is not None:
+            writer.close()
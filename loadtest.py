@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Reproducible load test for the Flask API against local stand-ins.
+
+    python loadtest.py --profile mixed --concurrency 16 --duration 30 --output run.json
+    python loadtest.py --profile checkout --compare run.json
+
+The app runs in-process on a threaded WSGI server against a fresh SQLite database
+(or --database-url, e.g. a local Postgres). Stripe and Supabase PostgREST are
+replaced by the stub servers in stub_servers.py, so runs need no network access and
+are comparable across commits. Results are written as JSON with throughput and
+p50/p95/p99 latency per scenario.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.stub_servers import StubPostgrest, StubStripe, sign_webhook
+
+WEBHOOK_SECRET = 'whsec_loadtest'
+# Shaped like a Supabase key so client-side validation accepts it
+SUPABASE_KEY = 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.loadtest'
+
+PROFILES = {
+    'browse': {'catalog': 70, 'availability': 30},
+    'booking-burst': {'booking': 80, 'availability': 20},
+    'checkout': {'checkout': 70, 'verify': 30},
+    'webhook-storm': {'webhook': 100},
+    'mixed': {'catalog': 40, 'availability': 25, 'booking': 10, 'checkout': 10, 'verify': 10, 'webhook': 5},
+}
+
+
+class LoadTestContext:
+    def __init__(self, program_ids, program_uuids, stripe_stub):
+        self.program_ids = program_ids
+        self.program_uuids = program_uuids
+        self.stripe = stripe_stub
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def add_session(self, session_id):
+        with self.lock:
+            self.sessions.append(session_id)
+
+    def random_session(self, rng):
+        with self.lock:
+            return rng.choice(self.sessions) if self.sessions else None
+
+
+def random_dates(rng):
+    start = date.today() + timedelta(days=rng.randint(1, 180))
+    return start.isoformat(), (start + timedelta(days=rng.choice([2, 4, 89]))).isoformat()
+
+
+def scenario_catalog(rng, ctx):
+    return 'GET', '/api/programs', None, {}
+
+
+def scenario_availability(rng, ctx):
+    start, end = random_dates(rng)
+    return 'GET', f'/api/availability?program_id={rng.choice(ctx.program_ids)}&start_date={start}&end_date={end}', None, {}
+
+
+def scenario_booking(rng, ctx):
+    start, end = random_dates(rng)
+    suffix = uuid.uuid4().hex[:10]
+    return 'POST', '/api/bookings', {
+        'client_name': f'Load Test {suffix}',
+        'client_email': f'load.{suffix}@example.test',
+        'client_phone': '555-0100',
+        'program_id': rng.choice(ctx.program_ids),
+        'start_date': start,
+        'end_date': end,
+    }, {}
+
+
+def scenario_checkout(rng, ctx):
+    return 'POST', '/api/payments/create-checkout-session', {
+        'program_id': rng.choice(ctx.program_uuids),
+        'user_id': str(uuid.uuid4()),
+        'customer_email': 'buyer@example.test',
+    }, {}
+
+
+def scenario_verify(rng, ctx):
+    session_id = ctx.random_session(rng)
+    if session_id is None:
+        return scenario_checkout(rng, ctx)
+    return 'GET', f'/api/payments/verify-payment/{session_id}', None, {}
+
+
+def scenario_webhook(rng, ctx):
+    session_id = ctx.random_session(rng)
+    if session_id is None:
+        return scenario_checkout(rng, ctx)
+    session = ctx.stripe.complete(session_id)
+    event_type = rng.choices(['checkout.session.completed', 'checkout.session.expired'], [9, 1])[0]
+    payload = json.dumps({
+        'id': f'evt_{uuid.uuid4().hex}',
+        'object': 'event',
+        'type': event_type,
+        'data': {'object': session},
+    })
+    return 'POST', '/api/payments/webhook', payload, {'Stripe-Signature': sign_webhook(payload, WEBHOOK_SECRET)}
+
+
+SCENARIOS = {
+    'catalog': scenario_catalog,
+    'availability': scenario_availability,
+    'booking': scenario_booking,
+    'checkout': scenario_checkout,
+    'verify': scenario_verify,
+    'webhook': scenario_webhook,
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f'Unknown scenario: {name} (choose from {", ".join(SCENARIOS)})')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def start_stubs(latency):
+    stripe_stub = StubStripe(latency).start()
+    postgrest_stub = StubPostgrest(latency).start()
+    os.environ.update({
+        'SUPABASE_URL': postgrest_stub.url,
+        'SUPABASE_SERVICE_KEY': SUPABASE_KEY,
+        'STRIPE_SECRET_KEY': 'sk_test_loadtest',
+        'STRIPE_API_BASE': stripe_stub.url,
+        'STRIPE_WEBHOOK_SECRET': WEBHOOK_SECRET,
+    })
+    return stripe_stub, postgrest_stub
+
+
+def create_test_app(database_url, programs):
+    from src.main import create_app, init_db
+    from src.models.user import db
+    from src.models.program import Program
+
+    # Every simulated client shares one address, so rate limits would throttle the test itself
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'RATE_LIMIT_ENABLED': False})
+    init_db(app)
+    with app.app_context():
+        program_ids = []
+        for i in range(programs):
+            program = Program(
+                name=f'Load Test Program {i}',
+                short_name=f'LT{i}',
+                description='Leadership program used by the load test. ' * 5,
+                duration_days=[3, 5, 90][i % 3],
+                price=500 + i,
+                program_type='ongoing' if i % 3 == 2 else 'intensive',
+                max_participants=20
+            )
+            db.session.add(program)
+            db.session.flush()
+            program_ids.append(program.id)
+        db.session.commit()
+    return app, program_ids
+
+
+def seed_supabase(postgrest_stub, programs):
+    rows = [{
+        'id': str(uuid.uuid4()),
+        'name': f'Load Test Program {i}',
+        'slug': f'load-test-{i}',
+        'description': 'Leadership program used by the load test.',
+        'price': 500 + i,
+        'featured_image_url': None,
+    } for i in range(programs)]
+    postgrest_stub.seed('programs', rows)
+    return [row['id'] for row in rows]
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def send(base_url, method, path, body, headers):
+    data = None
+    headers = dict(headers)
+    if body is not None:
+        data = body.encode('utf-8') if isinstance(body, str) else json.dumps(body).encode('utf-8')
+        headers.setdefault('Content-Type', 'application/json')
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def run_load(base_url, ctx, mix, concurrency, duration, max_requests, seed):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = defaultdict(list)  # scenario -> [(latency_s, ok)]
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local = defaultdict(list)
+        while time.perf_counter() < deadline:
+            with lock:
+                if max_requests and issued[0] >= max_requests:
+                    break
+                issued[0] += 1
+            name = rng.choices(names, weights)[0]
+            method, path, body, headers = SCENARIOS[name](rng, ctx)
+            started = time.perf_counter()
+            try:
+                status, payload = send(base_url, method, path, body, headers)
+            except OSError:
+                status, payload = 599, b''
+            elapsed = time.perf_counter() - started
+            ok = status < 400
+            local[name].append((elapsed, ok))
+            if ok and path.endswith('create-checkout-session'):
+                ctx.add_session(json.loads(payload)['session_id'])
+        with lock:
+            for name, samples in local.items():
+                results[name].extend(samples)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, elapsed):
+    summary = {}
+    all_latencies = []
+    for name, samples in sorted(results.items()):
+        latencies = sorted(latency * 1000 for latency, _ in samples)
+        all_latencies.extend(latencies)
+        summary[name] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'throughput_rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+        }
+    all_latencies.sort()
+    total = sum(item['requests'] for item in summary.values())
+    summary['total'] = {
+        'requests': total,
+        'errors': sum(item['errors'] for item in summary.values()),
+        'throughput_rps': round(total / elapsed, 2),
+        'p50_ms': round(statistics.median(all_latencies), 3) if all_latencies else None,
+        'p95_ms': round(percentile(all_latencies, 0.95), 3) if all_latencies else None,
+        'p99_ms': round(percentile(all_latencies, 0.99), 3) if all_latencies else None,
+    }
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_summary(summary, baseline=None):
+    print(f"{'scenario':<14} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("-" * 72)
+    for name, item in summary.items():
+        line = (f"{name:<14} {item['requests']:>9} {item['errors']:>7} {item['throughput_rps']:>9.1f} "
+                f"{item['p50_ms']:>9.2f} {item['p95_ms']:>9.2f} {item['p99_ms']:>9.2f}")
+        previous = (baseline or {}).get(name)
+        if previous and previous.get('p95_ms'):
+            change = (item['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+            line += f"   p95 {change:+.1f}% vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='mixed')
+    parser.add_argument('--mix', help='custom weights, e.g. catalog=5,booking=1 (overrides --profile)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+    parser.add_argument('--requests', type=int, default=0, help='stop after N requests (0 = duration only)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds of unrecorded warm-up')
+    parser.add_argument('--programs', type=int, default=12)
+    parser.add_argument('--stub-latency-ms', type=float, default=5.0, help='simulated Stripe/PostgREST latency')
+    parser.add_argument('--database-url', help='defaults to a fresh SQLite file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else PROFILES[args.profile]
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='reinvent-load-'), 'app.db')}"
+
+    stripe_stub, postgrest_stub = start_stubs(args.stub_latency_ms / 1000)
+    app, program_ids = create_test_app(database_url, args.programs)
+    ctx = LoadTestContext(program_ids, seed_supabase(postgrest_stub, args.programs), stripe_stub)
+    server, base_url = serve(app)
+
+    print(f"🚀 Load test: {', '.join(f'{k}={v:g}' for k, v in mix.items())} | concurrency {args.concurrency} | {args.duration:g}s")
+    if args.warmup:
+        run_load(base_url, ctx, mix, args.concurrency, args.warmup, 0, args.seed + 1000)
+    results, elapsed = run_load(base_url, ctx, mix, args.concurrency, args.duration, args.requests, args.seed)
+    server.shutdown()
+
+    summary = summarize(results, elapsed)
+    report = {
+        'revision': git_revision(),
+        'timestamp': int(time.time()),
+        'config': {
+            'mix': mix,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'stub_latency_ms': args.stub_latency_ms,
+            'database': database_url.split(':', 1)[0],
+        },
+        'elapsed_s': round(elapsed, 3),
+        'scenarios': summary,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f).get('scenarios')
+    print_summary(summary, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    stripe_stub.stop()
+    postgrest_stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,44 +3,252 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+import threading
+import time
+import click
+from flask import Flask
 from flask_cors import CORS
-from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.payments import payments_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
-
-# Enable CORS for all routes
-CORS(app, origins=os.getenv('CORS_ORIGINS', '*').split(','))
-
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(payments_bp, url_prefix='/api/payments')
-
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+from werkzeug.utils import import_string
+
+# (import path, url prefix). Route modules only define blueprints; Stripe and
+# Supabase clients are created on first use (see src/clients.py).
+BLUEPRINTS = [
+    ('src.routes.user:user_bp', '/api'),
+    ('src.routes.program:program_bp', '/api'),
+    ('src.routes.booking:booking_bp', '/api'),
+    # Old response shapes of reinvent-booking-backend; see src/routes/booking_legacy.py
+    ('src.routes.booking_legacy:legacy_booking_bp', '/api/legacy'),
+    ('src.routes.payments:payments_bp', '/api/payments'),
+    ('src.routes.community:community_bp', '/api/community'),
+    ('src.routes.coaching:coaching_bp', '/api/coaching'),
+    ('src.routes.search:search_bp', '/api'),
+    ('src.routes.admin:admin_bp', '/api/admin'),
+]
+
+def init_db(app):
+    """Create tables and the local search index, and index rows that are already there"""
+    from src import search_index
+    from src.models.user import db
+    from src.models.program import Program
+
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            search_index.create_search_index(connection)
+            search_index.rebuild(connection, Program, *PROGRAM_SEARCH_FIELDS, is_public=lambda p: p.is_active)
+
+def create_app(config=None):
+    """Application factory: ``flask --app src.main`` and WSGI servers (``src.main:create_app()``) call it.
+
+    SQLAlchemy, the models and the route modules are imported here rather than at the
+    top of this module, so importing src.main stays cheap and does no app setup.
+    """
+    from src.models.user import db
+    from src import metrics, sqlite_profile
+    from src.profiling import slow_query_log
+
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+
+    # uncomment if you need to use database
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # WAL, busy timeout and pool settings; SQLITE_PROFILE=default restores SQLite's defaults
+    app.config['SQLITE_PROFILE'] = os.getenv('SQLITE_PROFILE', 'production')
+    app.config['SQLITE_READ_ONLY'] = os.getenv('SQLITE_READ_ONLY', '0') == '1'
+    # Schema creation is opt-in at startup; run `flask --app src.main init-db` on deploy
+    app.config['INIT_DB_ON_START'] = os.getenv('INIT_DB_ON_START', '0') == '1'
+    # Session reminders are sent by exactly one process; see src/reminders.py
+    app.config['REMINDER_SCHEDULER'] = os.getenv('REMINDER_SCHEDULER', '0') == '1'
+    # Per-client token buckets on public endpoints; see src/rate_limit.py
+    app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+    if config:
+        app.config.update(config)
+
+    # Enable CORS for all routes
+    CORS(app, origins=os.getenv('CORS_ORIGINS', '*').split(','))
+
+    for import_path, url_prefix in BLUEPRINTS:
+        app.register_blueprint(import_string(import_path), url_prefix=url_prefix)
+
+    sqlite_profile.configure(app)
+    db.init_app(app)
+    sqlite_profile.init_app(app, db)
+    metrics.init_app(app)
+    slow_query_log.install()
+    register_search_index()
+
+    if app.config['INIT_DB_ON_START']:
+        init_db(app)
+
+    from src import reminders
+    from src.clients import supabase
+    reminders.init_app(app, supabase)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create database tables and the search index."""
+        init_db(app)
+        click.echo('Database initialized')
+
+    @app.cli.command('sweep-enrollments')
+    @click.option('--loop', 'interval', type=float, default=0, help='Repeat every N seconds instead of exiting.')
+    @click.option('--rows-per-second', type=float, default=None, help='Override SWEEPER_ROWS_PER_SECOND.')
+    def sweep_enrollments_command(interval, rows_per_second):
+        """Expire abandoned checkouts and lapsed access in throttled batches."""
+        from src.routes.payments import forget_enrollments
+        from src.sweeper import DEFAULT_ROWS_PER_SECOND, EnrollmentSweeper
+
+        sweeper = EnrollmentSweeper(supabase, rows_per_second or DEFAULT_ROWS_PER_SECOND, on_swept=forget_enrollments)
+        while True:
+            results = sweeper.sweep()
+            click.echo(', '.join(f'{name}: {count}' for name, count in results.items()))
+            if not interval:
+                break
+            time.sleep(interval)
+
+    @app.cli.command('fold-counters')
+    @click.option('--loop', 'interval', type=float, default=0, help='Repeat every N seconds instead of exiting.')
+    def fold_counters_command(interval):
+        """Fold sharded prayer/forum counter deltas into their parent rows."""
+        from src.counters import fold
+
+        while True:
+            click.echo(f'{fold(supabase)} rows folded')
+            if not interval:
+                break
+            time.sleep(interval)
+
+    @app.cli.command('issue-certificates')
+    @click.option('--loop', 'interval', type=float, default=0, help='Repeat every N seconds instead of exiting.')
+    @click.option('--workers', type=int, default=None, help='Override CERTIFICATE_WORKERS.')
+    @click.option('--max-rows', type=int, default=None, help='Stop after this many enrollments.')
+    def issue_certificates_command(interval, workers, max_rows):
+        """Render certificates for completed enrollments in a process pool."""
+        from src.certificates import DEFAULT_WORKERS, CertificateIssuer
+
+        issuer = CertificateIssuer(supabase, workers=workers or DEFAULT_WORKERS)
+        while True:
+            stats = issuer.issue(max_rows)
+            click.echo(f"{stats['rendered']} rendered, {stats['failed']} failed, {stats['renders_per_second']} renders/s")
+            if not interval:
+                break
+            time.sleep(interval)
+
+    @app.cli.command('export-data')
+    @click.argument('dataset', type=click.Choice(['enrollments', 'payments']))
+    @click.argument('output', type=click.Path())
+    @click.option('--format', 'export_format', type=click.Choice(['csv', 'parquet']), default='csv', help='Parquet writes a directory of part files.')
+    @click.option('--start', type=click.DateTime(['%Y-%m-%d']), default=None, help='First day to include.')
+    @click.option('--end', type=click.DateTime(['%Y-%m-%d']), default=None, help='Day after the last one to include.')
+    @click.option('--program-id', default=None)
+    @click.option('--checkpoint', type=click.Path(), default=None, help='Resume from (and record progress in) this file.')
+    @click.option('--chunk-size', type=int, default=None, help='Rows fetched per round trip.')
+    def export_data_command(dataset, output, export_format, start, end, program_id, checkpoint, chunk_size):
+        """Stream enrollments or payments from Postgres (DATABASE_URL) to a file."""
+        from src import exports
+
+        filters = {'start': start.date() if start else None, 'end': end.date() if end else None, 'program_id': program_id}
+        try:
+            state = exports.export_to_path(
+                exports.DATASETS[dataset], filters, output, export_format, checkpoint,
+                chunk_size=chunk_size or exports.DEFAULT_CHUNK_SIZE,
+                progress=lambda state: click.echo(f"{state['rows']} rows", err=True)
+            )
+        except exports.ExportError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Exported {state['rows']} {dataset} rows to {output}")
+
+    @app.cli.command('migrate-schema')
+    @click.option('--table', 'tables', multiple=True, help='Copy only this canonical table (repeatable).')
+    @click.option('--batch-size', type=int, default=None, help='Rows per batch and per commit.')
+    @click.option('--checkpoint', type=click.Path(), default=None, help='Resume from (and record progress in) this file.')
+    def migrate_schema_command(tables, batch_size, checkpoint):
+        """Copy rows from the legacy layout (LEGACY_DATABASE_URL) into schema.sql (DATABASE_URL)."""
+        from src import schema_migration
+        try:
+            results = schema_migration.migrate(
+                tables=tables, batch_size=batch_size or schema_migration.DEFAULT_BATCH_SIZE,
+                checkpoint_path=checkpoint,
+                progress=lambda table, counts: click.echo(f"{table}: {counts['read']} rows", err=True)
+            )
+        except schema_migration.MigrationError as e:
+            raise click.ClickException(str(e))
+        for table, counts in results.items():
+            click.echo(f"{table}: {counts['inserted']} inserted, {counts['read'] - counts['inserted']} already present")
+            if counts['dropped_columns']:
+                click.echo(f"{table}: not in the target table, left out: {', '.join(counts['dropped_columns'])}", err=True)
+
+    @app.cli.command('migrate-bookings')
+    @click.argument('source_url')
+    @click.option('--batch-size', type=int, default=None, help='Rows per batch and per commit.')
+    @click.option('--checkpoint', type=click.Path(), default=None, help='Resume from (and record progress in) this file.')
+    def migrate_bookings_command(source_url, batch_size, checkpoint):
+        """Copy the bookings of reinvent-booking-backend's database (SQLAlchemy URL) into this app's."""
+        from src import schema_migration
+        try:
+            counts = schema_migration.migrate_bookings(
+                source_url, batch_size=batch_size or schema_migration.DEFAULT_BATCH_SIZE, checkpoint_path=checkpoint,
+                progress=lambda table, counts: click.echo(f"{counts['read']} rows", err=True)
+            )
+        except schema_migration.MigrationError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"{counts['inserted']} inserted, {counts['skipped']} already present, "
+                   f"{counts['unmatched']} without a matching program or client email")
+
+    @app.cli.command('run-reminders')
+    def run_reminders_command():
+        """Run the session reminder scheduler in the foreground."""
+        click.echo('Reminder scheduler running')
+        reminders.scheduler.run()
+
+    register_static_routes(app)
+    return app
+
+# doc_type, title attribute and body attributes of indexed Program rows
+PROGRAM_SEARCH_FIELDS = ('program', 'name', ['short_name', 'description', 'program_type'])
+_search_index_registered = False
+
+def register_search_index():
+    # Mapper events are global to the model, so they are attached once per process
+    global _search_index_registered
+    if _search_index_registered:
+        return
+    from src import search_index
+    from src.models.program import Program
+
+    search_index.register_model(Program, *PROGRAM_SEARCH_FIELDS, is_public=lambda p: p.is_active)
+    _search_index_registered = True
+
+def register_static_routes(app):
+    manifest_lock = threading.Lock()
+
+    def get_static_manifest():
+        # Indexing the static folder hashes files, so it happens on the first page hit
+        manifest = app.extensions.get('static_manifest')
+        if manifest is None:
+            with manifest_lock:
+                manifest = app.extensions.get('static_manifest')
+                if manifest is None:
+                    from src.static_assets import StaticManifest
+
+                    manifest = StaticManifest(app.static_folder)
+                    app.extensions['static_manifest'] = manifest
+        return manifest
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if app.static_folder is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+        static_manifest = get_static_manifest()
+        response = static_manifest.serve(path) if path != "" else None
+        if response is None:
+            response = static_manifest.serve_index()
+        if response is None:
             return "index.html not found", 404
-
+        return response
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
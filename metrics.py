@@ -0,0 +1,290 @@
+"""
+Request, database and outbound-call instrumentation exported in Prometheus text format.
+
+``init_app`` installs request hooks that time every sampled request by blueprint and
+route, counts SQLAlchemy queries per request through engine events, and serves the
+collected histograms on ``/metrics``. Stripe and Supabase clients are timed through
+``instrument_stripe``/``instrument_supabase`` (applied in src/clients.py).
+
+Sampling is controlled by ``METRICS_SAMPLE_RATE`` (0 disables collection; the hooks
+then return after a single check).
+
+``/metrics`` requires ``Authorization: Bearer <METRICS_TOKEN>`` (``ADMIN_TOKEN`` is
+accepted too) and answers 403 while neither is set; behind the reverse proxy every
+client looks local, so the address is not checked. The registry lives in the process
+that serves the request: under several workers each scrape sees one worker's numbers.
+Run the app with a single worker, or give each worker its own port and scrape every one.
+"""
+
+import bisect
+import contextvars
+import hmac
+import os
+import random
+import threading
+import time
+import types
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+# Per-request SQL stats; None when the current request is not sampled
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum, self.count
+
+
+class MetricsRegistry:
+    def __init__(self, sample_rate=1.0):
+        self.sample_rate = sample_rate
+        self._metrics = {}  # name -> (help, buckets, {labels: Histogram})
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def should_sample(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def define(self, name, help_text, buckets):
+        self._metrics.setdefault(name, (help_text, buckets, {}))
+
+    def observe(self, name, labels, value):
+        _, buckets, series = self._metrics[name]
+        histogram = series.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = series.setdefault(labels, Histogram(buckets))
+        histogram.observe(value)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, (help_text, buckets, series) in sorted(self._metrics.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, histogram in sorted(series.items()):
+                counts, total, count = histogram.snapshot()
+                label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+                prefix = label_text + ',' if label_text else ''
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+                lines.append(f'{name}_sum{{{label_text}}} {total}')
+                lines.append(f'{name}_count{{{label_text}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry(float(os.getenv('METRICS_SAMPLE_RATE', '1.0')))
+registry.define('http_request_duration_seconds', 'Request latency by blueprint and route', LATENCY_BUCKETS)
+registry.define('db_queries_per_request', 'SQLAlchemy queries executed per request', QUERY_COUNT_BUCKETS)
+registry.define('db_query_duration_seconds', 'SQLAlchemy query latency by route', LATENCY_BUCKETS)
+registry.define('outbound_request_duration_seconds', 'Stripe and Supabase call latency', LATENCY_BUCKETS)
+
+
+class RequestStats:
+    __slots__ = ('started', 'query_count', 'query_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+
+
+def current_route():
+    """(blueprint, route) labels for the current request"""
+    rule = request.url_rule
+    return request.blueprint or 'app', rule.rule if rule is not None else 'unmatched'
+
+
+def _before_request():
+    if not registry.enabled or not registry.should_sample():
+        return
+    g._metrics_token = _request_stats.set(RequestStats())
+
+
+def _after_request(response):
+    stats = _request_stats.get()
+    if stats is None:
+        return response
+
+    elapsed = time.perf_counter() - stats.started
+    blueprint, route = current_route()
+    registry.observe('http_request_duration_seconds', (
+        ('blueprint', blueprint), ('route', route), ('method', request.method), ('status', str(response.status_code))
+    ), elapsed)
+    registry.observe('db_queries_per_request', (('blueprint', blueprint), ('route', route)), stats.query_count)
+    return response
+
+
+def _teardown_request(exc):
+    token = g.pop('_metrics_token', None)
+    if token is not None:
+        _request_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats.query_count += 1
+    stats.query_time += elapsed
+    blueprint, route = current_route()
+    registry.observe('db_query_duration_seconds', (('blueprint', blueprint), ('route', route)), elapsed)
+
+
+def metrics_view():
+    auth_header = request.headers.get('Authorization', '')
+    token = auth_header[7:] if auth_header.startswith('Bearer ') else ''
+    allowed = [secret for secret in (os.getenv('METRICS_TOKEN'), os.getenv('ADMIN_TOKEN')) if secret]
+    if not token or not any(hmac.compare_digest(token, secret) for secret in allowed):
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+_engine_events_installed = False
+
+
+def init_app(app):
+    """Install request hooks, SQLAlchemy engine events and the /metrics endpoint"""
+    global _engine_events_installed
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    if not _engine_events_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _engine_events_installed = True
+
+
+def observe_outbound(service, operation, started, outcome):
+    registry.observe('outbound_request_duration_seconds', (
+        ('service', service), ('operation', operation), ('outcome', outcome)
+    ), time.perf_counter() - started)
+
+
+class _TimedCall:
+    """Stripe attribute chain (``stripe.checkout.Session.create``) timed at the call"""
+
+    __slots__ = ('_target', '_operation')
+
+    def __init__(self, target, operation):
+        self._target = target
+        self._operation = operation
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if isinstance(value, type) and issubclass(value, BaseException):
+            return value  # must stay usable in ``except`` clauses
+        if isinstance(value, (types.ModuleType, type)) or callable(value):
+            return _TimedCall(value, f'{self._operation}.{name}' if self._operation else name)
+        return value
+
+    def __setattr__(self, name, value):
+        if name in _TimedCall.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._target, name, value)
+
+    def __call__(self, *args, **kwargs):
+        if not registry.enabled:
+            return self._target(*args, **kwargs)
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = self._target(*args, **kwargs)
+            outcome = 'ok'
+            return result
+        finally:
+            observe_outbound('stripe', self._operation, started, outcome)
+
+
+class _TimedQuery:
+    """Supabase query builder chain; only ``execute`` performs I/O and is timed"""
+
+    __slots__ = ('_target', '_resource', '_verb')
+
+    def __init__(self, target, resource=None, verb=None):
+        self._target = target
+        self._resource = resource
+        self._verb = verb
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            if name == 'execute':
+                return self._execute(value, *args, **kwargs)
+            result = value(*args, **kwargs)
+            resource, verb = self._resource, self._verb
+            if name in ('table', 'from_'):
+                resource = args[0] if args else kwargs.get('table_name')
+            elif name == 'rpc':
+                resource, verb = 'rpc', args[0] if args else kwargs.get('fn')
+            elif name in ('select', 'insert', 'update', 'upsert', 'delete') and verb is None:
+                verb = name
+            return _TimedQuery(result, resource, verb)
+        return call
+
+    def _execute(self, execute, *args, **kwargs):
+        if not registry.enabled:
+            return execute(*args, **kwargs)
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = execute(*args, **kwargs)
+            outcome = 'ok'
+            return result
+        finally:
+            observe_outbound('supabase', f'{self._resource}.{self._verb}', started, outcome)
+
+
+def instrument_stripe(stripe_module):
+    return _TimedCall(stripe_module, '')
+
+
+def instrument_supabase(client):
+    return _TimedQuery(client)
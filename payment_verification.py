@@ -0,0 +1,144 @@
+"""
+Cached, coalesced answers for ``GET /verify-payment/<session_id>``.
+
+The dashboard polls this endpoint after checkout. Each answer is cached per session
+for ``VERIFY_PAYMENT_CACHE_TTL`` seconds, and concurrent polls for the same session
+wait for one in-flight lookup instead of each calling Stripe and Supabase.
+
+A checkout session's ``enrollment_id`` never changes, so it is remembered after the
+first Stripe call. From then on the enrollment row is read first. Once the webhook
+has recorded a terminal payment status the answer comes from that row alone, is
+cached for ``VERIFY_PAYMENT_TERMINAL_TTL``, and Stripe is not called again. The
+webhook handlers call ``forget`` so the next poll sees their update immediately.
+"""
+
+import os
+import threading
+import time
+
+DEFAULT_TTL = float(os.getenv('VERIFY_PAYMENT_CACHE_TTL', '5'))
+TERMINAL_TTL = float(os.getenv('VERIFY_PAYMENT_TERMINAL_TTL', '600'))
+MAX_ENTRIES = 10000
+# Enrollment payment_status values the webhook writes once a checkout is over
+TERMINAL_STATUSES = {'completed': 'paid', 'failed': 'unpaid', 'expired': 'unpaid'}
+
+
+class PaymentLookupError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def metadata_value(stripe_object, key):
+    """``object.metadata[key]`` or None; StripeObject is not a dict in newer SDKs"""
+    try:
+        metadata = stripe_object['metadata']
+    except (KeyError, TypeError):
+        return None
+    if not metadata or key not in metadata:
+        return None
+    return metadata[key]
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PaymentVerifier:
+    def __init__(self, stripe, supabase, ttl=DEFAULT_TTL, terminal_ttl=TERMINAL_TTL, clock=time.monotonic):
+        self.stripe = stripe
+        self.supabase = supabase
+        self.ttl = ttl
+        self.terminal_ttl = terminal_ttl
+        self.clock = clock
+        self._results = {}  # session_id -> (expires_at, result)
+        self._enrollments = {}  # session_id -> enrollment_id
+        self._flights = {}  # session_id -> _Flight
+        self._lock = threading.Lock()
+
+    def verify(self, session_id):
+        """Response body for a checkout session; raises PaymentLookupError or Stripe errors"""
+        with self._lock:
+            cached = self._results.get(session_id)
+            if cached and cached[0] > self.clock():
+                return cached[1]
+            flight = self._flights.get(session_id)
+            leader = flight is None
+            if leader:
+                flight = self._flights[session_id] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            result, ttl = self._lookup(session_id)
+            flight.result = result
+            with self._lock:
+                if len(self._results) >= MAX_ENTRIES:
+                    now = self.clock()
+                    self._results = {key: entry for key, entry in self._results.items() if entry[0] > now}
+                self._results[session_id] = (self.clock() + ttl, result)
+            return result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(session_id, None)
+            flight.done.set()
+
+    def _lookup(self, session_id):
+        with self._lock:
+            enrollment_id = self._enrollments.get(session_id)
+        stripe_status = None
+        if enrollment_id is None:
+            session = self.stripe.checkout.Session.retrieve(session_id)
+            enrollment_id = metadata_value(session, 'enrollment_id')
+            if not enrollment_id:
+                raise PaymentLookupError('Invalid session', 400)
+            stripe_status = session.payment_status
+            with self._lock:
+                if len(self._enrollments) >= MAX_ENTRIES:
+                    self._enrollments.clear()
+                self._enrollments[session_id] = enrollment_id
+
+        rows = self.supabase.table('enrollments').select('id, payment_status, enrolled_at, program:programs(name)') \
+            .eq('id', enrollment_id).limit(1).execute().data
+        if not rows:
+            raise PaymentLookupError('Enrollment not found', 404)
+        enrollment = rows[0]
+
+        terminal = enrollment['payment_status'] in TERMINAL_STATUSES
+        if stripe_status is None:
+            if terminal:
+                stripe_status = TERMINAL_STATUSES[enrollment['payment_status']]
+            else:
+                stripe_status = self.stripe.checkout.Session.retrieve(session_id).payment_status
+
+        result = {
+            'payment_status': stripe_status,
+            'enrollment': {
+                'id': enrollment['id'],
+                'program_name': (enrollment.get('program') or {}).get('name'),
+                'payment_status': enrollment['payment_status'],
+                'enrolled_at': enrollment['enrolled_at']
+            }
+        }
+        return result, self.terminal_ttl if terminal else self.ttl
+
+    def forget(self, session_id=None, enrollment_id=None):
+        """Drop cached answers after the webhook changed an enrollment"""
+        with self._lock:
+            if session_id is not None:
+                self._results.pop(session_id, None)
+            if enrollment_id is not None:
+                for key in [key for key, (_, result) in self._results.items() if result['enrollment']['id'] == enrollment_id]:
+                    del self._results[key]
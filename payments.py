@@ -1,21 +1,33 @@
 import os
-import stripe
+import re
 import json
-from flask import Blueprint, request, jsonify, current_app
-from supabase import create_client, Client
+from flask import Blueprint, request, jsonify, current_app, send_file
 from datetime import datetime, timedelta
 
-# Initialize Stripe
-stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
-
-# Initialize Supabase
-supabase_url = os.getenv('SUPABASE_URL')
-supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
-supabase: Client = create_client(supabase_url, supabase_key)
+# Stripe and Supabase are initialized on first use
+from src.clients import stripe, supabase
+from src.certificates import ContentStore
+from src.enrollment_queries import DEFAULT_PAGE_SIZE, EnrollmentQueries
+from src.payment_verification import PaymentLookupError, PaymentVerifier, metadata_value
+from src.rate_limit import rate_limit
+
+# Dashboard polls share cached, single-flight lookups per checkout session
+verifier = PaymentVerifier(stripe, supabase)
+# Projected enrollment reads; user pages are cached until a payment changes them
+enrollments = EnrollmentQueries(supabase)
+# PDFs written by `flask issue-certificates`
+certificate_store = ContentStore()
+
+def forget_enrollments(rows):
+    """Drop cached pages and payment answers of enrollments changed elsewhere, e.g. by the sweeper"""
+    for row in rows:
+        verifier.forget(enrollment_id=row['id'])
+        enrollments.invalidate(row['user_id'])
 
 payments_bp = Blueprint('payments', __name__)
 
 @payments_bp.route('/create-checkout-session', methods=['POST'])
+@rate_limit('checkout', '10/minute')
 def create_checkout_session():
     try:
         data = request.get_json()
@@ -48,6 +60,7 @@ def create_checkout_session():
             return jsonify({'error': 'Failed to create enrollment'}), 500
             
         enrollment = enrollment_response.data[0]
+        enrollments.invalidate(user_id)
 
         # Create Stripe checkout session
         checkout_session = stripe.checkout.Session.create(
@@ -128,7 +141,7 @@ def stripe_webhook():
 def handle_successful_payment(session):
     """Handle successful payment completion"""
     try:
-        enrollment_id = session['metadata'].get('enrollment_id')
+        enrollment_id = metadata_value(session, 'enrollment_id')
         
         if not enrollment_id:
             current_app.logger.error('No enrollment_id in session metadata')
@@ -138,16 +151,19 @@ def handle_successful_payment(session):
         update_data = {
             'payment_status': 'completed',
             'stripe_payment_id': session['payment_intent'],
-            'access_expires_at': (datetime.utcnow() + timedelta(days=365)).isoformat()  # 1 year access
+            'access_expires_at': (datetime.utcnow() + timedelta(days=365)).isoformat(),  # 1 year access
+            'access_status': 'active'
         }
         
         supabase.table('enrollments').update(update_data).eq('id', enrollment_id).execute()
+        verifier.forget(session['id'], enrollment_id)
 
         # Create welcome notification
         enrollment_response = supabase.table('enrollments').select('user_id, program:programs(name)').eq('id', enrollment_id).single().execute()
         
         if enrollment_response.data:
             user_id = enrollment_response.data['user_id']
+            enrollments.invalidate(user_id)
             program_name = enrollment_response.data['program']['name']
             
             notification_data = {
@@ -169,12 +185,15 @@ def handle_successful_payment(session):
 def handle_expired_payment(session):
     """Handle expired payment session"""
     try:
-        enrollment_id = session['metadata'].get('enrollment_id')
+        enrollment_id = metadata_value(session, 'enrollment_id')
         
         if enrollment_id:
-            supabase.table('enrollments').update({
+            updated = supabase.table('enrollments').update({
                 'payment_status': 'expired'
             }).eq('id', enrollment_id).execute()
+            verifier.forget(session['id'], enrollment_id)
+            for row in updated.data or []:
+                enrollments.invalidate(row['user_id'])
             
         current_app.logger.info(f'Payment session expired for enrollment {enrollment_id}')
 
@@ -193,6 +212,8 @@ def handle_failed_payment(payment_intent):
             supabase.table('enrollments').update({
                 'payment_status': 'failed'
             }).eq('id', enrollment['id']).execute()
+            verifier.forget(enrollment_id=enrollment['id'])
+            enrollments.invalidate(enrollment['user_id'])
             
             # Create failure notification
             notification_data = {
@@ -214,31 +235,10 @@ def handle_failed_payment(payment_intent):
 def verify_payment(session_id):
     """Verify payment status for a checkout session"""
     try:
-        session = stripe.checkout.Session.retrieve(session_id)
-        
-        enrollment_id = session.metadata.get('enrollment_id')
-        
-        if not enrollment_id:
-            return jsonify({'error': 'Invalid session'}), 400
-
-        # Get enrollment details
-        enrollment_response = supabase.table('enrollments').select('*, program:programs(*)').eq('id', enrollment_id).single().execute()
-        
-        if not enrollment_response.data:
-            return jsonify({'error': 'Enrollment not found'}), 404
-
-        enrollment = enrollment_response.data
-
-        return jsonify({
-            'payment_status': session.payment_status,
-            'enrollment': {
-                'id': enrollment['id'],
-                'program_name': enrollment['program']['name'],
-                'payment_status': enrollment['payment_status'],
-                'enrolled_at': enrollment['enrolled_at']
-            }
-        })
+        return jsonify(verifier.verify(session_id))
 
+    except PaymentLookupError as e:
+        return jsonify({'error': str(e)}), e.status
     except stripe.error.StripeError as e:
         return jsonify({'error': f'Stripe error: {str(e)}'}), 400
     except Exception as e:
@@ -249,13 +249,11 @@ def verify_payment(session_id):
 def get_enrollment_status(enrollment_id):
     """Get enrollment status and details"""
     try:
-        enrollment_response = supabase.table('enrollments').select('*, program:programs(*)').eq('id', enrollment_id).single().execute()
+        enrollment = enrollments.detail(enrollment_id)
         
-        if not enrollment_response.data:
+        if not enrollment:
             return jsonify({'error': 'Enrollment not found'}), 404
 
-        enrollment = enrollment_response.data
-
         return jsonify({
             'enrollment': {
                 'id': enrollment['id'],
@@ -263,7 +261,8 @@ def get_enrollment_status(enrollment_id):
                 'payment_status': enrollment['payment_status'],
                 'progress_percentage': enrollment['progress_percentage'],
                 'enrolled_at': enrollment['enrolled_at'],
-                'access_expires_at': enrollment['access_expires_at']
+                'access_expires_at': enrollment['access_expires_at'],
+                'access_status': enrollment.get('access_status') or 'active'
             }
         })
 
@@ -271,17 +270,38 @@ def get_enrollment_status(enrollment_id):
         current_app.logger.error(f'Enrollment status error: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
 
+@payments_bp.route('/certificates/<digest>.pdf', methods=['GET'])
+def download_certificate(digest):
+    """Serve a certificate by content hash; the bytes never change, so caches keep it"""
+    if not re.fullmatch(r'[0-9a-f]{64}', digest):
+        return jsonify({'error': 'Certificate not found'}), 404
+    path = certificate_store.path_for(digest)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Certificate not found'}), 404
+
+    response = send_file(path, mimetype='application/pdf', download_name='certificate.pdf',
+                         etag=digest, conditional=True, max_age=31536000)
+    response.cache_control.immutable = True
+    return response
+
 @payments_bp.route('/user-enrollments/<user_id>', methods=['GET'])
 def get_user_enrollments(user_id):
-    """Get all enrollments for a user"""
-    try:
-        enrollments_response = supabase.table('enrollments').select('*, program:programs(*)').eq('user_id', user_id).order('enrolled_at', desc=True).execute()
+    """Get a page of a user's enrollments, newest first
 
-        return jsonify({
-            'enrollments': enrollments_response.data or []
-        })
+    ``fields`` picks a column preset (card or detail); pass ``next_cursor`` back as
+    ``cursor`` for the following page.
+    """
+    try:
+        page = enrollments.user_page(
+            user_id,
+            request.args.get('fields', 'card'),
+            request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+            request.args.get('cursor')
+        )
+        return jsonify(page)
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f'User enrollments error: {str(e)}')
         return jsonify({'error': 'Internal server error'}), 500
-
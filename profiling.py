@@ -0,0 +1,128 @@
+"""
+Slow-query log and an on-demand sampling profiler.
+
+``SlowQueryLog`` hooks SQLAlchemy cursor events and records every statement slower
+than ``SLOW_QUERY_MS`` with the shape of its parameters, the route that issued it and
+a short excerpt of the application stack. ``sample_stacks`` samples every thread's
+stack for a fixed duration and returns collapsed stacks that flamegraph.pl and
+speedscope read directly.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('reinvent.slow_query')
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+STACK_EXCERPT_DEPTH = 6
+
+
+def parameter_shape(parameters, executemany=False):
+    """Types of the bound parameters without their values"""
+    if executemany:
+        rows = list(parameters or [])
+        return {'rows': len(rows), 'row': parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def application_stack(depth=STACK_EXCERPT_DEPTH):
+    """Innermost frames that belong to this project, outermost first"""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(PROJECT_DIR) and not frame.filename.endswith('profiling.py')
+    ]
+    return [f'{os.path.relpath(frame.filename, PROJECT_DIR)}:{frame.lineno} in {frame.name}' for frame in frames[-depth:]]
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms=None, keep=200):
+        self.threshold = (threshold_ms if threshold_ms is not None else float(os.getenv('SLOW_QUERY_MS', '200'))) / 1000
+        self.entries = deque(maxlen=keep)
+        self._installed = False
+
+    def install(self):
+        if self._installed:
+            return
+        event.listen(Engine, 'before_cursor_execute', self._before)
+        event.listen(Engine, 'after_cursor_execute', self._after)
+        self._installed = True
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('slow_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if elapsed < self.threshold:
+            return
+
+        entry = {
+            'duration_ms': round(elapsed * 1000, 2),
+            'statement': ' '.join(statement.split()),
+            'parameters': parameter_shape(parameters, executemany),
+            'route': f'{request.method} {request.url_rule.rule}' if has_request_context() and request.url_rule else None,
+            'stack': application_stack(),
+            'at': time.time(),
+        }
+        self.entries.append(entry)
+        logger.warning('Slow query (%.1f ms) on %s: %s params=%s stack=%s',
+                       entry['duration_ms'], entry['route'], entry['statement'][:500],
+                       entry['parameters'], ' <- '.join(reversed(entry['stack'])))
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_DIR):
+        filename = os.path.relpath(filename, PROJECT_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+def sample_stacks(duration, interval=0.005):
+    """Sample all threads for ``duration`` seconds.
+
+    Returns (collapsed stack text, number of samples). Each line is
+    ``thread;outer;...;inner count``.
+    """
+    own_ident = threading.get_ident()
+    names = {}
+    stacks = Counter()
+    samples = 0
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        for thread in threading.enumerate():
+            names.setdefault(thread.ident, thread.name)
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f'thread-{ident}'))
+            stacks[';'.join(reversed(labels))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    collapsed = '\n'.join(f'{stack} {count}' for stack, count in stacks.most_common())
+    return collapsed + '\n', samples
@@ -1,6 +1,10 @@
 from flask import Blueprint, jsonify, request
+from sqlalchemy import select
 from src.models.user import db
 from src.models.program import Program
+from src.seats import set_capacity
+from src.serialization import json_response, schema_for
+from src.sqlite_profile import read_bind
 
 program_bp = Blueprint('program', __name__)
 
@@ -8,11 +12,22 @@ program_bp = Blueprint('program', __name__)
 def get_programs():
     """Get all active programs"""
     try:
-        programs = Program.query.filter_by(is_active=True).all()
-        return jsonify({
+        try:
+            schema = schema_for(Program, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        programs = db.session.scalars(
+            select(Program).options(*schema.load_options()).filter_by(is_active=True),
+            bind_arguments=read_bind()
+        ).all()
+        return json_response({
             'success': True,
-            'programs': [program.to_dict() for program in programs]
-        }), 200
+            'programs': schema.dump_many(programs)
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -23,11 +38,19 @@ def get_programs():
 def get_program(program_id):
     """Get a specific program by ID"""
     try:
+        try:
+            schema = schema_for(Program, request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
         program = Program.query.get_or_404(program_id)
-        return jsonify({
+        return json_response({
             'success': True,
-            'program': program.to_dict()
-        }), 200
+            'program': schema.dump(program)
+        })
     except Exception as e:
         return jsonify({
             'success': False,
@@ -77,6 +100,8 @@ def update_program(program_id):
         program.duration_days = data.get('duration_days', program.duration_days)
         program.price = data.get('price', program.price)
         program.program_type = data.get('program_type', program.program_type)
+        if 'max_participants' in data and data['max_participants'] != program.max_participants:
+            set_capacity(program.id, data['max_participants'])
         program.max_participants = data.get('max_participants', program.max_participants)
         program.is_active = data.get('is_active', program.is_active)
         
@@ -0,0 +1,166 @@
+"""
+Token-bucket rate limiting for public endpoints, shared by every worker on a node.
+
+Buckets live in a memory-mapped file (``/dev/shm`` when available), so all gunicorn
+workers on a host draw from one budget per client and route without an external
+service. The file is a fixed hash table of ``RATE_LIMIT_SLOTS`` slots split into
+groups of ``PROBES``; a key (route and client address) hashes to one group and holds
+the slot with its hash, or takes an empty one, or evicts the least recently used slot
+of the group. A bucket that is evicted was idle long enough to have refilled, so the
+client only ever gains capacity. Each group is guarded by an ``fcntl`` byte-range lock
+on one of ``STRIPES`` lock bytes (plus a thread lock, since fcntl locks are held per
+process), so a check costs a hash, two lock calls and two struct reads/writes.
+
+Limits are ``"<requests>/<second|minute|hour>"``, set where the route is declared and
+overridable per route with ``RATE_LIMIT_<NAME>``. ``RATE_LIMIT_ENABLED=0`` turns
+limiting off. Behind one reverse proxy set ``RATE_LIMIT_TRUST_PROXY=1`` so the client
+address is the last X-Forwarded-For entry, the one the proxy appended; earlier entries
+come from the client and can be forged.
+"""
+
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+
+DEFAULT_SLOTS = int(os.getenv('RATE_LIMIT_SLOTS', '65536'))
+TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', '0') == '1'
+DEFAULT_DIRECTORY = os.getenv('RATE_LIMIT_DIR') or ('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir())
+PROBES = 8
+STRIPES = 64
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+MAGIC = b'RTB1'
+HEADER = struct.Struct('<4sI')  # magic, slots
+SLOT = struct.Struct('<Qdd')  # key hash (0 = empty), tokens, updated_at
+GROUP = struct.Struct('<' + 'Qdd' * PROBES)
+
+
+def parse_limit(text):
+    """``"30/minute"`` -> (capacity, seconds)"""
+    try:
+        count, _, period = text.partition('/')
+        capacity = int(count)
+        seconds = PERIODS[period.strip().lower().rstrip('s')]
+    except (KeyError, ValueError):
+        raise ValueError(f'Invalid rate limit {text!r}; expected "<requests>/<second|minute|hour>"')
+    if capacity <= 0:
+        raise ValueError(f'Invalid rate limit {text!r}; requests must be positive')
+    return capacity, seconds
+
+
+class SharedBuckets:
+    def __init__(self, path, slots=DEFAULT_SLOTS, clock=time.time):
+        if slots < PROBES or slots % PROBES:
+            raise ValueError(f'slots must be a multiple of {PROBES}')
+        self.groups = slots // PROBES
+        self.clock = clock
+        self._lock = threading.Lock()
+        size = HEADER.size + slots * SLOT.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        # The first worker to open the file lays it out; the others wait on the whole-file lock
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size != size or os.pread(self.fd, HEADER.size, 0) != HEADER.pack(MAGIC, slots):
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, HEADER.pack(MAGIC, slots), 0)
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, size)
+
+    def take(self, key, capacity, seconds, cost=1):
+        """Spend ``cost`` tokens from ``key``'s bucket. Returns (allowed, retry_after seconds)."""
+        digest = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+        group = digest % self.groups
+        offset = HEADER.size + group * GROUP.size
+        stripe = group % STRIPES
+        rate = capacity / seconds
+
+        with self._lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                now = self.clock()
+                values = GROUP.unpack_from(self.map, offset)
+                slot = empty = oldest = None
+                for index in range(PROBES):
+                    slot_hash, _, updated_at = values[index * 3:index * 3 + 3]
+                    if slot_hash == digest:
+                        slot = index
+                        break
+                    if slot_hash == 0:
+                        if empty is None:
+                            empty = index
+                    elif oldest is None or updated_at < values[oldest * 3 + 2]:
+                        oldest = index
+
+                if slot is None:
+                    slot = empty if empty is not None else oldest
+                    tokens = float(capacity)
+                else:
+                    tokens, updated_at = values[slot * 3 + 1:slot * 3 + 3]
+                    # A clock step backwards (restored snapshot, NTP) refills nothing rather than draining
+                    tokens = min(float(capacity), tokens + max(0.0, now - updated_at) * rate)
+
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                SLOT.pack_into(self.map, offset + slot * SLOT.size, digest, tokens, now)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, stripe)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def shared_buckets():
+    """The node-wide bucket table, opened on first use in each worker"""
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                path = os.path.join(DEFAULT_DIRECTORY, f'reinvent-rate-limit-{DEFAULT_SLOTS}.bin')
+                _buckets = SharedBuckets(path, DEFAULT_SLOTS)
+    return _buckets
+
+
+def client_address():
+    if TRUST_PROXY and request.access_route:
+        return request.access_route[-1]
+    return request.remote_addr or ''
+
+
+def rate_limit(name, default):
+    """Limit a view to ``default`` (``"30/minute"``) per client address"""
+    capacity, seconds = parse_limit(os.getenv(f'RATE_LIMIT_{name.upper()}', default))
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if current_app.config.get('RATE_LIMIT_ENABLED', True):
+                allowed, retry_after = shared_buckets().take(f'{name}:{client_address()}', capacity, seconds)
+                if not allowed:
+                    response = jsonify({
+                        'success': False,
+                        'error': 'Too many requests, please try again later'
+                    })
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,491 @@
+"""
+In-process reminder scheduler for booking sessions and coaching sessions.
+
+Upcoming reminders live in a min-heap keyed by due time. The heap only holds the next
+``REMINDER_WINDOW_HOURS`` of reminders: it is filled by one range query per source on
+start (and every ``REMINDER_RELOAD_MINUTES`` to advance the horizon). In between, every
+``REMINDER_POLL_SECONDS`` the scheduler re-reads the bookings and coaching sessions
+changed since its last poll, so changes made by other web workers are picked up too:
+bookings through their ``schedule_versions`` row (bumped in the transaction that changes
+the booking, see src/calendar_feed.py), coaching sessions by ``created_at``. Routes in
+the scheduler's own process also update the heap directly. A single thread sleeps until
+the earliest reminder is due, pops everything due, drops reminders whose session was
+cancelled in the meantime (one query per batch) and hands the rest to the source's sink
+in batches of ``REMINDER_BATCH_SIZE``.
+
+Booking session reminders are emailed to the booking's user over SMTP (``SMTP_HOST``);
+without it they are not scheduled at all. Coaching reminders become ``notifications``
+rows in Supabase.
+
+A reminder's key names its session, lead time and due time, so a rescheduled session
+gets new reminders. Keys are written to ``sent_reminders`` in the transaction that sends
+the batch, so a restart, which reloads the window from scratch, does not send them
+twice, and a batch whose send fails is retried on the next reload. Run the scheduler in one process only:
+set REMINDER_SCHEDULER=1 on a single worker, or run ``flask run-reminders``.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from zoneinfo import ZoneInfo
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from src.models.user import db
+
+logger = logging.getLogger('reinvent.reminders')
+
+LEAD_MINUTES = tuple(int(value) for value in os.getenv('REMINDER_LEAD_MINUTES', '1440,60').split(','))
+WINDOW = float(os.getenv('REMINDER_WINDOW_HOURS', '48')) * 3600
+RELOAD_INTERVAL = float(os.getenv('REMINDER_RELOAD_MINUTES', '15')) * 60
+# Reminders that came due while the scheduler was down are still sent within this grace
+GRACE = float(os.getenv('REMINDER_GRACE_MINUTES', '30')) * 60
+BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '500'))
+POLL_INTERVAL = float(os.getenv('REMINDER_POLL_SECONDS', '30'))
+# Each poll re-reads this far behind the previous one, so a transaction that committed a
+# while after its updated_at is not missed; re-reading a change is harmless
+POLL_OVERLAP = 120
+
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1') == '1'
+REMINDER_FROM_EMAIL = os.getenv('REMINDER_FROM_EMAIL', 'no-reply@reinvent-international.org')
+
+
+class SentReminder(db.Model):
+    __tablename__ = 'sent_reminders'
+
+    key = db.Column(db.String(120), primary_key=True)
+    sent_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class Reminder:
+    __slots__ = ('slot', 'key', 'due', 'source', 'record_id', 'user_id', 'title', 'message')
+
+    def __init__(self, slot, due, source, record_id, user_id, title, message):
+        # One pending reminder per slot (session and lead time); the key adds the due time
+        self.slot = slot
+        self.key = f'{slot}:{int(due)}'
+        self.due = due
+        self.source = source
+        self.record_id = record_id
+        self.user_id = user_id
+        self.title = title
+        self.message = message
+
+
+def reminders_for(source, record_id, starts_at, user_id, title, message_format):
+    """One reminder per lead time for a session starting at ``starts_at`` (timestamp)"""
+    return [
+        Reminder(f'{source}:{record_id}:{lead}', starts_at - lead * 60, source, record_id, user_id, title,
+                 message_format.format(lead=_describe_lead(lead)))
+        for lead in LEAD_MINUTES
+    ]
+
+
+def _describe_lead(minutes):
+    if minutes % 1440 == 0:
+        days = minutes // 1440
+        return 'tomorrow' if days == 1 else f'in {days} days'
+    if minutes % 60 == 0:
+        hours = minutes // 60
+        return 'in 1 hour' if hours == 1 else f'in {hours} hours'
+    return f'in {minutes} minutes'
+
+
+def _naive_utc(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class BookingSessionSource:
+    """Sessions generated by create_booking, stored in the local database; reminders are emailed"""
+
+    name = 'booking_session'
+
+    def __init__(self, tz=None, smtp_host=SMTP_HOST):
+        self.tz = ZoneInfo(tz or os.getenv('SESSION_TIMEZONE', 'UTC'))
+        self.smtp_host = smtp_host
+
+    def starts_at(self, session):
+        return datetime.combine(session.session_date, session.start_time, self.tz).timestamp()
+
+    def for_session(self, session, booking, program_name):
+        title = f'Upcoming session: {program_name}' if program_name else 'Upcoming session'
+        return reminders_for(self.name, session.id, self.starts_at(session), booking.user_id,
+                             title, f"Your session at {session.location or 'TBD'} starts {{lead}}.")
+
+    def for_booking(self, booking):
+        program_name = booking.program.name if booking.program else None
+        return [reminder for session in booking.sessions if session.status != 'cancelled'
+                for reminder in self.for_session(session, booking, program_name)]
+
+    def upcoming(self, start, end):
+        from src.models.booking import Booking
+        from src.models.program import Program
+        from src.models.session import Session
+
+        first = datetime.fromtimestamp(start, self.tz).date()
+        last = datetime.fromtimestamp(end, self.tz).date() + timedelta(days=max(LEAD_MINUTES) // 1440 + 1)
+        rows = db.session.execute(
+            select(Session, Booking, Program.name)
+            .join(Booking, Session.booking_id == Booking.id)
+            .join(Program, Booking.program_id == Program.id)
+            .where(
+                Session.session_date.between(first, last),
+                Session.status != 'cancelled',
+                Booking.booking_status != 'cancelled'
+            )
+        ).all()
+        return [reminder for session, booking, program_name in rows
+                for reminder in self.for_session(session, booking, program_name)]
+
+    def active(self, record_ids):
+        from src.models.booking import Booking
+        from src.models.session import Session
+
+        return {str(session_id) for session_id in db.session.scalars(
+            select(Session.id).join(Booking, Session.booking_id == Booking.id).where(
+                Session.id.in_(record_ids),
+                Session.status != 'cancelled',
+                Booking.booking_status != 'cancelled'
+            )
+        )}
+
+    def changed(self, since):
+        """(session ids, reminders) of bookings touched since ``since``, in any process"""
+        from src.calendar_feed import ScheduleVersion
+        from src.models.booking import Booking
+
+        touched = select(ScheduleVersion.owner_id).where(
+            ScheduleVersion.owner_type == 'booking', ScheduleVersion.updated_at >= _naive_utc(since)
+        )
+        bookings = db.session.scalars(
+            select(Booking).where(Booking.id.in_(touched))
+            .options(selectinload(Booking.sessions), selectinload(Booking.program))
+        ).all()
+        session_ids = [session.id for booking in bookings for session in booking.sessions]
+        return session_ids, [reminder for booking in bookings if booking.booking_status != 'cancelled'
+                             for reminder in self.for_booking(booking)]
+
+    def send(self, reminders):
+        """One email per reminder over a single SMTP connection; raises if any send fails"""
+        from src.models.user import User
+
+        emails = dict(db.session.execute(
+            select(User.id, User.email).where(User.id.in_({reminder.user_id for reminder in reminders}))
+        ).all())
+        with smtplib.SMTP(self.smtp_host, SMTP_PORT, timeout=30) as smtp:
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if SMTP_USERNAME:
+                smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+            for reminder in reminders:
+                if not emails.get(reminder.user_id):
+                    continue
+                message = EmailMessage()
+                message['From'] = REMINDER_FROM_EMAIL
+                message['To'] = emails[reminder.user_id]
+                message['Subject'] = reminder.title
+                message.set_content(reminder.message)
+                smtp.send_message(message)
+
+
+class CoachingSessionSource:
+    """``coaching_sessions`` in Supabase; reminders go to the ``notifications`` table"""
+
+    name = 'coaching_session'
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def for_row(self, row):
+        starts_at = datetime.fromisoformat(row['scheduled_time'].replace('Z', '+00:00')).timestamp()
+        return reminders_for(self.name, row['id'], starts_at, row['client_id'], 'Upcoming coaching session',
+                             'Your coaching session starts {lead}.')
+
+    def upcoming(self, start, end):
+        last = end + max(LEAD_MINUTES) * 60
+        rows = self.supabase.table('coaching_sessions').select('id, client_id, scheduled_time') \
+            .eq('status', 'scheduled') \
+            .gte('scheduled_time', datetime.fromtimestamp(start, timezone.utc).isoformat()) \
+            .lt('scheduled_time', datetime.fromtimestamp(last, timezone.utc).isoformat()).execute().data or []
+        return [reminder for row in rows if row.get('client_id') for reminder in self.for_row(row)]
+
+    def changed(self, since):
+        """(ids, reminders) of coaching sessions booked since ``since``, in any process.
+
+        coaching_sessions has no updated_at; cancellations elsewhere are caught by
+        ``active`` when the reminder comes due.
+        """
+        rows = self.supabase.table('coaching_sessions').select('id, client_id, scheduled_time, status') \
+            .gte('created_at', datetime.fromtimestamp(since, timezone.utc).isoformat()).execute().data or []
+        return [row['id'] for row in rows], [reminder for row in rows if row.get('status') == 'scheduled' and row.get('client_id')
+                                             for reminder in self.for_row(row)]
+
+    def active(self, record_ids):
+        rows = self.supabase.table('coaching_sessions').select('id') \
+            .in_('id', list(record_ids)).eq('status', 'scheduled').execute().data or []
+        return {str(row['id']) for row in rows}
+
+    def send(self, reminders):
+        self.supabase.table('notifications').insert([{
+            'user_id': reminder.user_id,
+            'title': reminder.title,
+            'message': reminder.message,
+            'type': 'info',
+            'category': 'coaching',
+            'action_url': '/coaching',
+        } for reminder in reminders]).execute()
+
+
+class ReminderScheduler:
+    """Min-heap of reminders due within the window, drained by one thread."""
+
+    def __init__(self, app, sources, window=WINDOW, reload_interval=RELOAD_INTERVAL, batch_size=BATCH_SIZE, clock=time.time,
+                 poll_interval=POLL_INTERVAL):
+        self.app = app
+        self.sources = {source.name: source for source in sources}
+        self.window = window
+        self.reload_interval = reload_interval
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self.horizon = 0
+        self.sent_count = 0
+        self._heap = []  # (due, sequence, slot)
+        self._pending = {}  # slot -> Reminder; heap entries without a match here are stale
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_reload = 0
+        self._next_poll = 0
+        self._polled_at = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def schedule(self, reminders):
+        """Add or move reminders; those past the horizon are left for the next reload"""
+        earliest = None
+        with self._condition:
+            for reminder in reminders:
+                if reminder.due > self.horizon:
+                    self._pending.pop(reminder.slot, None)
+                    continue
+                self._pending[reminder.slot] = reminder
+                heapq.heappush(self._heap, (reminder.due, next(self._sequence), reminder.slot))
+                earliest = reminder.due if earliest is None else min(earliest, reminder.due)
+            if earliest is not None and self._heap[0][0] >= earliest:
+                self._condition.notify()
+
+    def cancel(self, slots):
+        with self._condition:
+            for slot in slots:
+                self._pending.pop(slot, None)
+
+    def cancel_records(self, source, record_ids):
+        prefixes = tuple(f'{source}:{record_id}:' for record_id in record_ids)
+        with self._condition:
+            for slot in [slot for slot in self._pending if slot.startswith(prefixes)]:
+                del self._pending[slot]
+
+    def reload(self):
+        """Load the next window from every source, skipping reminders already sent"""
+        now = self.clock()
+        start = now - GRACE
+        end = now + self.window
+        loaded = []
+        for source in self.sources.values():
+            loaded.extend(reminder for reminder in source.upcoming(start, end) if start <= reminder.due <= end)
+        sent = self._sent_keys([reminder.key for reminder in loaded])
+        with self._condition:
+            self.horizon = end
+        self.schedule(reminder for reminder in loaded if reminder.key not in sent)
+        self._next_reload = now + self.reload_interval
+        self._polled_at = now
+        self._next_poll = now + self.poll_interval
+        return len(loaded) - len(sent)
+
+    def poll(self):
+        """Replace the reminders of sessions changed since the last poll or reload.
+
+        Returns the number of changed records.
+        """
+        now = self.clock()
+        since = (self._polled_at if self._polled_at is not None else now) - POLL_OVERLAP
+        changed = 0
+        for source in self.sources.values():
+            record_ids, reminders = source.changed(since)
+            reminders = [reminder for reminder in reminders if reminder.due >= now - GRACE]
+            sent = self._sent_keys([reminder.key for reminder in reminders])
+            self.cancel_records(source.name, record_ids)
+            self.schedule(reminder for reminder in reminders if reminder.key not in sent)
+            changed += len(record_ids)
+        self._polled_at = now
+        self._next_poll = now + self.poll_interval
+        return changed
+
+    def _sent_keys(self, keys):
+        sent = set()
+        for offset in range(0, len(keys), 1000):
+            sent.update(db.session.scalars(select(SentReminder.key).where(SentReminder.key.in_(keys[offset:offset + 1000]))))
+        return sent
+
+    def pop_due(self, now=None):
+        """Remove and return every reminder due at ``now``"""
+        now = self.clock() if now is None else now
+        due = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                reminder_due, _, slot = heapq.heappop(self._heap)
+                reminder = self._pending.get(slot)
+                # Stale entry: cancelled or rescheduled after it was pushed
+                if reminder is None or reminder.due != reminder_due:
+                    continue
+                del self._pending[slot]
+                due.append(reminder)
+        return due
+
+    def dispatch(self, reminders):
+        """Send due reminders in batches per source, skipping sessions cancelled elsewhere.
+
+        A failed batch is rolled back and logged; it does not stop the other batches, and
+        the next reload (moved up to a minute away) schedules it again.
+        """
+        by_source = {}
+        for reminder in reminders:
+            by_source.setdefault(reminder.source, []).append(reminder)
+        for name, group in by_source.items():
+            source = self.sources[name]
+            for offset in range(0, len(group), self.batch_size):
+                batch = group[offset:offset + self.batch_size]
+                try:
+                    self._send_batch(source, batch)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Reminder batch of %d for %s failed', len(batch), name)
+                    self._next_reload = min(self._next_reload, self.clock() + 60)
+
+    def _send_batch(self, source, batch):
+        active = source.active({str(reminder.record_id) for reminder in batch})
+        batch = [reminder for reminder in batch if str(reminder.record_id) in active]
+        if not batch:
+            return
+        # Keys first, in the same transaction: a key another run already sent fails the
+        # flush before anything goes out, and a failed send leaves no keys behind
+        db.session.add_all(SentReminder(key=reminder.key) for reminder in batch)
+        db.session.flush()
+        source.send(batch)
+        db.session.commit()
+        self.sent_count += len(batch)
+
+    def prune_sent(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.window + GRACE + max(LEAD_MINUTES) * 60)
+        db.session.query(SentReminder).filter(SentReminder.sent_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='reminder-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    if self.clock() >= self._next_reload:
+                        count = self.reload()
+                        self.prune_sent()
+                        logger.info('Reminder window reloaded: %d pending', count)
+                    elif self.clock() >= self._next_poll:
+                        self.poll()
+                    due = self.pop_due()
+                    if due:
+                        self.dispatch(due)
+            except Exception:
+                logger.exception('Reminder scheduler error')
+                self._next_reload = self.clock() + 60
+
+            with self._condition:
+                wake_at = min(self._next_reload, self._next_poll, self._heap[0][0] if self._heap else self._next_reload)
+                timeout = wake_at - self.clock()
+                if timeout > 0 and not self._stop.is_set():
+                    self._condition.wait(timeout)
+
+
+scheduler = None
+
+
+def init_app(app, supabase):
+    """Create the scheduler; it only runs where REMINDER_SCHEDULER is enabled"""
+    global scheduler
+    sources = [CoachingSessionSource(supabase)]
+    if SMTP_HOST:
+        sources.append(BookingSessionSource())
+    elif app.config.get('REMINDER_SCHEDULER'):
+        logger.warning('SMTP_HOST is not set; booking session reminders are disabled')
+    scheduler = ReminderScheduler(app, sources)
+    if app.config.get('REMINDER_SCHEDULER'):
+        scheduler.start()
+    return scheduler
+
+
+def _running(source):
+    """Whether this process runs the scheduler and it has ``source``; other processes rely on its poll"""
+    return scheduler is not None and scheduler._thread is not None and source in scheduler.sources
+
+
+def booking_created(booking):
+    if _running(BookingSessionSource.name):
+        scheduler.schedule(scheduler.sources[BookingSessionSource.name].for_booking(booking))
+
+
+def bookings_created(booking_ids):
+    """``booking_created`` for bookings inserted in bulk"""
+    if _running(BookingSessionSource.name) and booking_ids:
+        from src.models.booking import Booking
+
+        source = scheduler.sources[BookingSessionSource.name]
+        bookings = db.session.scalars(
+            select(Booking).where(Booking.id.in_(booking_ids))
+            .options(selectinload(Booking.sessions), selectinload(Booking.program))
+        ).all()
+        scheduler.schedule([reminder for booking in bookings for reminder in source.for_booking(booking)])
+
+
+def booking_cancelled(booking):
+    if _running(BookingSessionSource.name):
+        scheduler.cancel_records(BookingSessionSource.name, [session.id for session in booking.sessions])
+
+
+def sessions_cancelled(session_ids):
+    if _running(BookingSessionSource.name) and session_ids:
+        scheduler.cancel_records(BookingSessionSource.name, session_ids)
+
+
+def coaching_session_created(row):
+    if _running(CoachingSessionSource.name):
+        scheduler.schedule(scheduler.sources[CoachingSessionSource.name].for_row(row))
+
+
+def coaching_session_cancelled(session_id):
+    if _running(CoachingSessionSource.name):
+        scheduler.cancel_records(CoachingSessionSource.name, [session_id])
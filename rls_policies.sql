@@ -9,6 +9,7 @@ ALTER TABLE coaching_sessions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE coaches ENABLE ROW LEVEL SECURITY;
 ALTER TABLE forum_posts ENABLE ROW LEVEL SECURITY;
 ALTER TABLE post_likes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE forum_members ENABLE ROW LEVEL SECURITY;
 ALTER TABLE prayer_requests ENABLE ROW LEVEL SECURITY;
 ALTER TABLE prayer_responses ENABLE ROW LEVEL SECURITY;
 ALTER TABLE testimonials ENABLE ROW LEVEL SECURITY;
@@ -18,6 +19,9 @@ ALTER TABLE resource_downloads ENABLE ROW LEVEL SECURITY;
 ALTER TABLE event_registrations ENABLE ROW LEVEL SECURITY;
 ALTER TABLE notifications ENABLE ROW LEVEL SECURITY;
 ALTER TABLE user_activity ENABLE ROW LEVEL SECURITY;
+ALTER TABLE counter_shards ENABLE ROW LEVEL SECURITY;
+ALTER TABLE search_documents ENABLE ROW LEVEL SECURITY;
+ALTER TABLE payments ENABLE ROW LEVEL SECURITY;
 
 -- Profiles policies
 CREATE POLICY "Users can view own profile" ON profiles
@@ -41,21 +45,33 @@ CREATE POLICY "Public profiles viewable by authenticated users" ON profiles
 CREATE POLICY "Users can view own enrollments" ON enrollments
   FOR SELECT USING (auth.uid() = user_id);
 
+-- Enrollments start unpaid; payment and access columns are only written by the backend
+-- (Stripe webhooks, the sweeper), since has_program_access trusts them
 CREATE POLICY "Users can insert own enrollments" ON enrollments
-  FOR INSERT WITH CHECK (auth.uid() = user_id);
+  FOR INSERT WITH CHECK (auth.uid() = user_id AND payment_status = 'pending');
 
 CREATE POLICY "Users can update own enrollments" ON enrollments
   FOR UPDATE USING (auth.uid() = user_id);
 
+REVOKE UPDATE ON enrollments FROM anon, authenticated;
+GRANT UPDATE (progress_percentage) ON enrollments TO authenticated;
+
 -- User progress policies
 CREATE POLICY "Users can view own progress" ON user_progress
   FOR SELECT USING (auth.uid() = user_id);
 
+-- Progress can be read after access lapses, but only recorded while it lasts
 CREATE POLICY "Users can insert own progress" ON user_progress
-  FOR INSERT WITH CHECK (auth.uid() = user_id);
+  FOR INSERT WITH CHECK (
+    auth.uid() = user_id AND
+    has_program_access((SELECT program_id FROM modules WHERE id = module_id))
+  );
 
 CREATE POLICY "Users can update own progress" ON user_progress
-  FOR UPDATE USING (auth.uid() = user_id);
+  FOR UPDATE USING (
+    auth.uid() = user_id AND
+    has_program_access((SELECT program_id FROM modules WHERE id = module_id))
+  );
 
 -- Coaches policies
 CREATE POLICY "Anyone can view active coaches" ON coaches
@@ -117,6 +133,21 @@ CREATE POLICY "Users can like posts" ON post_likes
 CREATE POLICY "Users can unlike posts" ON post_likes
   FOR DELETE USING (auth.uid() = user_id);
 
+-- Forum members policies
+CREATE POLICY "Users can view forum members" ON forum_members
+  FOR SELECT USING (auth.role() = 'authenticated');
+
+CREATE POLICY "Users can join forums" ON forum_members
+  FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can leave forums" ON forum_members
+  FOR DELETE USING (auth.uid() = user_id);
+
+-- Payments policies
+-- No client writes: payment rows are only written by the backend with the service key
+CREATE POLICY "Users can view own payments" ON payments
+  FOR SELECT USING (auth.uid() = user_id);
+
 -- Prayer requests policies
 CREATE POLICY "Users can view public prayer requests" ON prayer_requests
   FOR SELECT USING (
@@ -203,6 +234,10 @@ CREATE POLICY "Users can view own activity" ON user_activity
 CREATE POLICY "System can log user activity" ON user_activity
   FOR INSERT WITH CHECK (auth.uid() = user_id);
 
+-- Counter shards policies
+-- None: only the SECURITY DEFINER counter triggers and the service role read or write
+-- the shards. Clients see pending deltas through the prayer_request_counts view.
+
 -- Admin policies for all tables
 CREATE POLICY "Admins have full access to profiles" ON profiles
   FOR ALL USING (
@@ -219,6 +254,11 @@ CREATE POLICY "Admins have full access to user_progress" ON user_progress
     auth.uid() IN (SELECT id FROM profiles WHERE is_admin = true)
   );
 
+CREATE POLICY "Admins have full access to payments" ON payments
+  FOR ALL USING (
+    auth.uid() IN (SELECT id FROM profiles WHERE is_admin = true)
+  );
+
 CREATE POLICY "Admins have full access to coaching_sessions" ON coaching_sessions
   FOR ALL USING (
     auth.uid() IN (SELECT id FROM profiles WHERE is_admin = true)
@@ -233,8 +273,10 @@ CREATE POLICY "Admins have full access to testimonials" ON testimonials
 CREATE POLICY "Public read access to programs" ON programs
   FOR SELECT USING (is_active = true);
 
-CREATE POLICY "Public read access to modules" ON modules
-  FOR SELECT USING (is_published = true);
+-- Module content is for enrolled users with active access; the catalog lists modules
+-- through the module_outlines view (schema.sql)
+CREATE POLICY "Enrolled users can view published modules" ON modules
+  FOR SELECT USING (is_published = true AND has_program_access(program_id));
 
 CREATE POLICY "Public read access to discussion_forums" ON discussion_forums
   FOR SELECT USING (is_private = false);
@@ -242,3 +284,8 @@ CREATE POLICY "Public read access to discussion_forums" ON discussion_forums
 CREATE POLICY "Public read access to events" ON events
   FOR SELECT USING (is_published = true);
 
+-- Private prayer requests, unpublished modules and posts of private forums are indexed
+-- too; search_content and autocomplete_content run as the caller and only see these
+CREATE POLICY "Public read access to search_documents" ON search_documents
+  FOR SELECT USING (is_public = true);
+
@@ -0,0 +1,307 @@
+"""
+Free-slot finder for coaches.
+
+``coaches.availability_schedule`` describes a recurring week in the coach's timezone::
+
+    {"timezone": "America/New_York",
+     "monday": [{"start": "09:00", "end": "12:00"}, "13:00-17:00"],
+     "tuesday": ["13:00-18:00"]}
+
+For every (coach, ISO week) the weekly windows are expanded to UTC instants and the
+coach's non-cancelled ``coaching_sessions`` are subtracted with a single merge pass
+over both sorted lists. The resulting free intervals are cached per coach-week, so
+"which coaches are free Tuesday afternoon" is a bisect per coach once the week is
+loaded. Booking a session through ``SlotFinder.invalidate`` drops the affected
+weeks; the TTL covers sessions written to Supabase by other clients. A malformed
+window is logged and skipped; the rest of that coach's schedule still applies.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger('reinvent.scheduling')
+
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+DEFAULT_TTL = float(os.getenv('COACH_SLOTS_CACHE_TTL', '300'))
+# Sessions that start before a week can still run into it
+MAX_SESSION_MINUTES = 24 * 60
+# Coach ids per ``in.(...)`` filter, to keep PostgREST URLs short
+ID_BATCH = 100
+# PostgREST caps responses at 1000 rows by default
+PAGE_SIZE = 1000
+MAX_CACHED_WEEKS = 50000
+
+
+def _minutes(value):
+    hours, _, minutes = value.strip().partition(':')
+    result = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= result <= 24 * 60:
+        raise ValueError(f'Invalid time of day: {value!r}')
+    return result
+
+
+def merge(intervals):
+    """Sort and coalesce overlapping or touching ``(start, end)`` pairs"""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract(free, busy):
+    """``free`` minus ``busy``; both sorted and merged, result is too"""
+    result = []
+    index = 0
+    for start, end in free:
+        while index < len(busy) and busy[index][1] <= start:
+            index += 1
+        cursor = start
+        probe = index
+        while probe < len(busy) and busy[probe][0] < end:
+            busy_start, busy_end = busy[probe]
+            if busy_start > cursor:
+                result.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            if cursor >= end:
+                break
+            probe += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def clip(intervals, start, end):
+    """Intervals intersected with ``[start, end)``"""
+    first = max(bisect_right(intervals, (start,)) - 1, 0)
+    result = []
+    for interval_start, interval_end in intervals[first:]:
+        if interval_start >= end:
+            break
+        if interval_end > start:
+            result.append((max(interval_start, start), min(interval_end, end)))
+    return result
+
+
+def parse_schedule(schedule, coach_id=None):
+    """availability_schedule -> (tzinfo, {weekday: [(start_minute, end_minute), ...]})"""
+    schedule = schedule or {}
+    try:
+        tz = ZoneInfo(schedule.get('timezone') or 'UTC')
+    except ZoneInfoNotFoundError:
+        tz = timezone.utc
+    weekly = {}
+    for key, windows in schedule.items():
+        day = next((index for index, name in enumerate(DAYS) if key.lower().startswith(name[:3])), None)
+        if day is None or not isinstance(windows, list):
+            continue
+        parsed = []
+        for window in windows:
+            try:
+                if isinstance(window, str):
+                    start, _, end = window.partition('-')
+                else:
+                    start, end = window.get('start', ''), window.get('end', '')
+                parsed.append((_minutes(start), _minutes(end)))
+            except (AttributeError, TypeError, ValueError):
+                logger.warning('Skipping invalid availability window %r of coach %s', window, coach_id)
+        weekly[day] = merge(parsed)
+    return tz, weekly
+
+
+def week_start(value):
+    """Monday of the ISO week containing ``value`` (a date or an aware datetime)"""
+    day = value.astimezone(timezone.utc).date() if isinstance(value, datetime) else value
+    return day - timedelta(days=day.weekday())
+
+
+def weeks_between(start, end):
+    monday = week_start(start)
+    last = week_start(end - timedelta(microseconds=1))
+    while monday <= last:
+        yield monday
+        monday += timedelta(days=7)
+
+
+def week_bounds(monday):
+    start = datetime.combine(monday, datetime.min.time(), timezone.utc).timestamp()
+    return start, start + 7 * 86400
+
+
+def expand_week(tz, weekly, monday):
+    """Weekly windows as UTC timestamps for the week starting ``monday`` (UTC)"""
+    week_begin, week_end = week_bounds(monday)
+    intervals = []
+    # Local days can straddle the UTC week, so expand one extra day on each side
+    for offset in range(-1, 8):
+        day = monday + timedelta(days=offset)
+        for start_minute, end_minute in weekly.get(day.weekday(), ()):
+            local_midnight = datetime.combine(day, datetime.min.time(), tz)
+            start = (local_midnight + timedelta(minutes=start_minute)).timestamp()
+            end = (local_midnight + timedelta(minutes=end_minute)).timestamp()
+            intervals.append((max(start, week_begin), min(end, week_end)))
+    return merge(intervals)
+
+
+def session_interval(row):
+    start = parse_timestamp(row['scheduled_time'])
+    return start, start + 60 * (row.get('duration_minutes') or 60)
+
+
+def parse_timestamp(value):
+    """ISO string or datetime -> POSIX timestamp; naive values are UTC"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def slots(free, duration_minutes, step_minutes=30):
+    """Start/end pairs of ``duration_minutes`` slots aligned to ``step_minutes``"""
+    duration = duration_minutes * 60
+    step = step_minutes * 60
+    result = []
+    for start, end in free:
+        slot = -(-start // step) * step
+        while slot + duration <= end:
+            result.append((slot, slot + duration))
+            slot += step
+    return result
+
+
+class SlotFinder:
+    """Per coach-week cache of free intervals loaded from Supabase."""
+
+    def __init__(self, supabase, ttl=DEFAULT_TTL):
+        self.supabase = supabase
+        self.ttl = ttl
+        self._weeks = {}  # (coach_id, monday) -> (expires_at, free intervals)
+        self._coaches = None  # (expires_at, active coach ids)
+        self._lock = threading.Lock()
+
+    def active_coaches(self):
+        with self._lock:
+            cached = self._coaches
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        rows = self.supabase.table('coaches').select('id').eq('is_active', True).execute().data or []
+        coach_ids = [str(row['id']) for row in rows]
+        with self._lock:
+            self._coaches = (time.monotonic() + self.ttl, coach_ids)
+        return coach_ids
+
+    def _fetch_all(self, build_query):
+        rows = []
+        while True:
+            page = build_query().range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+
+    def _load(self, coach_ids, mondays):
+        """Free intervals for every (coach, week) pair, fetched with one query per table and batch"""
+        first_start, _ = week_bounds(min(mondays))
+        _, last_end = week_bounds(max(mondays))
+        coaches = []
+        sessions = []
+        for offset in range(0, len(coach_ids), ID_BATCH):
+            batch = coach_ids[offset:offset + ID_BATCH]
+            coaches.extend(self.supabase.table('coaches').select('id, availability_schedule')
+                           .in_('id', batch).execute().data or [])
+            sessions.extend(self._fetch_all(
+                lambda: self.supabase.table('coaching_sessions').select('coach_id, scheduled_time, duration_minutes')
+                .in_('coach_id', batch).neq('status', 'cancelled')
+                .gte('scheduled_time', isoformat(first_start - MAX_SESSION_MINUTES * 60))
+                .lt('scheduled_time', isoformat(last_end)).order('scheduled_time')
+            ))
+
+        busy = {coach_id: [] for coach_id in coach_ids}
+        for row in sessions:
+            busy.setdefault(str(row['coach_id']), []).append(session_interval(row))
+        schedules = {str(row['id']): parse_schedule(row.get('availability_schedule'), row['id']) for row in coaches}
+
+        now = time.monotonic()
+        loaded = {}
+        for coach_id in coach_ids:
+            tz, weekly = schedules.get(coach_id, (timezone.utc, {}))
+            booked = merge(busy[coach_id])
+            for monday in mondays:
+                loaded[(coach_id, monday)] = (now + self.ttl, subtract(expand_week(tz, weekly, monday), booked))
+        with self._lock:
+            if len(self._weeks) > MAX_CACHED_WEEKS:
+                self._weeks = {key: entry for key, entry in self._weeks.items() if entry[0] > now}
+            self._weeks.update(loaded)
+        return loaded
+
+    def free_intervals(self, coach_ids, start, end):
+        """{coach_id: [(start, end), ...]} of free time within ``[start, end)`` (timestamps)"""
+        coach_ids = [str(coach_id) for coach_id in coach_ids]
+        mondays = list(weeks_between(datetime.fromtimestamp(start, timezone.utc), datetime.fromtimestamp(end, timezone.utc)))
+        now = time.monotonic()
+        with self._lock:
+            weeks = {(coach_id, monday): self._weeks.get((coach_id, monday)) for coach_id in coach_ids for monday in mondays}
+        missing = [coach_id for coach_id in coach_ids
+                   if any(weeks[(coach_id, monday)] is None or weeks[(coach_id, monday)][0] <= now for monday in mondays)]
+        if missing:
+            weeks.update(self._load(missing, mondays))
+
+        result = {}
+        for coach_id in coach_ids:
+            if len(mondays) == 1:
+                intervals = weeks[(coach_id, mondays[0])][1]
+            else:
+                intervals = merge(interval for monday in mondays for interval in weeks[(coach_id, monday)][1])
+            result[coach_id] = clip(intervals, start, end)
+        return result
+
+    def free_slots(self, coach_id, start, end, duration_minutes=60, step_minutes=30):
+        free = self.free_intervals([coach_id], start, end)[str(coach_id)]
+        return slots(free, duration_minutes, step_minutes)
+
+    def available_coaches(self, start, end, duration_minutes=60, coach_ids=None):
+        """Coaches with at least one free stretch of ``duration_minutes`` in the window"""
+        coach_ids = self.active_coaches() if coach_ids is None else coach_ids
+        duration = duration_minutes * 60
+        available = []
+        for coach_id, free in self.free_intervals(coach_ids, start, end).items():
+            first = next((interval for interval in free if interval[1] - interval[0] >= duration), None)
+            if first:
+                available.append((coach_id, first[0]))
+        return available
+
+    def is_free(self, coach_id, start, duration_minutes):
+        """Check one slot against freshly loaded data, for use before booking it"""
+        end = start + duration_minutes * 60
+        self.invalidate(coach_id, start, duration_minutes)
+        free = self.free_intervals([coach_id], start, end)[str(coach_id)]
+        return bool(free) and free[0] == (start, end)
+
+    def invalidate(self, coach_id, scheduled_time=None, duration_minutes=60):
+        """Forget cached weeks of a coach, or only those a session touches"""
+        coach_id = str(coach_id)
+        with self._lock:
+            if scheduled_time is None:
+                for key in [key for key in self._weeks if key[0] == coach_id]:
+                    del self._weeks[key]
+                return
+            start = parse_timestamp(scheduled_time) if not isinstance(scheduled_time, (int, float)) else scheduled_time
+            end = start + duration_minutes * 60
+            for monday in weeks_between(datetime.fromtimestamp(start, timezone.utc), datetime.fromtimestamp(end, timezone.utc)):
+                self._weeks.pop((coach_id, monday), None)
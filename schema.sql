@@ -73,11 +73,12 @@ CREATE TABLE enrollments (
   enrolled_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
   completed_at TIMESTAMP WITH TIME ZONE,
   progress_percentage INTEGER DEFAULT 0 CHECK (progress_percentage >= 0 AND progress_percentage <= 100),
-  payment_status TEXT DEFAULT 'pending' CHECK (payment_status IN ('pending', 'completed', 'failed', 'refunded')),
+  payment_status TEXT DEFAULT 'pending' CHECK (payment_status IN ('pending', 'completed', 'failed', 'refunded', 'expired')),
   payment_amount DECIMAL(10,2),
   stripe_payment_id TEXT,
   stripe_customer_id TEXT,
   access_expires_at TIMESTAMP WITH TIME ZONE,
+  access_status TEXT DEFAULT 'active' CHECK (access_status IN ('active', 'lapsed')),
   certificate_issued_at TIMESTAMP WITH TIME ZONE,
   certificate_url TEXT,
   UNIQUE(user_id, program_id)
@@ -171,6 +172,14 @@ CREATE TABLE post_likes (
   UNIQUE(post_id, user_id)
 );
 
+CREATE TABLE forum_members (
+  id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+  forum_id UUID REFERENCES discussion_forums(id) ON DELETE CASCADE,
+  user_id UUID REFERENCES profiles(id) ON DELETE CASCADE,
+  joined_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  UNIQUE(forum_id, user_id)
+);
+
 -- Prayer Requests
 CREATE TABLE prayer_requests (
   id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -316,10 +325,9 @@ CREATE TABLE user_activity (
 );
 
 -- Create indexes for better performance
-CREATE INDEX idx_profiles_email ON profiles(email);
-CREATE INDEX idx_enrollments_user_id ON enrollments(user_id);
+-- profiles(email) and user_progress(user_id) are covered by UNIQUE(email) and
+-- UNIQUE(user_id, module_id); enrollments(user_id) by idx_enrollments_user_enrolled_at
 CREATE INDEX idx_enrollments_program_id ON enrollments(program_id);
-CREATE INDEX idx_user_progress_user_id ON user_progress(user_id);
 CREATE INDEX idx_user_progress_module_id ON user_progress(module_id);
 CREATE INDEX idx_forum_posts_forum_id ON forum_posts(forum_id);
 CREATE INDEX idx_forum_posts_user_id ON forum_posts(user_id);
@@ -344,3 +352,385 @@ CREATE TRIGGER update_programs_updated_at BEFORE UPDATE ON programs FOR EACH ROW
 CREATE TRIGGER update_modules_updated_at BEFORE UPDATE ON modules FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_forum_posts_updated_at BEFORE UPDATE ON forum_posts FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+
+-- Sharded Counters
+-- Hot counters (prayer_count, post_count, member_count) are never updated in place by
+-- request handlers. Increments land on one of several shard rows and are folded into
+-- the parent row periodically by fold_counter_shards(), so concurrent writers do not
+-- serialize on a single row lock.
+CREATE TABLE counter_shards (
+  table_name TEXT NOT NULL CHECK (table_name IN ('prayer_requests', 'discussion_forums')),
+  column_name TEXT NOT NULL CHECK (column_name IN ('prayer_count', 'post_count', 'member_count')),
+  row_id UUID NOT NULL,
+  shard SMALLINT NOT NULL,
+  delta BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (table_name, column_name, row_id, shard)
+);
+
+-- SECURITY DEFINER so the triggers below can write counter_shards, which has RLS enabled
+-- and no client policies. The trigger functions are SECURITY DEFINER as well: clients
+-- lose EXECUTE on add_counter_delta (see the REVOKEs further down)
+CREATE OR REPLACE FUNCTION add_counter_delta(p_table TEXT, p_column TEXT, p_row_id UUID, p_delta BIGINT, p_shard SMALLINT DEFAULT NULL)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO counter_shards (table_name, column_name, row_id, shard, delta)
+    VALUES (p_table, p_column, p_row_id, COALESCE(p_shard, floor(random() * 16)::SMALLINT), p_delta)
+    ON CONFLICT (table_name, column_name, row_id, shard)
+    DO UPDATE SET delta = counter_shards.delta + EXCLUDED.delta;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+-- Move pending shard deltas into the parent rows. SKIP LOCKED lets several folders run
+-- without blocking each other or the writers.
+CREATE OR REPLACE FUNCTION fold_counter_shards()
+RETURNS INTEGER AS $$
+DECLARE
+    folded INTEGER;
+BEGIN
+    WITH taken AS (
+        DELETE FROM counter_shards
+        WHERE ctid IN (SELECT ctid FROM counter_shards WHERE delta <> 0 FOR UPDATE SKIP LOCKED)
+        RETURNING table_name, column_name, row_id, delta
+    ), totals AS (
+        SELECT table_name, column_name, row_id, SUM(delta) AS delta
+        FROM taken GROUP BY table_name, column_name, row_id
+    ), prayer AS (
+        UPDATE prayer_requests p SET prayer_count = p.prayer_count + t.delta
+        FROM totals t
+        WHERE t.table_name = 'prayer_requests' AND t.column_name = 'prayer_count' AND p.id = t.row_id
+        RETURNING 1
+    ), forums AS (
+        -- One UPDATE per forum row: two UPDATEs of the same row in one statement would
+        -- both start from the old row and one of the deltas would be lost
+        UPDATE discussion_forums f
+        SET post_count = f.post_count + t.post_delta, member_count = f.member_count + t.member_delta
+        FROM (
+            SELECT row_id,
+                   COALESCE(SUM(delta) FILTER (WHERE column_name = 'post_count'), 0) AS post_delta,
+                   COALESCE(SUM(delta) FILTER (WHERE column_name = 'member_count'), 0) AS member_delta
+            FROM totals WHERE table_name = 'discussion_forums' GROUP BY row_id
+        ) t
+        WHERE f.id = t.row_id
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM prayer) + (SELECT COUNT(*) FROM forums)
+    INTO folded;
+    RETURN folded;
+END;
+$$ language 'plpgsql';
+
+-- "I'm praying" clicks append to prayer_responses; the trigger only touches a random shard
+CREATE OR REPLACE FUNCTION count_prayer_response()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.is_praying THEN
+        PERFORM add_counter_delta('prayer_requests', 'prayer_count', NEW.prayer_request_id, 1);
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION count_forum_post()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM add_counter_delta('discussion_forums', 'post_count', NEW.forum_id, 1);
+        RETURN NEW;
+    END IF;
+    PERFORM add_counter_delta('discussion_forums', 'post_count', OLD.forum_id, -1);
+    RETURN OLD;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+-- Joining or leaving inserts or deletes a forum_members row, so member_count only moves
+-- when membership actually changed
+CREATE OR REPLACE FUNCTION count_forum_member()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM add_counter_delta('discussion_forums', 'member_count', NEW.forum_id, 1);
+        RETURN NEW;
+    END IF;
+    PERFORM add_counter_delta('discussion_forums', 'member_count', OLD.forum_id, -1);
+    RETURN OLD;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER count_prayer_responses AFTER INSERT ON prayer_responses FOR EACH ROW EXECUTE FUNCTION count_prayer_response();
+CREATE TRIGGER count_forum_posts AFTER INSERT OR DELETE ON forum_posts FOR EACH ROW EXECUTE FUNCTION count_forum_post();
+CREATE TRIGGER count_forum_members AFTER INSERT OR DELETE ON forum_members FOR EACH ROW EXECUTE FUNCTION count_forum_member();
+
+-- Only the triggers (through SECURITY DEFINER) and the service role's scheduled fold
+-- (flask fold-counters) touch the shards; PostgREST must not expose either function
+REVOKE EXECUTE ON FUNCTION add_counter_delta(TEXT, TEXT, UUID, BIGINT, SMALLINT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION fold_counter_shards() FROM PUBLIC, anon, authenticated;
+
+-- Readers that need fresher numbers than the last fold can add the pending shard deltas
+CREATE VIEW prayer_request_counts AS
+SELECT p.id, p.prayer_count + COALESCE(SUM(s.delta), 0) AS prayer_count
+FROM prayer_requests p
+LEFT JOIN counter_shards s
+  ON s.table_name = 'prayer_requests' AND s.column_name = 'prayer_count' AND s.row_id = p.id
+GROUP BY p.id, p.prayer_count;
+
+-- Full-Text Search
+-- One row per searchable record, kept in sync by triggers on the source tables so the
+-- index is updated incrementally on every write.
+CREATE TABLE search_documents (
+  doc_type TEXT NOT NULL CHECK (doc_type IN ('program', 'module', 'forum_post', 'prayer_request')),
+  doc_id UUID NOT NULL,
+  title TEXT,
+  body TEXT,
+  is_public BOOLEAN DEFAULT true,
+  search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(body, '')), 'B')
+  ) STORED,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (doc_type, doc_id)
+);
+
+CREATE INDEX idx_search_documents_vector ON search_documents USING GIN (search_vector);
+CREATE INDEX idx_search_documents_title_prefix ON search_documents (lower(title) text_pattern_ops) WHERE is_public;
+
+-- search_documents has RLS with a public-only SELECT policy and no write policies, so
+-- the indexing functions are SECURITY DEFINER and clients cannot call them directly
+CREATE OR REPLACE FUNCTION upsert_search_document(p_type TEXT, p_id UUID, p_title TEXT, p_body TEXT, p_public BOOLEAN)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO search_documents (doc_type, doc_id, title, body, is_public, updated_at)
+    VALUES (p_type, p_id, p_title, p_body, p_public, NOW())
+    ON CONFLICT (doc_type, doc_id)
+    DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, is_public = EXCLUDED.is_public, updated_at = NOW();
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION index_search_document()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_doc_type TEXT := TG_ARGV[0];
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM search_documents WHERE doc_type = v_doc_type AND doc_id = OLD.id;
+        RETURN OLD;
+    END IF;
+
+    IF v_doc_type = 'program' THEN
+        PERFORM upsert_search_document(v_doc_type, NEW.id, NEW.name, concat_ws(' ', NEW.description, NEW.long_description, NEW.biblical_foundation), NEW.is_active);
+    ELSIF v_doc_type = 'module' THEN
+        PERFORM upsert_search_document(v_doc_type, NEW.id, NEW.title, concat_ws(' ', NEW.description, NEW.biblical_principle, array_to_string(NEW.scripture_references, ' ')), NEW.is_published);
+    ELSIF v_doc_type = 'forum_post' THEN
+        -- Posts are only as visible as their forum
+        PERFORM upsert_search_document(v_doc_type, NEW.id, NEW.title, concat_ws(' ', NEW.content, NEW.biblical_reference),
+            NOT COALESCE((SELECT f.is_private FROM discussion_forums f WHERE f.id = NEW.forum_id), false));
+    ELSIF v_doc_type = 'prayer_request' THEN
+        PERFORM upsert_search_document(v_doc_type, NEW.id, NEW.title, NEW.request_text, NEW.is_public);
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER index_programs_search AFTER INSERT OR UPDATE OR DELETE ON programs FOR EACH ROW EXECUTE FUNCTION index_search_document('program');
+CREATE TRIGGER index_modules_search AFTER INSERT OR UPDATE OR DELETE ON modules FOR EACH ROW EXECUTE FUNCTION index_search_document('module');
+CREATE TRIGGER index_forum_posts_search AFTER INSERT OR UPDATE OR DELETE ON forum_posts FOR EACH ROW EXECUTE FUNCTION index_search_document('forum_post');
+CREATE TRIGGER index_prayer_requests_search AFTER INSERT OR UPDATE OR DELETE ON prayer_requests FOR EACH ROW EXECUTE FUNCTION index_search_document('prayer_request');
+
+-- A forum that turns private (or public) takes its posts' documents with it
+CREATE OR REPLACE FUNCTION sync_forum_post_visibility()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE search_documents d
+    SET is_public = NOT COALESCE(NEW.is_private, false), updated_at = NOW()
+    FROM forum_posts p
+    WHERE p.forum_id = NEW.id AND d.doc_type = 'forum_post' AND d.doc_id = p.id;
+    RETURN NEW;
+END;
+$$ language 'plpgsql' SECURITY DEFINER SET search_path = public;
+
+CREATE TRIGGER sync_forum_post_search_visibility AFTER UPDATE OF is_private ON discussion_forums
+FOR EACH ROW WHEN (OLD.is_private IS DISTINCT FROM NEW.is_private) EXECUTE FUNCTION sync_forum_post_visibility();
+
+REVOKE EXECUTE ON FUNCTION upsert_search_document(TEXT, UUID, TEXT, TEXT, BOOLEAN) FROM PUBLIC, anon, authenticated;
+
+-- Ranked search; p_types NULL searches every document type
+CREATE OR REPLACE FUNCTION search_content(p_query TEXT, p_types TEXT[] DEFAULT NULL, p_limit INTEGER DEFAULT 20)
+RETURNS TABLE (doc_type TEXT, doc_id UUID, title TEXT, snippet TEXT, rank REAL) AS $$
+    SELECT d.doc_type, d.doc_id, d.title,
+           ts_headline('english', COALESCE(d.body, ''), q, 'MaxWords=20, MinWords=8'),
+           ts_rank_cd(d.search_vector, q)
+    FROM search_documents d, websearch_to_tsquery('english', p_query) q
+    WHERE d.search_vector @@ q
+      AND d.is_public
+      AND (p_types IS NULL OR d.doc_type = ANY(p_types))
+    ORDER BY ts_rank_cd(d.search_vector, q) DESC
+    LIMIT p_limit;
+$$ language 'sql' STABLE;
+
+-- Title prefix autocomplete served from the text_pattern_ops index
+CREATE OR REPLACE FUNCTION autocomplete_content(p_prefix TEXT, p_limit INTEGER DEFAULT 10)
+RETURNS TABLE (doc_type TEXT, doc_id UUID, title TEXT) AS $$
+    SELECT d.doc_type, d.doc_id, d.title
+    FROM search_documents d
+    WHERE d.is_public
+      AND lower(d.title) LIKE replace(replace(replace(lower(p_prefix), '\', '\\'), '%', '\%'), '_', '\_') || '%'
+    ORDER BY lower(d.title)
+    LIMIT p_limit;
+$$ language 'sql' STABLE;
+
+-- Enrollment Expiry
+-- Abandoned checkouts leave 'pending' enrollments behind when the checkout.session.expired
+-- webhook never arrives, and access_expires_at was never enforced. The sweeper
+-- (src/sweeper.py) calls the two functions below in small batches; both walk a partial
+-- index so each batch only touches rows that actually need changing.
+CREATE INDEX idx_enrollments_pending_enrolled_at ON enrollments(enrolled_at) WHERE payment_status = 'pending';
+CREATE INDEX idx_enrollments_active_access_expires_at ON enrollments(access_expires_at)
+  WHERE access_status = 'active' AND access_expires_at IS NOT NULL;
+
+-- Mark up to p_limit pending enrollments older than p_older_than as expired; returns
+-- the changed rows so the sweeper can drop cached copies
+CREATE OR REPLACE FUNCTION expire_stale_enrollments(p_older_than INTERVAL, p_limit INTEGER DEFAULT 500)
+RETURNS TABLE (id UUID, user_id UUID) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    WITH batch AS (
+        SELECT id FROM enrollments
+        WHERE payment_status = 'pending' AND enrolled_at < NOW() - p_older_than
+        ORDER BY enrolled_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE enrollments e SET payment_status = 'expired'
+    FROM batch WHERE e.id = batch.id
+    RETURNING e.id, e.user_id;
+END;
+$$ language 'plpgsql';
+
+-- Mark up to p_limit enrollments whose access has run out as lapsed; returns the changed rows
+CREATE OR REPLACE FUNCTION lapse_expired_access(p_limit INTEGER DEFAULT 500)
+RETURNS TABLE (id UUID, user_id UUID) AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    WITH batch AS (
+        SELECT id FROM enrollments
+        WHERE access_status = 'active' AND access_expires_at IS NOT NULL AND access_expires_at < NOW()
+        ORDER BY access_expires_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE enrollments e SET access_status = 'lapsed'
+    FROM batch WHERE e.id = batch.id
+    RETURNING e.id, e.user_id;
+END;
+$$ language 'plpgsql';
+
+-- Whether the caller holds a paid enrollment in the program whose access has not run
+-- out. Checks access_expires_at itself, so access ends on time even before the sweeper
+-- marks the enrollment lapsed. Used by the modules and user_progress policies
+-- (rls_policies.sql); SECURITY DEFINER so the check does not recurse through the
+-- enrollments policies.
+CREATE OR REPLACE FUNCTION has_program_access(p_program_id UUID)
+RETURNS BOOLEAN AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM enrollments e
+        WHERE e.user_id = auth.uid()
+          AND e.program_id = p_program_id
+          AND e.payment_status = 'completed'
+          AND e.access_status = 'active'
+          AND (e.access_expires_at IS NULL OR e.access_expires_at > NOW())
+    )
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- User Enrollment Pages
+-- /api/payments/user-enrollments pages a user's enrollments newest first with a
+-- (enrolled_at, id) cursor; this index serves both the filter and the order, so each
+-- page is a short index range scan. It also serves lookups by user_id alone.
+CREATE INDEX idx_enrollments_user_enrolled_at ON enrollments(user_id, enrolled_at DESC, id DESC);
+
+-- Certificates
+-- `flask issue-certificates` (src/certificates.py) pages through completed enrollments
+-- that have no certificate yet; the partial index only holds those rows, so each page
+-- is a short scan however many certificates were issued before. Each rendered batch is
+-- recorded with one call to issue_certificates.
+CREATE INDEX idx_enrollments_certificate_pending ON enrollments(id)
+  WHERE completed_at IS NOT NULL AND certificate_issued_at IS NULL;
+
+-- p_certificates: [{"id": "<enrollment uuid>", "url": "<certificate url>"}, ...]
+CREATE OR REPLACE FUNCTION issue_certificates(p_certificates JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    issued INTEGER;
+BEGIN
+    UPDATE enrollments e SET certificate_url = c.url, certificate_issued_at = NOW()
+    FROM jsonb_to_recordset(p_certificates) AS c(id UUID, url TEXT)
+    WHERE e.id = c.id AND e.certificate_issued_at IS NULL;
+    GET DIAGNOSTICS issued = ROW_COUNT;
+    RETURN issued;
+END;
+$$ language 'plpgsql';
+
+-- Schema Consolidation
+-- This file is the canonical layout. database_schema.sql is the older layout
+-- (user_profiles, program_modules, status-based enrollments); `flask migrate-schema`
+-- (src/schema_migration.py) copies its rows into this one in batches. Payments only
+-- existed in the older layout, so the table moves here. The views below let read-only
+-- queries written against the old table names keep working until they are ported.
+CREATE TABLE payments (
+  id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+  user_id UUID REFERENCES profiles(id) ON DELETE CASCADE,
+  enrollment_id UUID REFERENCES enrollments(id) ON DELETE CASCADE,
+  stripe_payment_intent_id TEXT UNIQUE,
+  amount DECIMAL(10,2) NOT NULL,
+  currency TEXT DEFAULT 'USD',
+  status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'failed', 'cancelled', 'refunded')),
+  payment_method TEXT,
+  transaction_fee DECIMAL(10,2),
+  net_amount DECIMAL(10,2),
+  processed_at TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+CREATE INDEX idx_payments_enrollment_id ON payments(enrollment_id);
+
+-- security_invoker: the views apply the caller's RLS on profiles and modules instead of
+-- reading them as the view owner
+CREATE VIEW user_profiles WITH (security_invoker = true) AS
+SELECT id, full_name, profile_image_url AS avatar_url,
+       CASE WHEN is_admin THEN 'admin' WHEN is_coach THEN 'coach' ELSE 'student' END AS role,
+       phone, company, role AS job_title, bio, linkedin_url, created_at, updated_at
+FROM profiles;
+
+CREATE VIEW program_modules WITH (security_invoker = true) AS
+SELECT id, program_id, title, description,
+       COALESCE(content->>'type', CASE WHEN video_url IS NOT NULL THEN 'video' ELSE 'text' END) AS content_type,
+       COALESCE(video_url, content->>'url') AS content_url, content->>'text' AS content_text,
+       order_index, COALESCE(video_duration_minutes, (content->>'duration_minutes')::INTEGER) AS duration_minutes,
+       created_at, updated_at
+FROM modules;
+
+-- Catalog outline of published modules. Module rows themselves are only readable with
+-- program access (see has_program_access); this view runs as its owner on purpose and
+-- exposes no content, video or resource columns.
+CREATE VIEW module_outlines AS
+SELECT m.id, m.program_id, m.title, m.description, m.order_index, m.video_duration_minutes
+FROM modules m JOIN programs p ON p.id = m.program_id
+WHERE m.is_published AND p.is_active;
+
+-- Coaching Session Overlaps
+-- /api/coaching/sessions checks a slot against the cached free intervals and then inserts;
+-- two clients booking the same coach at once both pass the check, so overlapping
+-- sessions of one coach are rejected here (exclusion_violation, answered with 409).
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- timestamptz + interval is only STABLE because of day and month units; minutes are not
+-- affected by the time zone, so this is safe to declare IMMUTABLE for the index
+CREATE OR REPLACE FUNCTION coaching_session_period(p_start TIMESTAMP WITH TIME ZONE, p_minutes INTEGER)
+RETURNS TSTZRANGE AS $$
+    SELECT tstzrange(p_start, p_start + make_interval(mins => COALESCE(p_minutes, 60)))
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE coaching_sessions ADD CONSTRAINT coaching_sessions_no_overlap EXCLUDE USING gist (
+  coach_id WITH =,
+  coaching_session_period(scheduled_time, duration_minutes) WITH &&
+) WHERE (status <> 'cancelled');
@@ -0,0 +1,414 @@
+"""
+Batched copy of rows from the legacy layouts into the canonical ones.
+
+``migrate`` copies the Supabase tables of database_schema.sql into schema.sql. Each
+``TableCopy`` names a legacy table, the canonical table it feeds and, for every
+canonical column, the SQL expression that computes it from a legacy row, so renames
+and value mappings run in the source query. Only columns the target table really has
+are written; the rest are reported. Rows are read in primary-key order ``batch_size``
+at a time and inserted with ``ON CONFLICT DO NOTHING``, which skips a row that
+collides with any unique key: its id, or a natural key such as ``profiles.email`` or
+``enrollments (user_id, program_id)``. References to rows that may have been merged
+that way are looked up again on the target (``resolve``), so children attach to the
+row that was kept. The target commits once per batch and the checkpoint then records
+the last copied id of the table, so an interrupted run resumes after the last
+committed batch and a repeated run inserts nothing twice. Tables are copied parents
+first so foreign keys hold.
+
+The source is ``LEGACY_DATABASE_URL``, the target ``DATABASE_URL``. When both layouts
+sit in one database, put the legacy tables in their own schema and select it with
+``?options=-csearch_path%3Dlegacy,public`` on the source URL.
+
+``migrate_bookings`` copies the bookings of the retired reinvent-booking-backend
+database into the app's: the client's details become (or match) a user, ``status``
+becomes ``booking_status``, the seats they hold are counted in the ledger and
+sessions are planned as for a new booking.
+"""
+
+import json
+import os
+
+DEFAULT_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', '2000'))
+
+
+class MigrationError(Exception):
+    pass
+
+
+def _profile(value, email):
+    """The profile a legacy user id maps to: the same id, or the profile that kept its email"""
+    return (f'COALESCE((SELECT p.id FROM profiles p WHERE p.id = {value}), '
+            f'(SELECT p.id FROM profiles p WHERE p.email = {email}))')
+
+
+def _user_email(table, column='user_id'):
+    return (f'(SELECT u.email FROM auth.users u WHERE u.id = {table}.{column})', 'text')
+
+
+class TableCopy:
+    def __init__(self, source, target, columns, lookups=None, resolve=None):
+        self.source = source
+        self.target = target
+        # canonical column -> SQL expression over the legacy row; 'id' is always copied
+        self.columns = columns
+        # name -> (SQL expression over the legacy row, type): values only ``resolve`` reads
+        self.lookups = lookups or {}
+        # canonical column -> SQL expression over the batch row ``v``, evaluated on the target
+        self.resolve = resolve or {}
+
+    def select(self, columns):
+        expressions = [f'{self.columns[name]} AS {name}' for name in columns]
+        expressions += [f'{expression} AS {name}' for name, (expression, _) in self.lookups.items()]
+        return (f'SELECT {self.source}.id, {", ".join(expressions)} FROM {self.source} '
+                f'WHERE {self.source}.id > %s ORDER BY {self.source}.id LIMIT %s')
+
+    def insert(self, columns, types):
+        names = ['id', *columns]
+        batch = names + list(self.lookups)
+        # Batch values arrive untyped; cast them to the target's column types first
+        casts = [f'v.{name}::{types[name]} AS {name}' for name in names]
+        casts += [f'v.{name}::{kind} AS {name}' for name, (_, kind) in self.lookups.items()]
+        values = [self.resolve.get(name, f'v.{name}') for name in names]
+        return (f'INSERT INTO {self.target} ({", ".join(names)}) '
+                f'SELECT {", ".join(values)} FROM (SELECT {", ".join(casts)} '
+                f'FROM (VALUES %s) AS v ({", ".join(batch)})) AS v '
+                f'ON CONFLICT DO NOTHING RETURNING id')
+
+
+TABLES = [
+    TableCopy('user_profiles', 'profiles', {
+        # Legacy profiles kept the email on auth.users only
+        'email': '(SELECT u.email FROM auth.users u WHERE u.id = user_profiles.id)',
+        'full_name': 'full_name',
+        'company': 'company',
+        'role': 'job_title',
+        'phone': 'phone',
+        'bio': 'bio',
+        'profile_image_url': 'avatar_url',
+        'linkedin_url': 'linkedin_url',
+        'is_coach': "COALESCE(role = 'coach', FALSE)",
+        'is_admin': "COALESCE(role = 'admin', FALSE)",
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }),
+    TableCopy('programs', 'programs', {
+        'name': 'title',
+        'slug': "trim(both '-' from lower(regexp_replace(title, '[^A-Za-z0-9]+', '-', 'g'))) || '-' || left(id::text, 8)",
+        'description': 'description',
+        'long_description': 'detailed_description',
+        'program_type': "CASE level WHEN 'beginner' THEN 'foundation' WHEN 'advanced' THEN 'advanced' END",
+        'duration_weeks': 'duration_weeks',
+        'price': 'price',
+        'learning_outcomes': 'learning_outcomes',
+        'prerequisites': "array_to_string(prerequisites, '; ')",
+        'featured_image_url': 'image_url',
+        'is_active': 'is_active',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }),
+    TableCopy('program_modules', 'modules', {
+        'program_id': 'program_id',
+        'title': 'title',
+        'description': 'description',
+        'order_index': 'order_index',
+        'video_url': "CASE WHEN content_type = 'video' THEN content_url END",
+        'video_duration_minutes': "CASE WHEN content_type = 'video' THEN duration_minutes END",
+        # As text: psycopg2 reads JSONB into dicts it cannot send back
+        'content': ("jsonb_strip_nulls(jsonb_build_object('type', content_type, 'url', content_url, "
+                    "'text', content_text, 'duration_minutes', duration_minutes, 'is_required', is_required))::text"),
+        'is_published': 'TRUE',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }),
+    TableCopy('enrollments', 'enrollments', {
+        'user_id': 'user_id',
+        'program_id': 'program_id',
+        'enrolled_at': 'enrolled_at',
+        'completed_at': 'completed_at',
+        'progress_percentage': 'round(progress_percentage)::INTEGER',
+        'payment_status': ("CASE status WHEN 'pending' THEN 'pending' WHEN 'refunded' THEN 'refunded' "
+                           "WHEN 'cancelled' THEN 'failed' ELSE 'completed' END"),
+        'payment_amount': '(SELECT p.amount FROM payments p WHERE p.id = enrollments.payment_id)',
+        'stripe_payment_id': '(SELECT p.stripe_payment_intent_id FROM payments p WHERE p.id = enrollments.payment_id)',
+        'access_status': "CASE WHEN status IN ('cancelled', 'refunded') THEN 'lapsed' ELSE 'active' END",
+        'certificate_url': 'certificate_url',
+        # Already issued: keep the certificate pipeline from rendering these again
+        'certificate_issued_at': 'CASE WHEN certificate_url IS NOT NULL THEN completed_at END',
+    }, lookups={
+        'user_email': _user_email('enrollments'),
+    }, resolve={
+        'user_id': _profile('v.user_id', 'v.user_email'),
+    }),
+    TableCopy('payments', 'payments', {
+        'user_id': 'user_id',
+        'enrollment_id': 'enrollment_id',
+        'stripe_payment_intent_id': 'stripe_payment_intent_id',
+        'amount': 'amount',
+        'currency': 'currency',
+        'status': 'status',
+        'payment_method': 'payment_method',
+        'transaction_fee': 'transaction_fee',
+        'net_amount': 'net_amount',
+        'processed_at': 'processed_at',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }, lookups={
+        'user_email': _user_email('payments'),
+        'enrollment_user_id': ('(SELECT e.user_id FROM enrollments e WHERE e.id = payments.enrollment_id)', 'uuid'),
+        'enrollment_user_email': ('(SELECT u.email FROM enrollments e JOIN auth.users u ON u.id = e.user_id '
+                                  'WHERE e.id = payments.enrollment_id)', 'text'),
+        'enrollment_program_id': ('(SELECT e.program_id FROM enrollments e WHERE e.id = payments.enrollment_id)', 'uuid'),
+    }, resolve={
+        'user_id': _profile('v.user_id', 'v.user_email'),
+        # The enrollment copied under this id, or the one that already held (user, program)
+        'enrollment_id': ('COALESCE((SELECT e.id FROM enrollments e WHERE e.id = v.enrollment_id), '
+                          '(SELECT e.id FROM enrollments e WHERE e.program_id = v.enrollment_program_id '
+                          f"AND e.user_id = {_profile('v.enrollment_user_id', 'v.enrollment_user_email')}))"),
+    }),
+    TableCopy('user_progress', 'user_progress', {
+        'user_id': 'user_id',
+        'module_id': 'module_id',
+        'enrollment_id': 'NULL',
+        'started_at': 'created_at',
+        'completed_at': 'completed_at',
+        'time_spent_minutes': 'time_spent_minutes',
+        'reflection_notes': 'notes',
+    }, lookups={
+        'user_email': _user_email('user_progress'),
+        'program_id': ('program_id', 'uuid'),
+    }, resolve={
+        'user_id': _profile('v.user_id', 'v.user_email'),
+        'enrollment_id': ('(SELECT e.id FROM enrollments e WHERE e.program_id = v.program_id '
+                          f"AND e.user_id = {_profile('v.user_id', 'v.user_email')})"),
+    }),
+]
+
+
+def connect(dsn, name):
+    try:
+        import psycopg2
+    except ImportError:
+        raise MigrationError('The migration needs psycopg2 (pip install psycopg2-binary)')
+    if not dsn:
+        raise MigrationError(f'Set {name} to the Postgres connection string')
+    return psycopg2.connect(dsn)
+
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_checkpoint(path, state):
+    if not path:
+        return
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def column_types(connection, table):
+    """{column: SQL type} of a table on ``connection``"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT a.attname, format_type(a.atttypid, a.atttypmod) FROM pg_attribute a '
+            'WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped',
+            (table,)
+        )
+        types = dict(cursor.fetchall())
+    connection.rollback()
+    if not types:
+        raise MigrationError(f'Table {table} does not exist on the target; apply schema.sql first')
+    return types
+
+
+def copy_table(source, target, table, after=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Copy ``table`` in batches starting after id ``after``.
+
+    Yields (last id, read, inserted, []) per batch, after a first (None, 0, 0, mapped
+    columns the target table lacks) so they are reported before any rows move.
+    """
+    from psycopg2.extras import execute_values
+
+    types = column_types(target, table.target)
+    columns = [name for name in table.columns if name in types]
+    yield None, 0, 0, [name for name in table.columns if name not in types]
+
+    select, insert = table.select(columns), table.insert(columns, types)
+    # Smallest UUID; ids are compared as UUIDs on both sides
+    after = after or '00000000-0000-0000-0000-000000000000'
+    while True:
+        with source.cursor() as cursor:
+            cursor.execute(select, (after, batch_size))
+            rows = cursor.fetchall()
+        # End the read transaction so a long run doesn't hold one snapshot open
+        source.rollback()
+        if not rows:
+            return
+        with target.cursor() as cursor:
+            inserted = execute_values(cursor, insert, rows, page_size=batch_size, fetch=True)
+        target.commit()
+        after = str(rows[-1][0])
+        yield after, len(rows), len(inserted), []
+
+
+def migrate(source_dsn=None, target_dsn=None, tables=None, batch_size=DEFAULT_BATCH_SIZE,
+            checkpoint_path=None, progress=None):
+    """Copy every legacy table (or the ``tables`` named by target) into the canonical schema.
+
+    Returns {target table: {'read': n, 'inserted': n, 'dropped_columns': [...]}} for
+    this run; rows read but not inserted were already present or merged into a row
+    with the same natural key.
+    """
+    selected = [table for table in TABLES if not tables or table.target in tables]
+    unknown = set(tables or ()) - {table.target for table in TABLES}
+    if unknown:
+        raise MigrationError(f'Unknown tables: {", ".join(sorted(unknown))}')
+    if batch_size <= 0:
+        raise MigrationError('batch_size must be positive')
+
+    source = connect(source_dsn or os.getenv('LEGACY_DATABASE_URL'), 'LEGACY_DATABASE_URL')
+    source.set_session(readonly=True)
+    target = connect(target_dsn or os.getenv('DATABASE_URL'), 'DATABASE_URL')
+    state = load_checkpoint(checkpoint_path)
+    results = {}
+    try:
+        for table in selected:
+            counts = results[table.target] = {'read': 0, 'inserted': 0, 'dropped_columns': []}
+            for after, read, inserted, dropped in copy_table(source, target, table, state.get(table.target), batch_size):
+                counts['dropped_columns'] += dropped
+                if after is None:
+                    continue
+                counts['read'] += read
+                counts['inserted'] += inserted
+                state[table.target] = after
+                save_checkpoint(checkpoint_path, state)
+                if progress:
+                    progress(table.target, counts)
+    finally:
+        source.close()
+        target.close()
+    return results
+
+
+def migrate_bookings(source_url, batch_size=DEFAULT_BATCH_SIZE, checkpoint_path=None, progress=None):
+    """Copy reinvent-booking-backend's bookings (SQLAlchemy URL ``source_url``) into the app database.
+
+    Runs in an app context. Programs are matched by name and trainers by email; a
+    booking whose program has no match is counted as unmatched and left behind. A
+    booking the app already has for the same user, program and dates is skipped, so
+    the copy can be repeated. Returns {'read', 'inserted', 'skipped', 'unmatched'}.
+    """
+    from secrets import token_urlsafe
+    from sqlalchemy import MetaData, create_engine, select
+    from werkzeug.security import generate_password_hash
+    from src.models.user import db
+    from src.models.booking import Booking
+    from src.models.program import Program
+    from src.models.trainer import Trainer
+    from src.models.session import Session
+    from src.booking_import import session_plan
+    from src.booking_service import BookingError, client_user, parse_date
+    from src.seats import hold_seats
+    from src import calendar_feed
+
+    if batch_size <= 0:
+        raise MigrationError('batch_size must be positive')
+    engine = create_engine(source_url)
+    metadata = MetaData()
+    metadata.reflect(engine)
+    if 'booking' not in metadata.tables:
+        raise MigrationError(f'{source_url} has no booking table')
+    legacy = metadata.tables['booking']
+
+    def matches(table_name, model, key):
+        """{legacy id: app id} for rows with the same ``key`` on both sides"""
+        table = metadata.tables.get(table_name)
+        if table is None or key not in table.c:
+            return {}
+        with engine.connect() as connection:
+            legacy_keys = dict(connection.execute(select(table.c[key], table.c.id)).all())
+        ids = dict(db.session.execute(select(getattr(model, key), model.id).where(getattr(model, key).in_(list(legacy_keys)))).all())
+        return {legacy_id: ids[value] for value, legacy_id in legacy_keys.items() if value in ids}
+
+    programs = matches('program', Program, 'name')
+    trainers = matches('trainer', Trainer, 'email')
+    # Migrated clients have no password anyone knows; they reset it to sign in
+    password_hash = generate_password_hash(token_urlsafe())
+
+    state = load_checkpoint(checkpoint_path)
+    after = state.get('booking', 0)
+    counts = {'read': 0, 'inserted': 0, 'skipped': 0, 'unmatched': 0}
+    while True:
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(legacy).where(legacy.c.id > after).order_by(legacy.c.id).limit(batch_size)
+            ).mappings().all()
+        if not rows:
+            return counts
+
+        touched = []
+        for row in rows:
+            counts['read'] += 1
+            program = db.session.get(Program, programs[row['program_id']]) if row['program_id'] in programs else None
+            if program is None or not row.get('client_email'):
+                counts['unmatched'] += 1
+                continue
+            try:
+                user = client_user({
+                    'client_name': row.get('client_name') or row['client_email'],
+                    'client_email': row['client_email'],
+                    'client_phone': row.get('client_phone') or '',
+                    'company': row.get('company') or '',
+                    'position': row.get('position') or '',
+                }, password_hash)
+                start_date = parse_date(str(row['start_date']), 'start_date')
+                end_date = parse_date(str(row['end_date']), 'end_date')
+            except BookingError:
+                counts['unmatched'] += 1
+                continue
+
+            existing = db.session.scalar(select(Booking.id).filter_by(
+                user_id=user.id, program_id=program.id, start_date=start_date, end_date=end_date
+            ).limit(1))
+            if existing:
+                counts['skipped'] += 1
+                continue
+
+            status = row.get('status') or 'pending'
+            if status != 'cancelled':
+                # The old backend never checked capacity; its bookings hold seats even past it
+                hold_seats(program, start_date, end_date)
+            booking = Booking(
+                user_id=user.id,
+                program=program,
+                trainer_id=trainers.get(row.get('trainer_id')),
+                start_date=start_date,
+                end_date=end_date,
+                total_amount=row.get('total_amount') if row.get('total_amount') is not None else program.price,
+                special_requirements=row.get('special_requirements'),
+                payment_status=row.get('payment_status') or 'pending',
+                booking_status=status,
+                sessions=[] if status == 'cancelled' else [
+                    Session(session_date=session_date, start_time=start_time, end_time=end_time,
+                            session_type='group', location='TBD')
+                    for session_date, start_time, end_time in session_plan(program.program_type, start_date, end_date)
+                ]
+            )
+            db.session.add(booking)
+            touched.append(booking)
+            counts['inserted'] += 1
+
+        db.session.flush()
+        calendar_feed.touch_bookings([(booking.id, booking.user_id, booking.trainer_id) for booking in touched])
+        db.session.commit()
+        after = rows[-1]['id']
+        state['booking'] = after
+        save_checkpoint(checkpoint_path, state)
+        if progress:
+            progress('booking', counts)
@@ -0,0 +1,37 @@
+-- One-off upgrade of a database created from an earlier schema.sql
+-- schema.sql creates the database from scratch and only holds CREATE statements. A
+-- database that already has rows needs the changes below once: run the first part,
+-- then the new sections of schema.sql (Sharded Counters onwards), then the second part.
+
+-- Part 1: columns and constraints of existing tables
+ALTER TABLE enrollments DROP CONSTRAINT IF EXISTS enrollments_payment_status_check;
+ALTER TABLE enrollments ADD CONSTRAINT enrollments_payment_status_check
+  CHECK (payment_status IN ('pending', 'completed', 'failed', 'refunded', 'expired'));
+ALTER TABLE enrollments ADD COLUMN IF NOT EXISTS access_status TEXT DEFAULT 'active' CHECK (access_status IN ('active', 'lapsed'));
+-- The sweeper functions now return the changed rows instead of a count
+DROP FUNCTION IF EXISTS expire_stale_enrollments(INTERVAL, INTEGER);
+DROP FUNCTION IF EXISTS lapse_expired_access(INTEGER);
+
+-- Part 2: run after schema.sql
+
+-- Covered by UNIQUE(email), UNIQUE(user_id, module_id) and idx_enrollments_user_enrolled_at
+DROP INDEX IF EXISTS idx_profiles_email;
+DROP INDEX IF EXISTS idx_user_progress_user_id;
+DROP INDEX IF EXISTS idx_enrollments_user_id;
+
+-- Index rows that existed before the search triggers
+INSERT INTO search_documents (doc_type, doc_id, title, body, is_public)
+SELECT 'program', id, name, concat_ws(' ', description, long_description, biblical_foundation), is_active FROM programs
+UNION ALL
+SELECT 'module', id, title, concat_ws(' ', description, biblical_principle, array_to_string(scripture_references, ' ')), is_published FROM modules
+UNION ALL
+SELECT 'forum_post', p.id, p.title, concat_ws(' ', p.content, p.biblical_reference), NOT COALESCE(f.is_private, false)
+FROM forum_posts p LEFT JOIN discussion_forums f ON f.id = p.forum_id
+UNION ALL
+SELECT 'prayer_request', id, title, request_text, is_public FROM prayer_requests
+ON CONFLICT (doc_type, doc_id) DO NOTHING;
+
+-- Posts of private forums indexed as public before visibility followed the forum
+UPDATE search_documents d SET is_public = false
+FROM forum_posts p JOIN discussion_forums f ON f.id = p.forum_id
+WHERE d.doc_type = 'forum_post' AND d.doc_id = p.id AND f.is_private AND d.is_public;
@@ -0,0 +1,85 @@
+import os
+from flask import Blueprint, jsonify, request
+from src.models.user import db
+from src.clients import supabase
+from src import search_index
+
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'sqlite')
+DOC_TYPES = ('program', 'module', 'forum_post', 'prayer_request')
+
+search_bp = Blueprint('search', __name__)
+
+def parse_types():
+    types = [t for t in request.args.get('type', '').split(',') if t]
+    invalid = [t for t in types if t not in DOC_TYPES]
+    if invalid:
+        raise ValueError(f'Unknown type: {", ".join(invalid)}')
+    return types or None
+
+@search_bp.route('/search', methods=['GET'])
+def search_content():
+    """Ranked search across programs, modules, forum posts and prayer requests"""
+    try:
+        query = request.args.get('q', '').strip()
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+
+        if not query:
+            return jsonify({
+                'success': False,
+                'error': 'Missing required parameter: q'
+            }), 400
+
+        try:
+            types = parse_types()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        if SEARCH_BACKEND == 'supabase':
+            response = supabase.rpc('search_content', {'p_query': query, 'p_types': types, 'p_limit': limit}).execute()
+            results = response.data or []
+        else:
+            with db.engine.connect() as connection:
+                results = search_index.search(connection, query, types, limit)
+
+        return jsonify({
+            'success': True,
+            'results': results
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@search_bp.route('/search/autocomplete', methods=['GET'])
+def autocomplete():
+    """Title suggestions for a search box prefix"""
+    try:
+        prefix = request.args.get('q', '').strip()
+        limit = max(1, min(request.args.get('limit', 10, type=int), 25))
+
+        if len(prefix) < 2:
+            return jsonify({
+                'success': True,
+                'suggestions': []
+            }), 200
+
+        if SEARCH_BACKEND == 'supabase':
+            response = supabase.rpc('autocomplete_content', {'p_prefix': prefix, 'p_limit': limit}).execute()
+            suggestions = response.data or []
+        else:
+            with db.engine.connect() as connection:
+                suggestions = search_index.autocomplete(connection, prefix, limit)
+
+        return jsonify({
+            'success': True,
+            'suggestions': suggestions
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -0,0 +1,152 @@
+"""
+SQLite FTS5 search index for the development database.
+
+Mirrors the ``search_documents`` table in schema.sql: one row per searchable record,
+updated from SQLAlchemy mapper events inside the writing transaction.
+"""
+
+import re
+from sqlalchemy import event, text
+
+FTS_SCHEMA = [
+    # Maps (doc_type, doc_id) to the FTS rowid so updates and deletes are point lookups
+    """CREATE TABLE IF NOT EXISTS search_document_keys (
+        rowid INTEGER PRIMARY KEY,
+        doc_type TEXT NOT NULL,
+        doc_id TEXT NOT NULL,
+        UNIQUE (doc_type, doc_id)
+    )""",
+    # prefix='2 3 4 5' builds prefix indexes so autocomplete does not scan the term list
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_documents USING fts5(
+        doc_type UNINDEXED,
+        doc_id UNINDEXED,
+        title,
+        body,
+        prefix='2 3 4 5',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+]
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# bm25 column weights: doc_type, doc_id, title, body
+RANK_EXPRESSION = 'bm25(search_documents, 0.0, 0.0, 10.0, 1.0)'
+
+
+def create_search_index(connection):
+    """Create the FTS tables if they do not exist"""
+    for statement in FTS_SCHEMA:
+        connection.execute(text(statement))
+
+
+def build_match_query(query, prefix_last=True, column=None):
+    """Turn free text into a safe FTS5 MATCH expression"""
+    tokens = TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    if prefix_last:
+        terms[-1] += '*'
+    expression = ' '.join(terms)
+    return f'{column} : ({expression})' if column else expression
+
+
+def index_document(connection, doc_type, doc_id, title, body):
+    """Insert or replace a single document"""
+    connection.execute(
+        text('INSERT OR IGNORE INTO search_document_keys (doc_type, doc_id) VALUES (:doc_type, :doc_id)'),
+        {'doc_type': doc_type, 'doc_id': str(doc_id)}
+    )
+    rowid = connection.execute(
+        text('SELECT rowid FROM search_document_keys WHERE doc_type = :doc_type AND doc_id = :doc_id'),
+        {'doc_type': doc_type, 'doc_id': str(doc_id)}
+    ).scalar()
+    connection.execute(text('DELETE FROM search_documents WHERE rowid = :rowid'), {'rowid': rowid})
+    connection.execute(
+        text('INSERT INTO search_documents (rowid, doc_type, doc_id, title, body) VALUES (:rowid, :doc_type, :doc_id, :title, :body)'),
+        {'rowid': rowid, 'doc_type': doc_type, 'doc_id': str(doc_id), 'title': title or '', 'body': body or ''}
+    )
+
+
+def remove_document(connection, doc_type, doc_id):
+    """Remove a document from the index"""
+    rowid = connection.execute(
+        text('SELECT rowid FROM search_document_keys WHERE doc_type = :doc_type AND doc_id = :doc_id'),
+        {'doc_type': doc_type, 'doc_id': str(doc_id)}
+    ).scalar()
+    if rowid is None:
+        return
+    connection.execute(text('DELETE FROM search_documents WHERE rowid = :rowid'), {'rowid': rowid})
+    connection.execute(text('DELETE FROM search_document_keys WHERE rowid = :rowid'), {'rowid': rowid})
+
+
+def search(connection, query, doc_types=None, limit=20):
+    """Ranked full-text search. Returns a list of result dicts, best match first."""
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    sql = (
+        f"SELECT doc_type, doc_id, title, snippet(search_documents, 3, '<b>', '</b>', '...', 12) AS snippet, "
+        f"{RANK_EXPRESSION} AS rank FROM search_documents WHERE search_documents MATCH :match"
+    )
+    params = {'match': match, 'limit': limit}
+    if doc_types:
+        placeholders = ', '.join(f':type{i}' for i in range(len(doc_types)))
+        sql += f' AND doc_type IN ({placeholders})'
+        params.update({f'type{i}': doc_type for i, doc_type in enumerate(doc_types)})
+    sql += ' ORDER BY rank LIMIT :limit'
+
+    return [dict(row._mapping) for row in connection.execute(text(sql), params)]
+
+
+def autocomplete(connection, prefix, limit=10, candidates=50):
+    """Title suggestions for a prefix.
+
+    Ranking every match with bm25 is too slow for short prefixes on large corpora, so a
+    bounded number of candidates is read straight off the prefix index and the shortest
+    titles win.
+    """
+    match = build_match_query(prefix, column='title')
+    if not match:
+        return []
+
+    rows = connection.execute(
+        text('SELECT doc_type, doc_id, title FROM search_documents WHERE search_documents MATCH :match LIMIT :candidates'),
+        {'match': match, 'candidates': max(candidates, limit)}
+    )
+    suggestions = sorted((dict(row._mapping) for row in rows), key=lambda row: (len(row['title']), row['title']))
+    return suggestions[:limit]
+
+
+def register_model(model, doc_type, title_attr, body_attrs, is_public=None):
+    """Keep ``model`` rows indexed as they are inserted, updated and deleted.
+
+    The listeners run on the flushing connection, so index writes commit or roll back
+    with the row itself.
+    """
+
+    def upsert(mapper, connection, target):
+        if is_public is not None and not is_public(target):
+            remove_document(connection, doc_type, target.id)
+            return
+        body = ' '.join(str(getattr(target, attr)) for attr in body_attrs if getattr(target, attr, None))
+        index_document(connection, doc_type, target.id, getattr(target, title_attr), body)
+
+    def delete(mapper, connection, target):
+        remove_document(connection, doc_type, target.id)
+
+    event.listen(model, 'after_insert', upsert)
+    event.listen(model, 'after_update', upsert)
+    event.listen(model, 'after_delete', delete)
+
+
+def rebuild(connection, model, doc_type, title_attr, body_attrs, is_public=None):
+    """Reindex every row of ``model``, e.g. after creating the index on an existing database"""
+    for row in connection.execute(model.__table__.select()):
+        values = row._mapping
+        if is_public is not None and not is_public(row):
+            remove_document(connection, doc_type, values['id'])
+            continue
+        body = ' '.join(str(values[attr]) for attr in body_attrs if values.get(attr))
+        index_document(connection, doc_type, values['id'], values[title_attr], body)
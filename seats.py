@@ -0,0 +1,205 @@
+"""
+Per-program, per-date seat ledger.
+
+A booking reserves one seat on every date it spans with a single conditional UPDATE
+(``reserved + seats <= capacity``). The statement either touches every date in the
+range or the caller rolls back, so concurrent sign-ups can never push a date past
+``max_participants``. Only bookings for the same program and dates contend with each
+other; everything else proceeds in parallel.
+"""
+
+import os
+from collections import Counter
+from datetime import timedelta
+from functools import lru_cache
+from sqlalchemy import and_, bindparam, insert, null, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.program import Program
+from src.models.booking import Booking
+
+# Bookings in these states do not hold seats
+RELEASED_STATUSES = ('cancelled',)
+# Longest range a booking or availability query may span; every date is a ledger row
+MAX_RANGE_DAYS = int(os.getenv('BOOKING_MAX_RANGE_DAYS', '366'))
+
+
+class SeatLedger(db.Model):
+    __tablename__ = 'program_seat_ledger'
+
+    program_id = db.Column(db.Integer, db.ForeignKey(Program.id), primary_key=True)
+    seat_date = db.Column(db.Date, primary_key=True)
+    capacity = db.Column(db.Integer, nullable=False)
+    reserved = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.CheckConstraint('reserved >= 0', name='ck_seat_ledger_reserved'),)
+
+
+class SeatsUnavailable(Exception):
+    pass
+
+
+def check_range(start_date, end_date):
+    """Raise ValueError unless ``end_date`` is not before ``start_date`` and the range fits MAX_RANGE_DAYS"""
+    if end_date < start_date:
+        raise ValueError('end_date must not be before start_date')
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'A date range can span at most {MAX_RANGE_DAYS} days')
+
+
+def date_range(start_date, end_date):
+    check_range(start_date, end_date)
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+def booked_per_date(program_id, start_date, end_date):
+    """Seats held by existing bookings on each date, counted from the bookings table"""
+    bookings = db.session.execute(
+        select(Booking.start_date, Booking.end_date).where(
+            Booking.program_id == program_id,
+            Booking.booking_status.notin_(RELEASED_STATUSES),
+            Booking.start_date <= end_date,
+            Booking.end_date >= start_date
+        )
+    ).all()
+    counts = Counter()
+    for booking_start, booking_end in bookings:
+        for day in date_range(max(booking_start, start_date), min(booking_end, end_date)):
+            counts[day] += 1
+    return counts
+
+
+def _insert_ignore(rows):
+    """Insert ledger rows, skipping dates that another transaction created first"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        db.session.execute(dialect_insert(SeatLedger).on_conflict_do_nothing(index_elements=['program_id', 'seat_date']), rows)
+        return
+    # No ON CONFLICT: one savepoint per row, rolled back when the date already exists
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(SeatLedger), [row])
+        except IntegrityError:
+            pass
+
+
+def ensure_ledger(program, start_date, end_date):
+    """Create missing ledger rows, seeded from the bookings that already exist"""
+    dates = date_range(start_date, end_date)
+    existing = set(db.session.execute(
+        select(SeatLedger.seat_date).where(
+            SeatLedger.program_id == program.id,
+            SeatLedger.seat_date.between(start_date, end_date)
+        )
+    ).scalars())
+    missing = [day for day in dates if day not in existing]
+    if not missing:
+        return len(dates)
+
+    booked = booked_per_date(program.id, min(missing), max(missing))
+    _insert_ignore([
+        {'program_id': program.id, 'seat_date': day, 'capacity': program.max_participants, 'reserved': booked[day]}
+        for day in missing
+    ])
+    return len(dates)
+
+
+def reserve_seats(program, start_date, end_date, seats=1):
+    """Atomically take ``seats`` on every date of the range.
+
+    Raises SeatsUnavailable when any date is full; the caller must roll back, since
+    dates that did have room were already incremented in this transaction.
+    """
+    days = ensure_ledger(program, start_date, end_date)
+    result = db.session.execute(
+        update(SeatLedger)
+        .where(
+            SeatLedger.program_id == program.id,
+            SeatLedger.seat_date.between(start_date, end_date),
+            SeatLedger.reserved + seats <= SeatLedger.capacity
+        )
+        .values(reserved=SeatLedger.reserved + seats)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != days:
+        raise SeatsUnavailable('No seats available for the selected dates')
+
+
+def hold_seats(program, start_date, end_date, seats=1):
+    """Count seats that are already taken, even past capacity (bookings copied from elsewhere).
+
+    Call before the booking is added to the session, so the ledger is not also seeded
+    from it.
+    """
+    ensure_ledger(program, start_date, end_date)
+    db.session.execute(
+        update(SeatLedger)
+        .where(SeatLedger.program_id == program.id, SeatLedger.seat_date.between(start_date, end_date))
+        .values(reserved=SeatLedger.reserved + seats)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_seats(program_id, start_date, end_date, seats=1):
+    """Give back seats held by a booking"""
+    db.session.execute(
+        update(SeatLedger)
+        .where(
+            SeatLedger.program_id == program_id,
+            SeatLedger.seat_date.between(start_date, end_date),
+            SeatLedger.reserved >= seats
+        )
+        .values(reserved=SeatLedger.reserved - seats)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@lru_cache(maxsize=None)
+def _availability_query():
+    """Built once; the program and dates are bound per call"""
+    program_id, start_date, end_date = bindparam('program_id'), bindparam('start_date'), bindparam('end_date')
+    ledger = select(SeatLedger.seat_date, SeatLedger.seat_date, SeatLedger.capacity - SeatLedger.reserved).where(
+        and_(SeatLedger.program_id == program_id, SeatLedger.seat_date.between(start_date, end_date))
+    )
+    bookings = select(Booking.start_date, Booking.end_date, null()).where(
+        Booking.program_id == program_id,
+        Booking.booking_status.notin_(RELEASED_STATUSES),
+        Booking.start_date <= end_date,
+        Booking.end_date >= start_date
+    )
+    return union_all(ledger, bookings)
+
+
+def available_seats(program, start_date, end_date):
+    """Fewest free seats on any date of the range, without writing to the ledger.
+
+    Ledger rows and overlapping bookings come back in one statement; the bookings
+    only count on dates that have no ledger row yet.
+    """
+    rows = db.session.execute(
+        _availability_query(),
+        {'program_id': program.id, 'start_date': start_date, 'end_date': end_date}
+    )
+    free, booked = {}, Counter()
+    for first, last, seats in rows:
+        if seats is not None:
+            free[first] = seats
+            continue
+        for day in date_range(max(first, start_date), min(last, end_date)):
+            booked[day] += 1
+    return min(free.get(day, program.max_participants - booked[day]) for day in date_range(start_date, end_date))
+
+
+def set_capacity(program_id, capacity):
+    """Apply a new max_participants to every ledger date of the program"""
+    db.session.execute(
+        update(SeatLedger)
+        .where(SeatLedger.program_id == program_id)
+        .values(capacity=capacity)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,220 @@
+"""
+Compiled model serializers for API responses.
+
+``schema_for(Booking, 'id,start_date,program.name', include=('program',))`` returns a
+Schema whose ``dump`` is generated Python source with one attribute read per field, so
+serializing a row costs a single dict literal instead of a ``to_dict()`` call plus the
+nested dicts the routes add. Schemas are cached per (model, fields, include).
+
+A schema has the fields of the model's ``to_dict()``, in its order and formatted the
+same way (``start_time`` as ``'09:00'``, dates as ISO strings), so GET responses match
+the ones POST and PUT build with ``to_dict()``. The formatting is read off ``to_dict()``
+once per model by calling it on a probe instance. ``dumps`` uses orjson when it is
+installed and the stdlib encoder otherwise.
+"""
+
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+from uuid import UUID
+
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Never serialized, even when requested explicitly
+EXCLUDED_COLUMNS = frozenset({'password_hash'})
+
+# Probe value per column type; times have seconds so '%H:%M' and isoformat differ
+PROBE_VALUES = {
+    str: 'probe', int: 7, float: 7.5, Decimal: Decimal('7.5'), bool: True,
+    datetime: datetime(2001, 2, 3, 4, 5, 6), date: date(2001, 2, 3), time: time(4, 5, 6),
+    UUID: UUID(int=7),
+}
+
+# How a to_dict() may format a column, tried in this order against the probe
+FORMATTERS = {
+    'isoformat': lambda value: value.isoformat(),
+    'hours_minutes': lambda value: value.strftime('%H:%M'),
+    'float': float,
+    'str': str,
+}
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    def dumps(payload):
+        return orjson.dumps(payload, default=_default)
+else:
+    _encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(payload):
+        return _encoder.encode(payload).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    """Drop-in for ``jsonify(payload), status`` that goes through ``dumps``"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
+
+
+@lru_cache(maxsize=None)
+def dict_fields(model):
+    """``[(key, format)]`` of ``model.to_dict()`` in its order.
+
+    ``format`` names a FORMATTERS entry, is None for a column returned as is, and is
+    ``'to_dict'`` for a key that is not a column (read from ``to_dict()`` itself).
+    """
+    columns = {attr.key: attr.columns[0] for attr in inspect(model).column_attrs}
+    probe = inspect(model).class_manager.new_instance()
+    raw = {}
+    for key, column in columns.items():
+        try:
+            value = PROBE_VALUES.get(column.type.python_type)
+        except NotImplementedError:
+            value = None
+        if value is not None:
+            setattr(probe, key, value)
+            raw[key] = value
+
+    fields = []
+    for key, output in probe.to_dict().items():
+        if key in EXCLUDED_COLUMNS:
+            continue
+        if key not in columns:
+            fields.append((key, 'to_dict'))
+            continue
+        value = raw.get(key)
+        if value is None or output is None or output == value:
+            fields.append((key, None))
+            continue
+        for name, format_value in FORMATTERS.items():
+            try:
+                if format_value(value) == output:
+                    fields.append((key, name))
+                    break
+            except (AttributeError, TypeError, ValueError):
+                continue
+        else:
+            fields.append((key, 'to_dict'))
+    return fields
+
+
+def parse_fields(fields):
+    """``'id,program.name,program.price'`` -> ``{'id': None, 'program': {'name': None, 'price': None}}``"""
+    if not fields:
+        return None
+    tree = {}
+    for path in fields.split(','):
+        parts = [part.strip() for part in path.split('.')]
+        if not all(parts):
+            raise ValueError(f'Invalid field: {path!r}')
+        node = tree
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is None:
+                child = node[part] = {}
+            node = child
+        node.setdefault(parts[-1], None)
+    return tree
+
+
+class Schema:
+    """Serializer for one model and one field selection"""
+
+    def __init__(self, model, tree=None, include=()):
+        mapper = inspect(model)
+        self.model = model
+        formats = dict(dict_fields(model))
+        relationships = mapper.relationships
+
+        self.projected = tree is not None
+        if tree is None:
+            tree = dict.fromkeys(formats)
+            tree.update((name, None) for name in include)
+
+        self.columns = []  # (key, format)
+        self.nested = {}
+        for key, subtree in tree.items():
+            if key in formats and subtree is None:
+                self.columns.append((key, formats[key]))
+            elif key in include and key in relationships:
+                relationship = relationships[key]
+                self.nested[key] = (Schema(relationship.mapper.class_, subtree), relationship)
+            else:
+                raise ValueError(f'Unknown field for {model.__name__}: {key}')
+
+        self.dump = self._compile()
+
+    def _compile(self):
+        namespace = {}
+        lines = ['def dump(obj):']
+        if any(format_name == 'to_dict' for _, format_name in self.columns):
+            lines.append('    as_dict = obj.to_dict()')
+        items = []
+        for index, (key, format_name) in enumerate(self.columns):
+            if format_name is None:
+                items.append(f'{key!r}: obj.{key}')
+            elif format_name == 'to_dict':
+                items.append(f'{key!r}: as_dict[{key!r}]')
+            else:
+                namespace[f'format_{index}'] = FORMATTERS[format_name]
+                lines.append(f'    column_{index} = obj.{key}')
+                items.append(f'{key!r}: None if column_{index} is None else format_{index}(column_{index})')
+        for index, (key, (schema, relationship)) in enumerate(self.nested.items()):
+            namespace[f'dump_{index}'] = schema.dump
+            if relationship.uselist:
+                items.append(f'{key!r}: [dump_{index}(item) for item in obj.{key}]')
+            else:
+                lines.append(f'    value_{index} = obj.{key}')
+                items.append(f'{key!r}: None if value_{index} is None else dump_{index}(value_{index})')
+        lines.append('    return {' + ', '.join(items) + '}')
+        exec(compile('\n'.join(lines), f'<schema {self.model.__name__}>', 'exec'), namespace)
+        return namespace['dump']
+
+    def dump_many(self, objects):
+        dump = self.dump
+        return [dump(obj) for obj in objects]
+
+    def _load_only(self, extra_columns=()):
+        mapper = inspect(self.model)
+        extra_columns = list(mapper.primary_key) + list(extra_columns)
+        for _, relationship in self.nested.values():
+            if not relationship.uselist:
+                extra_columns.extend(relationship.local_columns)
+        keys = {key for key, _ in self.columns} | {mapper.get_property_by_column(column).key for column in extra_columns}
+        return load_only(*(getattr(self.model, key) for key in keys))
+
+    def load_options(self):
+        """Query options that load only what ``dump`` reads, relationships included"""
+        # A field only to_dict() can compute may read any column, so nothing is deferred then
+        computed = any(format_name == 'to_dict' for _, format_name in self.columns)
+        options = [self._load_only()] if self.projected and not computed else []
+        for key, (schema, relationship) in self.nested.items():
+            loader = selectinload(getattr(self.model, key))
+            if schema.projected:
+                # The child's join column is needed to match rows back to their parents
+                extra = relationship.remote_side if relationship.uselist else ()
+                loader = loader.options(schema._load_only(extra))
+            options.append(loader)
+        return options
+
+
+@lru_cache(maxsize=256)
+def schema_for(model, fields=None, include=()):
+    """Cached Schema for ``model``; ``fields`` is the raw ``?fields=`` query parameter"""
+    return Schema(model, parse_fields(fields), tuple(include))
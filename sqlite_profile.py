@@ -0,0 +1,141 @@
+"""
+SQLite engine profiles.
+
+``production`` (the default) switches the database to WAL so readers never block the
+writer, waits up to SQLITE_BUSY_TIMEOUT_MS for the write lock instead of failing with
+"database is locked", and sizes the page cache and memory map for a small server.
+Transactions of POST/PUT/PATCH/DELETE requests start with BEGIN IMMEDIATE, so they
+wait for the write lock up front instead of failing when a read transaction tries to
+upgrade after another writer committed.
+
+With SQLITE_READ_ONLY=1 a second engine opened with ``mode=ro`` is registered as the
+``readonly`` bind; hot GET routes pass ``read_bind()`` to run their queries there.
+"""
+
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+READ_ONLY_BIND = 'readonly'
+
+PROFILES = {
+    # SQLite's own defaults: rollback journal, no busy timeout
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+}
+
+# Per-connection settings that make sense on a read-only connection
+READ_ONLY_PRAGMAS = ('cache_size', 'mmap_size', 'temp_store', 'busy_timeout')
+
+
+def profile_pragmas(name):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {name!r}, expected one of {', '.join(PROFILES)}")
+    pragmas = dict(PROFILES[name])
+    if pragmas and os.getenv('SQLITE_BUSY_TIMEOUT_MS'):
+        pragmas['busy_timeout'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS'))
+    if pragmas and os.getenv('SQLITE_CACHE_SIZE_KB'):
+        pragmas['cache_size'] = -int(os.getenv('SQLITE_CACHE_SIZE_KB'))
+    if pragmas and os.getenv('SQLITE_MMAP_SIZE'):
+        pragmas['mmap_size'] = int(os.getenv('SQLITE_MMAP_SIZE'))
+    return pragmas
+
+
+def _is_file_database(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def read_only_uri(uri):
+    url = make_url(uri)
+    path = os.path.abspath(url.database)
+    return f'sqlite:///file:{path}?mode=ro&uri=true'
+
+
+def configure(app):
+    """Fill in engine options and binds; call before ``db.init_app(app)``"""
+    config = app.config
+    config.setdefault('SQLITE_PROFILE', os.getenv('SQLITE_PROFILE', 'production'))
+    config.setdefault('SQLITE_READ_ONLY', os.getenv('SQLITE_READ_ONLY', '0') == '1')
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    pragmas = profile_pragmas(config['SQLITE_PROFILE'])
+    if not pragmas or not _is_file_database(uri):
+        config['SQLITE_PRAGMAS'] = {}
+        return
+
+    config['SQLITE_PRAGMAS'] = pragmas
+    engine_options = config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    engine_options.setdefault('pool_size', int(os.getenv('SQLITE_POOL_SIZE', '8')))
+    engine_options.setdefault('max_overflow', int(os.getenv('SQLITE_MAX_OVERFLOW', '8')))
+    engine_options.setdefault('pool_timeout', pragmas['busy_timeout'] / 1000)
+    connect_args = engine_options.setdefault('connect_args', {})
+    connect_args.setdefault('timeout', pragmas['busy_timeout'] / 1000)
+    connect_args.setdefault('check_same_thread', False)
+
+    if config['SQLITE_READ_ONLY']:
+        binds = config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(READ_ONLY_BIND, dict(engine_options, url=read_only_uri(uri)))
+
+
+def init_app(app, db):
+    """Apply the profile's pragmas to every new connection; call after ``db.init_app(app)``"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    read_only_pragmas = {key: pragmas[key] for key in READ_ONLY_PRAGMAS if key in pragmas}
+    read_only_pragmas['query_only'] = 'ON'
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if bind_key == READ_ONLY_BIND:
+                install(engine, read_only_pragmas)
+            else:
+                install(engine, pragmas, begin=begin_mode)
+
+
+def begin_mode():
+    """IMMEDIATE for requests that change data, so they queue on the write lock up front"""
+    from flask import has_request_context, request
+
+    if has_request_context() and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return 'IMMEDIATE'
+    return 'DEFERRED'
+
+
+def install(engine, pragmas, begin=None):
+    """Run ``PRAGMA key = value`` on connect; with ``begin``, emit BEGIN ourselves"""
+    statements = [f'PRAGMA {key} = {value}' for key, value in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        # pysqlite would otherwise open its own transaction before the pragmas run
+        isolation_level = dbapi_connection.isolation_level
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+        if begin is None:
+            dbapi_connection.isolation_level = isolation_level
+
+    if begin is not None:
+        @event.listens_for(engine, 'begin')
+        def begin_transaction(connection):
+            connection.exec_driver_sql(f'BEGIN {begin()}')
+
+
+def read_bind():
+    """``bind_arguments`` for ``db.session.execute`` that route a read to the read-only engine"""
+    from flask import current_app
+    from src.models.user import db
+
+    if not current_app.config.get('SQLITE_READ_ONLY') or READ_ONLY_BIND not in db.engines:
+        return {}
+    return {'bind': db.engines[READ_ONLY_BIND]}
@@ -0,0 +1,176 @@
+"""
+In-memory manifest of the static folder used by ``main.serve``.
+
+The folder is indexed once at startup, so a request never touches the filesystem to
+decide what to send. Precompressed ``.br``/``.gz`` siblings are served when the client
+accepts them, fingerprinted files get immutable caching, and ``index.html`` is held in
+memory for SPA fallbacks. When ``build_assets.py`` has written an
+``asset-manifest.json`` its content hashes are reused and the original asset names
+are aliased to their fingerprinted copies.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from flask import Response, request, send_file
+
+# What build_assets.py emits (styles.3f9a1c2b9d.css); only trusted when there is no
+# asset-manifest.json listing the fingerprinted files
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{10}\.[A-Za-z0-9]+$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+MANIFEST_NAME = 'asset-manifest.json'
+IMMUTABLE_MAX_AGE = 31536000
+DEFAULT_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', '0'))
+
+
+class StaticAsset:
+    __slots__ = ('path', 'mimetype', 'etag', 'immutable', 'variants')
+
+    def __init__(self, path, mimetype, etag, immutable, variants):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.immutable = immutable
+        # encoding -> (path, etag)
+        self.variants = variants
+
+
+class StaticManifest:
+    def __init__(self, static_folder, index_name='index.html'):
+        self.static_folder = static_folder
+        self.index_name = index_name
+        self.assets = {}
+        self.index = None
+        self.index_variants = {}
+        self.known_etags = {}
+        self.reload()
+
+    def reload(self):
+        """Rescan the static folder"""
+        build_manifest = self._load_build_manifest()
+        self.known_etags = {
+            os.path.join(self.static_folder, rel_path): info['etag']
+            for rel_path, info in build_manifest.get('files', {}).items()
+        }
+
+        fingerprinted = set(build_manifest.get('assets', {}).values())
+        assets = {}
+        if self.static_folder and os.path.isdir(self.static_folder):
+            for root, _, files in os.walk(self.static_folder):
+                names = set(files)
+                for name in files:
+                    if name == MANIFEST_NAME or name.endswith(('.br', '.gz')) and name[:-3] in names:
+                        continue
+                    full_path = os.path.join(root, name)
+                    rel_path = os.path.relpath(full_path, self.static_folder).replace(os.sep, '/')
+                    if build_manifest:
+                        immutable = rel_path in fingerprinted
+                    else:
+                        immutable = bool(HASHED_NAME_RE.search(name))
+                    assets[rel_path] = self._describe(full_path, name, names, root, immutable)
+
+        # Old references to unfingerprinted names still work, but must revalidate
+        for original, hashed in build_manifest.get('assets', {}).items():
+            if original not in assets and hashed in assets:
+                asset = assets[hashed]
+                assets[original] = StaticAsset(asset.path, asset.mimetype, asset.etag, False, asset.variants)
+        self.assets = assets
+
+        index = assets.get(self.index_name)
+        self.index = None
+        self.index_variants = {}
+        if index:
+            self.index = (self._read(index.path), index.etag)
+            self.index_variants = {
+                encoding: (self._read(path), etag)
+                for encoding, (path, etag) in index.variants.items()
+            }
+
+    def _load_build_manifest(self):
+        if not self.static_folder:
+            return {}
+        try:
+            with open(os.path.join(self.static_folder, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _describe(self, full_path, name, siblings, root, immutable):
+        etag = self._etag(full_path, immutable)
+        variants = {}
+        for encoding, suffix in ENCODINGS:
+            if name + suffix in siblings:
+                variant_path = os.path.join(root, name + suffix)
+                variants[encoding] = (variant_path, etag + '-' + encoding)
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        return StaticAsset(full_path, mimetype, etag, immutable, variants)
+
+    def _etag(self, path, immutable):
+        # Fingerprinted names are already content-addressed; everything else gets a
+        # content hash computed once here instead of an mtime-based tag
+        if immutable:
+            return os.path.basename(path)
+        if path in self.known_etags:
+            return self.known_etags[path]
+        digest = hashlib.blake2b(digest_size=12)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _negotiate(variants):
+        accepted = request.accept_encodings
+        for encoding, _ in ENCODINGS:
+            if encoding in variants and accepted[encoding]:
+                return encoding
+        return None
+
+    def serve(self, path):
+        """Response for ``path`` or None when it is not a static asset"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+
+        encoding = self._negotiate(asset.variants)
+        file_path, etag = asset.variants[encoding] if encoding else (asset.path, asset.etag)
+        max_age = IMMUTABLE_MAX_AGE if asset.immutable else DEFAULT_MAX_AGE
+
+        response = send_file(
+            file_path, mimetype=asset.mimetype, download_name=os.path.basename(asset.path),
+            etag=etag, conditional=True, max_age=max_age
+        )
+        if asset.immutable:
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def serve_index(self):
+        """SPA fallback served from memory, or None when there is no index.html"""
+        if self.index is None:
+            return None
+
+        encoding = self._negotiate(self.index_variants)
+        body, etag = self.index_variants[encoding] if encoding else self.index
+
+        response = Response(body, mimetype='text/html')
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if self.index_variants:
+            response.vary.add('Accept-Encoding')
+        return response.make_conditional(request)
@@ -0,0 +1,342 @@
+"""
+Local stand-ins for Stripe and Supabase PostgREST used by the load tests.
+
+Both run as threaded HTTP servers on 127.0.0.1 and keep their state in memory. They
+implement just the calls the payment routes make; anything else returns 404.
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class _StubServer:
+    handler_class = None
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = 0
+        handler = type('Handler', (self.handler_class,), {'stub': self})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    stub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate_latency(self):
+        with self.stub.lock:
+            self.stub.calls += 1
+        if self.stub.latency:
+            time.sleep(self.stub.latency)
+
+
+def _nested_form(pairs):
+    """Decode Stripe's ``metadata[key]=value`` form encoding"""
+    result = {}
+    for key, values in pairs.items():
+        value = values[-1]
+        if '[' in key:
+            parts = [part.rstrip(']') for part in key.split('[')]
+            target = result
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+        else:
+            result[key] = value
+    return result
+
+
+def _split_top_level(text):
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _parse_select(text):
+    """``id, program:programs(name, slug)`` -> [('id', None), ('program', [('name', None), ...])]"""
+    columns = []
+    for part in _split_top_level(text):
+        if '(' in part:
+            name, _, inner = part.partition('(')
+            columns.append((name.partition(':')[0].strip(), _parse_select(inner[:-1])))
+        else:
+            columns.append((part, None))
+    return columns
+
+
+def _project(row, columns):
+    if row is None:
+        return None
+    result = dict(row) if any(name == '*' for name, _ in columns) else {}
+    for name, nested in columns:
+        if name == '*':
+            continue
+        result[name] = _project(row.get(name), nested) if nested is not None else row.get(name)
+    return result
+
+
+def _parse_or(text):
+    """``(a.lt.1,and(a.eq.1,b.lt.2))`` -> list of filter groups, any of which must match"""
+    groups = []
+    for part in _split_top_level(text.strip()[1:-1]):
+        terms = _split_top_level(part[4:-1]) if part.startswith('and(') else [part]
+        group = []
+        for term in terms:
+            column, _, rest = term.partition('.')
+            op, _, operand = rest.partition('.')
+            group.append((column, op, operand.strip('"')))
+        groups.append(group)
+    return groups
+
+
+class _StripeHandler(_Handler):
+    def do_POST(self):
+        self.simulate_latency()
+        if self.path.rstrip('/') != '/v1/checkout/sessions':
+            return self.send_json(404, {'error': {'message': 'Not found'}})
+        form = _nested_form(parse_qs(self.read_body().decode('utf-8')))
+        session_id = f'cs_test_{uuid.uuid4().hex}'
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'url': f'https://checkout.stripe.test/{session_id}',
+            'mode': 'payment',
+            'payment_status': 'unpaid',
+            'status': 'open',
+            'payment_intent': f'pi_{uuid.uuid4().hex}',
+            'metadata': form.get('metadata', {}),
+            'customer_email': form.get('customer_email'),
+        }
+        with self.stub.lock:
+            self.stub.sessions[session_id] = session
+        self.send_json(200, session)
+
+    def do_GET(self):
+        self.simulate_latency()
+        prefix = '/v1/checkout/sessions/'
+        path = urlparse(self.path).path
+        session = self.stub.sessions.get(path[len(prefix):]) if path.startswith(prefix) else None
+        if session is None:
+            return self.send_json(404, {'error': {'type': 'invalid_request_error', 'message': 'No such checkout session'}})
+        self.send_json(200, session)
+
+
+class StubStripe(_StubServer):
+    handler_class = _StripeHandler
+
+    def __init__(self, latency=0.0):
+        self.sessions = {}
+        super().__init__(latency)
+
+    def complete(self, session_id):
+        with self.lock:
+            session = self.sessions[session_id]
+            session['payment_status'] = 'paid'
+            session['status'] = 'complete'
+            return dict(session)
+
+
+def sign_webhook(payload, secret, timestamp=None):
+    """Stripe-Signature header for ``payload``"""
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(secret.encode('utf-8'), f'{timestamp}.{payload}'.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+class _PostgrestHandler(_Handler):
+    def parse(self):
+        parsed = urlparse(self.path)
+        parts = parsed.path.split('/')
+        # /rest/v1/<table> or /rest/v1/rpc/<function>
+        resource = parts[3] if len(parts) > 3 else ''
+        name = parts[4] if resource == 'rpc' and len(parts) > 4 else None
+        params = parse_qs(parsed.query)
+        return resource, name, params
+
+    def filters(self, params):
+        result = []
+        for key, values in params.items():
+            if key in ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns'):
+                continue
+            for value in values:
+                if key == 'or':
+                    result.append(('or', 'or', _parse_or(value)))
+                    continue
+                op, _, operand = value.partition('.')
+                result.append((key, op, unquote(operand)))
+        return result
+
+    def matches(self, row, filters):
+        for column, op, operand in filters:
+            if op == 'or':
+                if not any(self.matches(row, group) for group in operand):
+                    return False
+                continue
+            if op == 'not':
+                inner_op, _, inner_operand = operand.partition('.')
+                if self.matches(row, [(column, inner_op, inner_operand)]):
+                    return False
+                continue
+            value = row.get(column)
+            text = '' if value is None else json.dumps(value) if isinstance(value, bool) else str(value)
+            if op == 'eq' and text != operand:
+                return False
+            if op == 'neq' and text == operand:
+                return False
+            if op == 'in' and text not in operand.strip('()').split(','):
+                return False
+            if op in ('lt', 'lte', 'gt', 'gte'):
+                if value is None:
+                    return False
+                if op == 'lt' and not text < operand:
+                    return False
+                if op == 'lte' and not text <= operand:
+                    return False
+                if op == 'gt' and not text > operand:
+                    return False
+                if op == 'gte' and not text >= operand:
+                    return False
+            if op == 'is' and operand == 'null' and value is not None:
+                return False
+        return True
+
+    def respond(self, rows):
+        if 'vnd.pgrst.object' in self.headers.get('Accept', ''):
+            if len(rows) != 1:
+                return self.send_json(406, {'message': 'JSON object requested, multiple (or no) rows returned'})
+            return self.send_json(200, rows[0])
+        self.send_json(200, rows, {'Content-Range': f'0-{max(len(rows) - 1, 0)}/{len(rows)}'})
+
+    def do_GET(self):
+        self.simulate_latency()
+        table, _, params = self.parse()
+        filters = self.filters(params)
+        with self.stub.lock:
+            rows = [self.stub.expand(table, row) for row in self.stub.tables.get(table, []) if self.matches(row, filters)]
+        order = params.get('order', [None])[0]
+        if order:
+            # Stable sorts, last key first
+            for term in reversed(order.split(',')):
+                column, _, direction = term.partition('.')
+                rows.sort(key=lambda row: (row.get(column) is None, row.get(column) or ''), reverse=direction.startswith('desc'))
+        offset = int(params.get('offset', [0])[0])
+        limit = params.get('limit', [None])[0]
+        rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+        select = params.get('select', ['*'])[0]
+        if select.strip() != '*':
+            columns = _parse_select(select)
+            rows = [_project(row, columns) for row in rows]
+        self.respond(rows)
+
+    def do_POST(self):
+        self.simulate_latency()
+        table, name, _ = self.parse()
+        body = json.loads(self.read_body() or b'null')
+        if table == 'rpc':
+            return self.send_json(200, self.stub.rpc(name, body or {}))
+        records = body if isinstance(body, list) else [body]
+        inserted = []
+        with self.stub.lock:
+            for record in records:
+                row = dict(record)
+                row.setdefault('id', str(uuid.uuid4()))
+                self.stub.tables.setdefault(table, []).append(row)
+                inserted.append(self.stub.expand(table, row))
+        self.send_json(201, inserted)
+
+    def do_PATCH(self):
+        self.simulate_latency()
+        table, _, params = self.parse()
+        changes = json.loads(self.read_body() or b'{}')
+        filters = self.filters(params)
+        updated = []
+        with self.stub.lock:
+            for row in self.stub.tables.get(table, []):
+                if self.matches(row, filters):
+                    row.update(changes)
+                    updated.append(self.stub.expand(table, row))
+        self.respond(updated) if 'vnd.pgrst.object' in self.headers.get('Accept', '') else self.send_json(200, updated)
+
+    def do_DELETE(self):
+        self.simulate_latency()
+        table, _, params = self.parse()
+        filters = self.filters(params)
+        with self.stub.lock:
+            rows = self.stub.tables.get(table, [])
+            deleted = [row for row in rows if self.matches(row, filters)]
+            self.stub.tables[table] = [row for row in rows if not self.matches(row, filters)]
+        self.send_json(200, deleted)
+
+
+class StubPostgrest(_StubServer):
+    """In-memory PostgREST. Enrollment rows are returned with their ``program`` and ``profile`` embedded."""
+
+    handler_class = _PostgrestHandler
+
+    def __init__(self, latency=0.0):
+        self.tables = {}
+        self.rpc_handlers = {}
+        super().__init__(latency)
+
+    def seed(self, table, rows):
+        with self.lock:
+            self.tables.setdefault(table, []).extend(dict(row) for row in rows)
+
+    def expand(self, table, row):
+        if table == 'enrollments' and 'program_id' in row:
+            program = next((p for p in self.tables.get('programs', []) if str(p['id']) == str(row['program_id'])), None)
+            profile = next((p for p in self.tables.get('profiles', []) if str(p['id']) == str(row.get('user_id'))), None)
+            return dict(row, program=program, profile=profile)
+        return dict(row)
+
+    def rpc(self, name, args):
+        handler = self.rpc_handlers.get(name)
+        return handler(self, args) if handler else None
@@ -0,0 +1,84 @@
+"""
+Batched expiry sweeper for enrollments.
+
+Two jobs, each a Postgres function that updates at most ``batch_size`` rows found
+through a partial index (see "Enrollment Expiry" in schema.sql):
+
+* ``expire_stale_enrollments``: pending enrollments older than the Stripe checkout
+  lifetime become ``expired``.
+* ``lapse_expired_access``: enrollments past ``access_expires_at`` become ``lapsed``.
+
+After every batch the sweeper sleeps long enough to stay under
+``SWEEPER_ROWS_PER_SECOND``, so a large backlog is worked off gradually instead of
+competing with live traffic for locks and I/O.
+
+Both functions return the rows they changed, and ``on_swept`` receives them after
+every batch (``flask sweep-enrollments`` drops the payment routes' cached pages and
+verification answers for them). Those caches live in each process, so web workers
+other than the sweeping one see the change when their entries expire
+(``USER_ENROLLMENTS_CACHE_TTL``). Access itself is enforced by the modules and
+user_progress RLS policies through ``has_program_access``, which also checks
+``access_expires_at`` directly, so it does not wait for the sweep.
+"""
+
+import logging
+import os
+import time
+
+logger = logging.getLogger('reinvent.sweeper')
+
+DEFAULT_ROWS_PER_SECOND = float(os.getenv('SWEEPER_ROWS_PER_SECOND', '200'))
+DEFAULT_BATCH_SIZE = int(os.getenv('SWEEPER_BATCH_SIZE', '100'))
+# Checkout sessions expire after 24 hours; the extra hour leaves room for the webhook
+PENDING_TTL_HOURS = float(os.getenv('PENDING_ENROLLMENT_TTL_HOURS', '25'))
+
+
+class EnrollmentSweeper:
+    def __init__(self, supabase, rows_per_second=DEFAULT_ROWS_PER_SECOND, batch_size=DEFAULT_BATCH_SIZE,
+                 pending_ttl_hours=PENDING_TTL_HOURS, sleep=time.sleep, clock=time.monotonic, on_swept=None):
+        if rows_per_second <= 0 or batch_size <= 0:
+            raise ValueError('rows_per_second and batch_size must be positive')
+        self.supabase = supabase
+        self.rows_per_second = rows_per_second
+        self.batch_size = batch_size
+        self.pending_ttl_hours = pending_ttl_hours
+        self.sleep = sleep
+        self.clock = clock
+        self.on_swept = on_swept
+
+    def jobs(self):
+        return [
+            ('stale_checkouts', 'expire_stale_enrollments', {'p_older_than': f'{self.pending_ttl_hours} hours'}),
+            ('lapsed_access', 'lapse_expired_access', {}),
+        ]
+
+    def run_job(self, function, params, max_rows=None):
+        """Call ``function`` batch by batch until it runs dry. Returns rows changed."""
+        total = 0
+        while max_rows is None or total < max_rows:
+            limit = self.batch_size if max_rows is None else min(self.batch_size, max_rows - total)
+            started = self.clock()
+            rows = self.supabase.rpc(function, dict(params, p_limit=limit)).execute().data or []
+            changed = len(rows)
+            total += changed
+            if rows and self.on_swept:
+                self.on_swept(rows)
+            if changed < limit:
+                break
+            # A batch of N rows is allowed N / rows_per_second seconds
+            pause = changed / self.rows_per_second - (self.clock() - started)
+            if pause > 0:
+                self.sleep(pause)
+        return total
+
+    def sweep(self, max_rows=None):
+        """Run every job once. Returns {job: rows changed}."""
+        results = {}
+        for name, function, params in self.jobs():
+            started = self.clock()
+            results[name] = self.run_job(function, params, max_rows)
+            elapsed = self.clock() - started
+            if results[name]:
+                logger.info('%s: %d rows in %.1fs (%.0f rows/s)', name, results[name], elapsed,
+                            results[name] / elapsed if elapsed else 0)
+        return results